@@ -4,6 +4,9 @@ import json
 import random
 import socket # Needed to potentially show the IP
 
+# Single-client smoke test. For many publishers/subscribers at real rates, with loss and
+# latency percentiles, use: python -m benchmarks.bench_mqtt_load
+
 # --- Configuration ---
 BROKER_ADDRESS = "localhost" # Connect to the broker running on THIS machine
 BROKER_PORT = 1883
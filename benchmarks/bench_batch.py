@@ -0,0 +1,96 @@
+"""Benchmark: batched multi-camera detection, frames/sec per core at batch sizes 1-4
+
+Each batch size b simulates b cameras: one BatchDetector.detect() call
+preprocesses b frames into one tensor, runs a single session call and
+splits + NMSes the outputs per camera. Throughput is divided by the ORT
+intra-op threads to give frames/sec per core.
+
+Run from the repository root:
+    python -m benchmarks.bench_batch [--model yolo_nas_s.batch.onnx] [--threads 1]
+        [--batches 1 2 3 4] [--frames 100] [--json]
+
+Without --model a small synthetic detector with YOLO-NAS shaped outputs is
+generated (benchmarks/fakes.py): the batching overheads and gains are real,
+but absolute numbers are far above the real model's. Produce the real
+dynamic-batch model with: python -m models.quantization --variants batch
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import models.yoloNAS as yolo_nas_model
+from helpers.metrics import Metrics
+from models.batching import BatchDetector
+from models.onnx_session import OnnxSession
+from benchmarks.fakes import SyntheticScene, make_synthetic_detector
+
+
+def run_batch(model_path, batch, frames, args):
+    input_size = yolo_nas_model.INPUT_SIZE
+    session = OnnxSession(model_path, input_shape=(batch, 3, input_size[1], input_size[0]),
+                          intra_op_threads=args.threads, cache_optimized=False, warmup_runs=3)
+    metrics = Metrics()
+    detector = BatchDetector(session, batch, input_size, metrics=metrics)
+    images = [(camera, frames[camera]) for camera in range(batch)]
+    for _ in range(3):  # Warm-up, including the preprocessors' buffers
+        detector.detect(images)
+    metrics = detector.metrics = Metrics()
+
+    calls = max(1, args.frames // batch)
+    latencies = []
+    start_time = time.perf_counter()
+    for _ in range(calls):
+        call_start = time.perf_counter()
+        detector.detect(images)
+        latencies.append(time.perf_counter() - call_start)
+    wall_time = time.perf_counter() - start_time
+
+    fps = calls * batch / wall_time
+    stages = metrics.summary()["stages_ms"]
+    return {"batch": batch, "threads": args.threads, "fps": round(fps, 2),
+            "fps_per_core": round(fps / args.threads, 2),
+            "batch_latency_p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+            "stage_p50_ms": {stage: values[0] for stage, values in stages.items()}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", help="Dynamic-batch model (default: synthetic detector)")
+    parser.add_argument("--threads", type=int, default=1, help="ORT intra-op threads (cores used)")
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 2, 3, 4])
+    parser.add_argument("--frames", type=int, default=100, help="Frames per batch size")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    frames = [SyntheticScene((args.width, args.height), seed=camera).render(camera).copy()
+              for camera in range(max(args.batches))]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        model_path = args.model or make_synthetic_detector(os.path.join(temp_dir, "synthetic.onnx"),
+                                                           batch=None)
+        results = [run_batch(model_path, batch, frames, args) for batch in args.batches]
+
+    if args.json:
+        print(json.dumps({"model": args.model or "synthetic", "cpu_count": os.cpu_count(),
+                          "results": results}, indent=2))
+        return
+
+    print(f"model {args.model or 'synthetic'}, {args.threads} thread(s), {os.cpu_count()} CPUs")
+    print(f"{'batch':>5} {'FPS':>8} {'FPS/core':>9} {'call p50 ms':>12} {'infer ms':>9} "
+          f"{'pre ms':>7} {'post/cam ms':>12} {'speedup':>8}")
+    baseline = results[0]["fps"]
+    for result in results:
+        stages = result["stage_p50_ms"]
+        post = stages.get("postprocess", 0) + stages.get("nms", 0)
+        print(f"{result['batch']:>5} {result['fps']:>8} {result['fps_per_core']:>9} "
+              f"{result['batch_latency_p50_ms']:>12} {stages.get('inference', 0):>9} "
+              f"{stages.get('preprocess', 0):>7} {post:>12.2f} {result['fps'] / baseline:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
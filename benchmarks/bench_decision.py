@@ -0,0 +1,116 @@
+"""Benchmark: per-frame cost of the navigation decision (legacy loops vs NumPy vs grid engine)
+
+Run from the repository root:
+    python -m benchmarks.bench_decision [--repeats 2000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+import models.yoloNAS as yolo_nas_model
+from models.decision import DecisionEngine, class_weight_table
+
+
+FRAME_SIZE = (1280, 720)
+
+
+def legacy_boxes_to_labels(boxes, orig_size):
+    """The original inline normalization loop of models/yoloNAS.capture_and_infer, as a function
+
+    The baseline had no boxes_to_labels: this wraps that loop so it can be
+    timed against the vectorized yoloNAS.boxes_to_labels.
+    """
+    norm_labels = []
+    for box in boxes:
+        x1, y1, x2, y2 = box
+        width = x2 - x1
+        height = y2 - y1
+        x_center = x1 + width / 2
+        y_center = y1 + height / 2
+        norm_labels.append((0, x_center / orig_size[0], y_center / orig_size[1],
+                            width / orig_size[0], height / orig_size[1]))
+    return norm_labels
+
+
+def legacy_is_side_clear(labels, side, threshold=0.05):
+    total_area = 0
+    for _, x_center, _, width, height in labels:
+        if side == 'left' and x_center < 0.4:
+            total_area += width * height
+        elif side == 'right' and x_center > 0.6:
+            total_area += width * height
+    return total_area < threshold
+
+
+def legacy_decide_direction(labels):
+    """Reference copy of the original models/yoloNAS.decide_direction"""
+    left = right = middle = 0
+    for _, x_center, _, _, _ in labels:
+        if 0.4 <= x_center <= 0.6:
+            middle += 1
+        elif x_center < 0.4:
+            left += 1
+        else:
+            right += 1
+    if middle > 0:
+        left_clear = legacy_is_side_clear(labels, 'right')
+        right_clear = legacy_is_side_clear(labels, 'left')
+        if left < right and left_clear:
+            return "right"
+        elif right_clear:
+            return "left"
+        elif left_clear:
+            return "right"
+        return "stop"
+    return "straight"
+
+
+def make_boxes(rng, count):
+    centers = rng.uniform((0, 0), FRAME_SIZE, (count, 2))
+    sizes = rng.uniform((20, 40), (400, 600), (count, 2))
+    boxes = np.hstack([centers - sizes / 2, centers + sizes / 2]).astype(np.float32)
+    class_ids = rng.choice(yolo_nas_model.NAVIGATION_CLASSES, count)
+    depths = rng.uniform(0, 1, count).astype(np.float32)
+    return boxes, class_ids, depths
+
+
+def time_call(func, repeats):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    engine = DecisionEngine(class_weights=class_weight_table(yolo_nas_model.CLASS_NAMES))
+    print(f"{'boxes':>6} {'loops (us)':>11} {'numpy (us)':>11} {'grid (us)':>10} "
+          f"{'grid+depth':>11} {'agree':>6}")
+    for count in (0, 5, 20, 100):
+        boxes, class_ids, depths = make_boxes(rng, count)
+
+        legacy = time_call(lambda: legacy_decide_direction(legacy_boxes_to_labels(boxes, FRAME_SIZE)),
+                           args.repeats)
+        vectorized = time_call(lambda: yolo_nas_model.decide_direction(
+            yolo_nas_model.boxes_to_labels(boxes, FRAME_SIZE)), args.repeats)
+        grid = time_call(lambda: engine.update(boxes, FRAME_SIZE, class_ids), args.repeats)
+        grid_depth = time_call(lambda: engine.update(boxes, FRAME_SIZE, class_ids, depths),
+                               args.repeats)
+
+        agree = all(
+            legacy_decide_direction(legacy_boxes_to_labels(b, FRAME_SIZE))
+            == yolo_nas_model.decide_direction(yolo_nas_model.boxes_to_labels(b, FRAME_SIZE))
+            for b in (make_boxes(rng, count)[0] for _ in range(200)))
+
+        print(f"{count:>6} {legacy:>11.1f} {vectorized:>11.1f} {grid:>10.1f} "
+              f"{grid_depth:>11.1f} {str(agree):>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Scaling benchmark: detector process pool (1-4 workers) vs in-process ORT threading
+
+Frames are pushed as fast as the pool accepts them; latency is measured from
+submit() to the in-order get(). The in-process baseline runs the same steps
+on one thread with all cores given to ONNX Runtime's intra-op pool.
+
+Run from the repository root:
+    python -m benchmarks.bench_inference_pool [--backend stub --latency-ms 60]
+        [--backend ort --model yolo_nas_s.onnx] [--workers 1 2 3 4] [--frames 200] [--json]
+
+The stub spins on the CPU for --latency-ms per frame (a compute-bound
+session on one core), so it shows the ideal process scaling; use the real
+model to compare against intra-op threading.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+import models.yoloNAS as yolo_nas_model
+from models.inference_pool import InferencePool
+from models.preprocessing import Preprocessor
+from models.stub_detector import StubBackend
+from benchmarks.fakes import SyntheticScene
+
+
+def make_frames(count, size):
+    scene = SyntheticScene(size)
+    return [scene.render(i).copy() for i in range(count)]
+
+
+def backend_config(args, workers):
+    """(factory, options) for the pool workers"""
+    if args.backend == "stub":
+        return StubBackend, {"latency_ms": args.latency_ms, "busy": True}
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    return None, {"model_path": args.model, "input_size": yolo_nas_model.INPUT_SIZE,
+                  "intra_op_threads": threads}
+
+
+def summarize(latencies, frames, wall_time):
+    latencies = np.array(latencies) * 1000
+    return {"fps": round(frames / wall_time, 2),
+            "latency_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+            "latency_p95_ms": round(float(np.percentile(latencies, 95)), 2)}
+
+
+def run_pool(workers, frames, args):
+    factory, options = backend_config(args, workers)
+    pool = InferencePool(workers, frames[0].shape, backend_factory=factory,
+                         backend_options=options).start()
+    try:
+        for frame in frames[:workers * 2]:  # Warm-up
+            pool.submit(frame)
+        for _ in range(workers * 2):
+            pool.get()
+
+        submitted = {}
+        latencies = []
+        start_time = time.perf_counter()
+        for i in range(args.frames):
+            frame = frames[i % len(frames)]
+            while True:
+                seq = pool.submit(frame)
+                if seq is not None:
+                    submitted[seq] = time.perf_counter()
+                    break
+                result = pool.get()
+                latencies.append(time.perf_counter() - submitted.pop(result.seq))
+        while submitted:
+            result = pool.get()
+            latencies.append(time.perf_counter() - submitted.pop(result.seq))
+        wall_time = time.perf_counter() - start_time
+    finally:
+        pool.close()
+
+    result = summarize(latencies, args.frames, wall_time)
+    result.update(mode="pool", workers=workers, threads_per_worker=options.get("intra_op_threads", 1))
+    return result
+
+
+def run_in_process(frames, args):
+    """The current single-process path, ORT given every core"""
+    threads = os.cpu_count() or 1
+    if args.backend == "stub":
+        session, threads = StubBackend(args.latency_ms, busy=True), 1
+    else:
+        session = yolo_nas_model.load_session(args.model, intra_op_threads=threads)
+    preprocessor = Preprocessor(yolo_nas_model.INPUT_SIZE)
+
+    latencies = []
+    start_time = time.perf_counter()
+    for i in range(args.frames):
+        frame_start = time.perf_counter()
+        _, input_tensor, orig_size = preprocessor(frames[i % len(frames)])
+        outputs = session.run(input_tensor)
+        boxes, scores, class_ids = yolo_nas_model.process_output(
+            outputs, 0.5, orig_size, preprocessor, allowed_classes=yolo_nas_model.ALLOWED_CLASSES)
+        yolo_nas_model.apply_nms(boxes, scores, class_ids)
+        latencies.append(time.perf_counter() - frame_start)
+    wall_time = time.perf_counter() - start_time
+
+    result = summarize(latencies, args.frames, wall_time)
+    result.update(mode="in-process", workers=0, threads_per_worker=threads)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=("stub", "ort"), default="stub")
+    parser.add_argument("--model", default=yolo_nas_model.MODEL_PATH)
+    parser.add_argument("--latency-ms", type=float, default=60.0, help="Stub compute time per frame")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 3, 4])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    frames = make_frames(16, (args.width, args.height))
+    results = [run_in_process(frames, args)]
+    for workers in args.workers:
+        results.append(run_pool(workers, frames, args))
+
+    if args.json:
+        print(json.dumps({"backend": args.backend, "cpu_count": os.cpu_count(), "results": results}, indent=2))
+        return
+
+    print(f"backend {args.backend}, {os.cpu_count()} CPUs, {args.frames} frames")
+    print(f"{'mode':<11} {'workers':>7} {'threads':>7} {'FPS':>7} {'p50 ms':>8} {'p95 ms':>8} {'speedup':>8}")
+    baseline = results[0]["fps"]
+    for result in results:
+        print(f"{result['mode']:<11} {result['workers']:>7} {result['threads_per_worker']:>7} "
+              f"{result['fps']:>7} {result['latency_p50_ms']:>8} {result['latency_p95_ms']:>8} "
+              f"{result['fps'] / baseline:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
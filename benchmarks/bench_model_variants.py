@@ -0,0 +1,149 @@
+"""Accuracy-vs-latency benchmark of the FP32 / FP16 / INT8 detector variants
+
+Every image goes through the runtime path (preprocess_image -> session ->
+process_output -> apply_nms). Detections of each variant are matched to the
+FP32 detections (same class, IoU >= --match-iou) to measure agreement.
+
+Run from the repository root (create the variants with models/quantization.py):
+    python -m benchmarks.bench_model_variants --images eval_images/ [--variants fp16 int8]
+"""
+import argparse
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+import models.yoloNAS as yolo_nas_model
+from models.nms import box_iou
+from models.quantization import list_images
+
+
+def run_variant(session, images, confidence_threshold):
+    """Detections and per-stage latencies (ms) of one variant over all images"""
+    detections = []
+    inference_ms = []
+    total_ms = []
+    for image in images:
+        start_time = time.perf_counter()
+        _, input_tensor, orig_size = yolo_nas_model.preprocess_image(image)
+        inference_start = time.perf_counter()
+        outputs = session.run(input_tensor)
+        inference_ms.append((time.perf_counter() - inference_start) * 1000)
+        boxes, scores, class_ids = yolo_nas_model.process_output(outputs, confidence_threshold, orig_size)
+        boxes, scores, class_ids = yolo_nas_model.apply_nms(boxes, scores, class_ids)
+        total_ms.append((time.perf_counter() - start_time) * 1000)
+        detections.append((boxes.copy(), scores.copy(), class_ids.copy()))
+    return detections, np.array(inference_ms), np.array(total_ms)
+
+
+def match_detections(reference, candidate, match_iou):
+    """Greedy same-class matching; returns (matches, ious of matches, confidence deltas)"""
+    ref_boxes, ref_scores, ref_classes = reference
+    boxes, scores, classes = candidate
+    if len(ref_boxes) == 0 or len(boxes) == 0:
+        return 0, [], []
+
+    iou = box_iou(ref_boxes, boxes)
+    iou[ref_classes[:, None] != classes[None, :]] = 0
+
+    ious, deltas = [], []
+    while True:
+        ref_index, index = np.unravel_index(np.argmax(iou), iou.shape)
+        if iou[ref_index, index] < match_iou:
+            break
+        ious.append(iou[ref_index, index])
+        deltas.append(abs(float(ref_scores[ref_index]) - float(scores[index])))
+        iou[ref_index, :] = 0
+        iou[:, index] = 0
+    return len(ious), ious, deltas
+
+
+def agreement(reference_detections, detections, match_iou):
+    matched = reference_total = candidate_total = 0
+    ious, deltas = [], []
+    for reference, candidate in zip(reference_detections, detections):
+        count, frame_ious, frame_deltas = match_detections(reference, candidate, match_iou)
+        matched += count
+        ious += frame_ious
+        deltas += frame_deltas
+        reference_total += len(reference[0])
+        candidate_total += len(candidate[0])
+
+    precision = matched / candidate_total if candidate_total else 1.0
+    recall = matched / reference_total if reference_total else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        "precision": round(precision, 4),
+        "recall": round(recall, 4),
+        "f1": round(f1, 4),
+        "mean_iou": round(float(np.mean(ious)), 4) if ious else None,
+        "mean_confidence_delta": round(float(np.mean(deltas)), 4) if deltas else None,
+    }
+
+
+def percentiles(values):
+    return {f"p{p}": round(float(np.percentile(values, p)), 2) for p in (50, 90, 99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", required=True, help="Folder of evaluation frames")
+    parser.add_argument("--max-images", type=int, default=200)
+    parser.add_argument("--model", default=yolo_nas_model.MODEL_PATH)
+    parser.add_argument("--variants", nargs="+", default=["fp16", "int8"])
+    parser.add_argument("--confidence", type=float, default=0.5)
+    parser.add_argument("--match-iou", type=float, default=0.5)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    images = [cv2.imread(path) for path in list_images(args.images, args.max_images)]
+    images = [image for image in images if image is not None]
+    if not images:
+        parser.error(f"No readable images in {args.images}")
+
+    if not os.path.exists(args.model):
+        parser.error(f"FP32 reference model {args.model} not found")
+
+    results = {}
+    reference = None
+    for variant in ["fp32"] + [v for v in args.variants if v != "fp32"]:
+        model_path = yolo_nas_model.model_variant_path(variant, args.model)
+        if not os.path.exists(model_path):
+            print(f"Skipping {variant}: {model_path} not found")
+            continue
+
+        session = yolo_nas_model.load_session(model_path, intra_op_threads=args.threads)
+        detections, inference_ms, total_ms = run_variant(session, images, args.confidence)
+        if variant == "fp32":
+            reference = detections
+
+        results[variant] = {
+            "model": model_path,
+            "size_mb": round(os.path.getsize(model_path) / 1e6, 1),
+            "inference_ms": percentiles(inference_ms),
+            "end_to_end_ms": percentiles(total_ms),
+            "fps": round(1000 / float(np.mean(total_ms)), 2),
+            "detections": int(sum(len(d[0]) for d in detections)),
+            "agreement_vs_fp32": agreement(reference, detections, args.match_iou),
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{len(images)} images, confidence {args.confidence}, match IoU {args.match_iou}")
+    print(f"{'variant':<8} {'MB':>6} {'infer p50':>10} {'p90':>8} {'p99':>8} {'e2e p50':>9} "
+          f"{'FPS':>6} {'dets':>6} {'prec':>6} {'recall':>7} {'mIoU':>6}")
+    for variant, result in results.items():
+        agree = result["agreement_vs_fp32"]
+        print(f"{variant:<8} {result['size_mb']:>6} {result['inference_ms']['p50']:>10} "
+              f"{result['inference_ms']['p90']:>8} {result['inference_ms']['p99']:>8} "
+              f"{result['end_to_end_ms']['p50']:>9} {result['fps']:>6} {result['detections']:>6} "
+              f"{agree['precision']:>6} {agree['recall']:>7} {agree['mean_iou'] or 0:>6.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""Load test: many simulated publishers and subscribers against an MQTT broker
+
+Grown out of TEST_MQTT.py (one client, one random message every 2 s). Every
+simulated publisher is a process sending results payloads with the real
+vision/results schema (benchmarks/bench_payload.make_payload) at a fixed
+rate on its own topic, loadtest/<n>/vision/results (binary on .../bin).
+Every subscriber is a process subscribed to all of them. The timestamp and
+frame_id fields carry the send time and a per-publisher sequence number, so
+the subscribers measure publish-to-receive latency, loss and duplicates.
+
+    --mode raw        a bare paho client per publisher, like TEST_MQTT.py
+    --mode publisher  publisher.MQTTPublisher (in-flight limit, coalescing);
+                      coalesced frames are dropped on purpose, see "coalesced"
+
+Each combination of --rates, --qos and --encodings is one trial.
+
+Run from the repository root:
+    python -m benchmarks.bench_mqtt_load [--host localhost --port 1883]
+        [--publishers 4] [--subscribers 2] [--rates 10 50] [--qos 0 1]
+        [--encodings json binary] [--detections 10] [--duration 10] [--json]
+
+Without --host an in-process broker (helpers/mqtt_broker.py) is started. It
+is a single Python process and forwards everything at QoS 0, so use it to
+compare settings, and mosquitto (--host localhost) for absolute numbers.
+"""
+import argparse
+import itertools
+import json
+import multiprocessing as mp
+import os
+import queue
+import time
+
+import numpy as np
+import paho.mqtt.client as mqtt
+
+import helpers.payload as payload_codec
+from helpers.mqtt_broker import Broker
+from benchmarks.bench_payload import FRAME_SIZE, make_payload
+
+
+TOPIC_PREFIX = "loadtest"
+RESULTS_TOPIC = "vision/results"  # publisher.MQTT_TOPIC_CV_RESULTS (not imported: raw workers stay light)
+START_METHOD = "spawn"
+CONNECT_TIMEOUT = 30.0
+
+
+def results_topic(index):
+    return f"{TOPIC_PREFIX}/{index}/{RESULTS_TOPIC}"
+
+
+def _connect(client, host, port):
+    client.connect(host, port, 60)
+    client.loop_start()
+
+
+def _publisher_main(index, config, ready, go, start_at, results):
+    """Publisher process: connect, wait for the common start, publish at the configured rate"""
+    rng = np.random.default_rng(index)
+    payload = make_payload(rng, config["detections"])
+    payload["device_id"] = f"{TOPIC_PREFIX}_{index}"
+    topic = results_topic(index)
+    encoding, qos = config["encoding"], config["qos"]
+    stats = {"index": index, "frames": 0, "messages": 0, "failed": 0, "late": 0, "bytes": 0,
+             "acked": 0, "coalesced": 0}
+
+    if config["mode"] == "publisher":
+        import publisher as smartsight  # Only this mode pays for importing the publisher module
+
+        smartsight.BROKER_ADDRESS, smartsight.BROKER_PORT = config["host"], config["port"]
+        smartsight.MQTT_CLIENT_ID = f"{TOPIC_PREFIX}_pub_{index}_{os.getpid()}"
+        smartsight.SPOOL_ENABLED = False
+        smartsight.PUBLISH_MODE = "full"
+        sender = smartsight.MQTTPublisher(encoding, qos, config["max_in_flight"])
+        if not sender.setup_mqtt():
+            results.put(("failed", index, "cannot connect"))
+            return
+
+        def send():
+            return sender.publish_results(payload, topic=topic, frame_size=FRAME_SIZE)
+    else:
+        client = mqtt.Client(client_id=f"{TOPIC_PREFIX}_pub_{index}_{os.getpid()}")
+
+        def on_publish(client, userdata, mid):
+            stats["acked"] += 1
+        client.on_publish = on_publish
+        _connect(client, config["host"], config["port"])
+
+        def send():
+            ok = True
+            if encoding in ("binary", "both"):
+                data = payload_codec.encode_binary(payload, FRAME_SIZE)
+                stats["bytes"] += len(data)
+                ok = client.publish(f"{topic}/bin", data, qos=qos).rc == mqtt.MQTT_ERR_SUCCESS
+            if encoding in ("json", "both"):
+                data = payload_codec.encode_json(payload)
+                stats["bytes"] += len(data)
+                ok = client.publish(topic, data, qos=qos).rc == mqtt.MQTT_ERR_SUCCESS and ok
+            return ok
+
+    ready.put(index)
+    go.wait()
+    start = start_at.value
+    interval = 1.0 / config["rate"]
+    streams = 2 if encoding == "both" else 1
+    for seq in range(1, int(config["duration"] * config["rate"]) + 1):
+        # Absolute schedule: a slow publish delays the next one but does not shift the rest
+        delay = start + (seq - 1) * interval - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        elif delay < -interval:
+            stats["late"] += 1
+        payload["frame_id"] = seq
+        payload["timestamp"] = time.time()
+        stats["frames"] += 1
+        stats["messages"] += streams
+        if not send():
+            stats["failed"] += 1
+    stats["elapsed"] = time.time() - start
+
+    if config["mode"] == "publisher":
+        deadline = time.monotonic() + config["drain"]
+        while (sender.pending or sender.in_flight) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        publisher_stats = sender.stats()
+        stats["coalesced"] = publisher_stats["coalesced"]
+        stats["ack_p50_ms"] = publisher_stats["latency_p50_ms"]
+        stats["ack_p95_ms"] = publisher_stats["latency_p95_ms"]
+        sender.cleanup()
+    else:
+        deadline = time.monotonic() + config["drain"]
+        while stats["acked"] < stats["messages"] - stats["failed"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        client.loop_stop()
+        client.disconnect()
+    results.put(("publisher", index, stats))
+
+
+def _subscriber_main(index, config, ready, stop, results):
+    """Subscriber process: record latency and sequence numbers per topic until told to stop"""
+    seen = {}
+    latencies = []
+    counts = {"received": 0, "duplicates": 0, "bytes": 0, "errors": 0}
+
+    def on_message(client, userdata, message):
+        now = time.time()
+        counts["received"] += 1
+        counts["bytes"] += len(message.payload)
+        try:
+            if message.topic.endswith("/bin"):
+                _, _, _, seq, timestamp, _ = payload_codec.HEADER.unpack_from(message.payload)
+            else:
+                data = json.loads(message.payload)
+                seq, timestamp = data["frame_id"], data["timestamp"]
+        except Exception:
+            counts["errors"] += 1
+            return
+        latencies.append(now - timestamp)
+        topic_seen = seen.setdefault(message.topic, set())
+        if seq in topic_seen:
+            counts["duplicates"] += 1
+        topic_seen.add(seq)
+
+    def on_subscribe(client, userdata, mid, granted_qos):
+        ready.put(index)
+
+    client = mqtt.Client(client_id=f"{TOPIC_PREFIX}_sub_{index}_{os.getpid()}")
+    client.on_message = on_message
+    client.on_subscribe = on_subscribe
+    client.on_connect = lambda client, userdata, flags, rc: client.subscribe(f"{TOPIC_PREFIX}/#",
+                                                                              config["qos"])
+    _connect(client, config["host"], config["port"])
+    stop.wait()
+    client.loop_stop()
+    client.disconnect()
+    counts["unique"] = sum(len(topic_seen) for topic_seen in seen.values())
+    counts["latencies_ms"] = (np.array(latencies, dtype=np.float64) * 1000.0).astype(np.float32)
+    results.put(("subscriber", index, counts))
+
+
+def _wait_ready(ready, count, what):
+    for _ in range(count):
+        try:
+            ready.get(timeout=CONNECT_TIMEOUT)
+        except queue.Empty:
+            raise RuntimeError(f"Not all {what} connected within {CONNECT_TIMEOUT:.0f}s")
+
+
+def run_trial(args, rate, qos, encoding):
+    """One load test; returns the aggregated result dict"""
+    config = {"host": args.host, "port": args.port, "mode": args.mode, "rate": rate, "qos": qos,
+              "encoding": encoding, "detections": args.detections, "duration": args.duration,
+              "drain": args.drain, "max_in_flight": args.max_in_flight}
+    context = mp.get_context(START_METHOD)
+    ready, results = context.Queue(), context.Queue()
+    go, stop = context.Event(), context.Event()
+    start_at = context.Value("d", 0.0)
+
+    subscribers = [context.Process(target=_subscriber_main, args=(i, config, ready, stop, results),
+                                   daemon=True) for i in range(args.subscribers)]
+    publishers = [context.Process(target=_publisher_main, args=(i, config, ready, go, start_at, results),
+                                  daemon=True) for i in range(args.publishers)]
+    try:
+        for process in subscribers:
+            process.start()
+        _wait_ready(ready, len(subscribers), "subscribers")
+        for process in publishers:
+            process.start()
+        _wait_ready(ready, len(publishers), "publishers")
+
+        start_at.value = time.time() + 0.2
+        go.set()
+        publisher_stats, subscriber_stats = [], []
+        while len(publisher_stats) < len(publishers):
+            kind, index, data = results.get(timeout=args.duration + args.drain + CONNECT_TIMEOUT)
+            if kind == "failed":
+                raise RuntimeError(f"Publisher {index} failed: {data}")
+            publisher_stats.append(data)
+        time.sleep(args.drain)  # Let the last messages reach the subscribers
+        stop.set()
+        while len(subscriber_stats) < len(subscribers):
+            subscriber_stats.append(results.get(timeout=CONNECT_TIMEOUT)[2])
+    finally:
+        stop.set()
+        go.set()
+        for process in subscribers + publishers:
+            process.join(timeout=5.0)
+            if process.is_alive():
+                process.terminate()
+
+    elapsed = max(stats["elapsed"] for stats in publisher_stats)
+    sent = sum(stats["messages"] for stats in publisher_stats)
+    expected = sent * len(subscriber_stats)
+    received = sum(stats["received"] for stats in subscriber_stats)
+    unique = sum(stats["unique"] for stats in subscriber_stats)
+    latencies = np.concatenate([stats["latencies_ms"] for stats in subscriber_stats] or [np.empty(0)])
+    if latencies.size:
+        p50, p90, p99 = (round(float(v), 2) for v in np.percentile(latencies, (50, 90, 99)))
+        latency_max = round(float(latencies.max()), 2)
+    else:
+        p50 = p90 = p99 = latency_max = None
+    return {
+        "rate": rate, "qos": qos, "encoding": encoding, "mode": args.mode,
+        "publishers": args.publishers, "subscribers": args.subscribers,
+        "sent": sent, "sent_per_s": round(sent / elapsed, 1),
+        "received": received, "received_per_s": round(received / elapsed, 1),
+        "received_mb_per_s": round(sum(s["bytes"] for s in subscriber_stats) / elapsed / 2 ** 20, 3),
+        "loss": round(1.0 - unique / expected, 4) if expected else None,
+        "duplicates": sum(stats["duplicates"] for stats in subscriber_stats),
+        "failed": sum(stats["failed"] for stats in publisher_stats),
+        "late": sum(stats["late"] for stats in publisher_stats),
+        "coalesced": sum(stats["coalesced"] for stats in publisher_stats),
+        "latency_p50_ms": p50, "latency_p90_ms": p90, "latency_p99_ms": p99,
+        "latency_max_ms": latency_max,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", help="Broker host (default: start an in-process broker)")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--mode", choices=("raw", "publisher"), default="raw")
+    parser.add_argument("--publishers", type=int, default=4)
+    parser.add_argument("--subscribers", type=int, default=2)
+    parser.add_argument("--rates", type=float, nargs="+", default=[10.0], help="Frames/s per publisher")
+    parser.add_argument("--qos", type=int, nargs="+", choices=(0, 1, 2), default=[0])
+    parser.add_argument("--encodings", nargs="+", choices=payload_codec.ENCODINGS, default=["json"])
+    parser.add_argument("--detections", type=int, default=10, help="Detections per payload")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of publishing per trial")
+    parser.add_argument("--drain", type=float, default=2.0, help="Seconds to wait for the last messages")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="MQTTPublisher limit (--mode publisher)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    broker = None
+    if args.host is None:
+        broker = Broker(port=0)
+        args.host, args.port = "127.0.0.1", broker.start()
+    try:
+        results = [run_trial(args, rate, qos, encoding)
+                   for rate, qos, encoding in itertools.product(args.rates, args.qos, args.encodings)]
+    finally:
+        if broker is not None:
+            broker.stop()
+
+    if args.json:
+        print(json.dumps({"broker": "in-process" if broker else f"{args.host}:{args.port}",
+                          "cpu_count": os.cpu_count(), "results": results}, indent=2))
+        return
+    print(f"{'in-process broker' if broker else f'broker {args.host}:{args.port}'}, mode {args.mode}, "
+          f"{args.publishers} publishers x {args.subscribers} subscribers, {args.detections} detections, "
+          f"{args.duration:g}s per trial")
+    print(f"{'rate':>6} {'qos':>3} {'encoding':>8} {'sent/s':>8} {'recv/s':>8} {'MB/s':>7} {'loss':>7} "
+          f"{'dup':>5} {'late':>5} {'coal':>5} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for r in results:
+        print(f"{r['rate']:>6g} {r['qos']:>3} {r['encoding']:>8} {r['sent_per_s']:>8} "
+              f"{r['received_per_s']:>8} {r['received_mb_per_s']:>7} {r['loss']:>7} {r['duplicates']:>5} "
+              f"{r['late']:>5} {r['coalesced']:>5} {r['latency_p50_ms']!s:>8} {r['latency_p90_ms']!s:>8} "
+              f"{r['latency_p99_ms']!s:>8} {r['latency_max_ms']!s:>8}")
+
+
+if __name__ == "__main__":
+    main()
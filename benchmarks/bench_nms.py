@@ -0,0 +1,88 @@
+"""Benchmark: NumPy NMS engine vs the legacy cv2.dnn.NMSBoxes path
+
+Run from the repository root:
+    python -m benchmarks.bench_nms [--repeats 200]
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from models.nms import nms, soft_nms
+
+
+def legacy_apply_nms(boxes, scores, class_ids, iou_threshold=0.5):
+    """Reference copy of the original models/yoloNAS.apply_nms"""
+    if len(boxes) == 0:
+        return [], [], []
+
+    boxes_wh = np.zeros_like(boxes)
+    boxes_wh[:, 0] = boxes[:, 0]
+    boxes_wh[:, 1] = boxes[:, 1]
+    boxes_wh[:, 2] = boxes[:, 2] - boxes[:, 0]  # width
+    boxes_wh[:, 3] = boxes[:, 3] - boxes[:, 1]  # height
+
+    indices = cv2.dnn.NMSBoxes(boxes_wh.tolist(), scores.tolist(), 0.5, iou_threshold)
+    if len(indices) > 0:
+        indices = indices.flatten()
+        return boxes[indices], scores[indices], class_ids[indices]
+    else:
+        return [], [], []
+
+
+def make_candidates(rng, count, width=1280, height=720, num_classes=80):
+    """Clustered boxes, like raw detector output around a handful of objects"""
+    num_objects = max(1, count // 20)
+    centers = rng.uniform([0, 0], [width, height], size=(num_objects, 2))
+    sizes = rng.uniform(30, 300, size=(num_objects, 2))
+    owner = rng.integers(0, num_objects, count)
+    jitter = rng.normal(0, 8, size=(count, 4))
+
+    boxes = np.empty((count, 4), dtype=np.float32)
+    boxes[:, :2] = centers[owner] - sizes[owner] / 2
+    boxes[:, 2:] = centers[owner] + sizes[owner] / 2
+    boxes += jitter
+    scores = rng.uniform(0.5, 1.0, count).astype(np.float32)
+    class_ids = rng.integers(0, num_classes, num_objects)[owner]
+    return boxes, scores, class_ids
+
+
+def time_call(func, repeats):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'boxes':>6} {'cv2 (us)':>10} {'numpy (us)':>11} {'per-class':>10} "
+          f"{'top-k 100':>10} {'soft-nms':>10} {'agree':>6}")
+    for count in (10, 100, 1000):
+        boxes, scores, class_ids = make_candidates(rng, count)
+
+        legacy = time_call(lambda: legacy_apply_nms(boxes, scores, class_ids), args.repeats)
+        agnostic = time_call(lambda: nms(boxes, scores, 0.5), args.repeats)
+        per_class = time_call(lambda: nms(boxes, scores, 0.5, class_ids=class_ids), args.repeats)
+        top_k = time_call(lambda: nms(boxes, scores, 0.5, class_ids=class_ids, top_k=100),
+                          args.repeats)
+        soft = time_call(lambda: soft_nms(boxes, scores, class_ids=class_ids), args.repeats)
+
+        # Class-agnostic numpy NMS should keep the same boxes as cv2
+        legacy_boxes = legacy_apply_nms(boxes, scores, class_ids)[0]
+        kept = boxes[nms(boxes, scores, 0.5)]
+        agree = len(legacy_boxes) == len(kept) and np.allclose(
+            np.sort(np.asarray(legacy_boxes), axis=0), np.sort(kept, axis=0))
+
+        print(f"{count:>6} {legacy:>10.1f} {agnostic:>11.1f} {per_class:>10.1f} "
+              f"{top_k:>10.1f} {soft:>10.1f} {str(agree):>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Benchmark: payload size and encode time, binary format vs the current json.dumps path
+
+Run from the repository root:
+    python -m benchmarks.bench_payload [--repeats 2000]
+"""
+import argparse
+import json
+import socket
+import time
+
+import numpy as np
+
+import helpers.payload as payload_codec
+
+
+FRAME_SIZE = (1280, 720)
+
+
+def make_payload(rng, count, frame_id=1):
+    """Results payload shaped like publisher.main's (static blocks included)"""
+    detections = []
+    for track_id in range(count):
+        x1, y1 = rng.uniform(0, 1000), rng.uniform(0, 500)
+        detections.append({
+            "track_id": track_id + 1,
+            "class_id": int(rng.integers(0, 80)),
+            "label": "person",
+            "confidence": round(float(rng.uniform(0.5, 1)), 3),
+            "bbox": [round(x1, 1), round(y1, 1), round(x1 + rng.uniform(20, 280), 1),
+                     round(y1 + rng.uniform(20, 220), 1)],
+            "velocity": [round(float(rng.normal(0, 50)), 1), round(float(rng.normal(0, 20)), 1)],
+            "relative_depth": round(float(rng.uniform()), 3),
+            "depth_confidence": round(float(rng.uniform()), 3),
+        })
+    return {
+        "timestamp": time.time(),
+        "frame_id": frame_id,
+        "device_id": f"rpi_cv_publisher_{socket.gethostname()}",
+        "frame_resolution": {"width": FRAME_SIZE[0], "height": FRAME_SIZE[1]},
+        "processing_info": {"model_confidence_threshold": 0.5, "model_variant": "fp32",
+                            "device": "cpu", "detection_stride": 3},
+        "detector_ran": True,
+        "static": False,
+        "detections": detections,
+    }
+
+
+def time_us(func, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'dets':>5} {'json B':>8} {'bin B':>7} {'ratio':>6} {'json us':>8} {'bin us':>7} "
+          f"{'decode us':>10}")
+    for count in (0, 1, 5, 20, 50):
+        payload = make_payload(rng, count)
+        legacy = lambda: json.dumps(payload, indent=None, separators=(',', ':'))
+        binary = lambda: payload_codec.encode_binary(payload, FRAME_SIZE)
+
+        json_size = len(legacy().encode())
+        encoded = binary()
+        decode = lambda: payload_codec.decode_binary(encoded, FRAME_SIZE)
+
+        decoded = decode()
+        assert len(decoded["detections"]) == count
+
+        print(f"{count:>5} {json_size:>8} {len(encoded):>7} {json_size / len(encoded):>6.1f} "
+              f"{time_us(legacy, args.repeats):>8.1f} {time_us(binary, args.repeats):>7.1f} "
+              f"{time_us(decode, args.repeats):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""End-to-end replay benchmark with fake camera, fake (or real) detector and in-memory MQTT
+
+Drives the same functions as the live loop, frame by frame:
+    capture -> preprocess -> inference -> process_output -> apply_nms
+    -> DecisionEngine.update (or the legacy decide_direction) -> MQTTPublisher.publish_results
+and reports per-stage p50/p95/p99 latency, throughput and per-stage
+allocations (tracemalloc, measured on a separate pass) as JSON.
+
+Run from the repository root:
+    python -m benchmarks.bench_replay [--source synthetic|video.mp4|frames/]
+        [--backend stub --latency-ms 20 | --backend ort --model yolo_nas_s.onnx]
+        [--decision grid|legacy] [--record DIR [--record-interval 0]]
+        [--frames 300] [--output results.json]
+
+--record runs the annotated-frame recorder; --record-interval 0 submits every
+frame (a stress test of its queue: inference timings should not move).
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+import models.yoloNAS as yolo_nas_model
+from models.decision import DecisionEngine, class_weight_table
+from models.preprocessing import Preprocessor
+from models.stub_detector import StubBackend
+from helpers.recorder import FrameRecorder
+import publisher
+from benchmarks.fakes import MemorySink, OrtBackend, ReplaySource
+
+
+STAGES = ("capture", "preprocess", "inference", "postprocess", "nms", "decide", "record", "publish")
+
+
+class ReplayPipeline:
+    """One frame through every stage; each stage is a method so it can be timed on its own"""
+
+    def __init__(self, source, backend, mqtt_publisher, preprocess="preprocessor",
+                 input_size=yolo_nas_model.INPUT_SIZE, letterbox=False, confidence=0.5, decision="grid",
+                 recorder=None):
+        self.source = source
+        self.backend = backend
+        self.mqtt_publisher = mqtt_publisher
+        self.input_size = input_size
+        self.confidence = confidence
+        self.preprocessor = Preprocessor(input_size, letterbox=letterbox) if preprocess == "preprocessor" else None
+        self.recorder = recorder
+        self.decision_engine = None
+        if decision == "grid":
+            self.decision_engine = DecisionEngine(class_weights=class_weight_table(yolo_nas_model.CLASS_NAMES))
+        self.frame_id = 0
+
+    def run_frame(self, timings=None, on_stage=None):
+        """Process one frame; stage durations (s) are appended to timings[stage]"""
+        clock = time.perf_counter
+        marks = [clock()]
+
+        def mark(stage):
+            marks.append(clock())
+            if timings is not None:
+                timings[stage].append(marks[-1] - marks[-2])
+            if on_stage is not None:
+                on_stage(stage)
+
+        frame = self.source.read()
+        mark("capture")
+
+        if self.preprocessor is not None:
+            _, input_tensor, orig_size = self.preprocessor(frame)
+        else:
+            _, input_tensor, orig_size = yolo_nas_model.preprocess_image(frame, self.input_size)
+        mark("preprocess")
+
+        outputs = self.backend.run(input_tensor)
+        mark("inference")
+
+        boxes, scores, class_ids = yolo_nas_model.process_output(
+            outputs, self.confidence, orig_size, self.preprocessor,
+            allowed_classes=publisher.ALLOWED_CLASSES, input_size=self.input_size)
+        mark("postprocess")
+
+        boxes, scores, class_ids = yolo_nas_model.apply_nms(boxes, scores, class_ids)
+        mark("nms")
+
+        if self.decision_engine is not None:
+            decision = self.decision_engine.update(boxes, orig_size, class_ids)
+        else:
+            decision = yolo_nas_model.decide_direction(yolo_nas_model.boxes_to_labels(boxes, orig_size))
+        mark("decide")
+
+        if self.recorder is not None:
+            self.recorder.record(frame, (boxes, scores, class_ids), frame_id=self.frame_id,
+                                 event=not self.recorder.interval)
+        mark("record")
+
+        self.frame_id += 1
+        detections = [{
+            "class_id": int(class_id),
+            "label": yolo_nas_model.CLASS_NAMES[class_id],
+            "confidence": round(float(score), 3),
+            "bbox": [round(float(v), 1) for v in box],
+        } for box, score, class_id in zip(boxes, scores, class_ids)]
+        self.mqtt_publisher.publish_results({
+            "timestamp": time.time(),
+            "frame_id": self.frame_id,
+            "device_id": publisher.MQTT_CLIENT_ID,
+            "frame_resolution": {"width": orig_size[0], "height": orig_size[1]},
+            "decision": decision,
+            "detector_ran": True,
+            "static": False,
+            "detections": detections,
+        })
+        mark("publish")
+        return marks[-1] - marks[0]
+
+
+def make_publisher(encoding):
+    """MQTTPublisher wired to an in-memory sink instead of a broker (no spool)"""
+    publisher.SPOOL_ENABLED = False
+    mqtt_publisher = publisher.MQTTPublisher(encoding)
+    sink = MemorySink()
+    sink.on_publish = mqtt_publisher.on_publish
+    mqtt_publisher.client = sink
+    mqtt_publisher.connected = True
+    return mqtt_publisher, sink
+
+
+def percentiles_ms(values):
+    values = np.asarray(values) * 1000.0
+    return {"p50": round(float(np.percentile(values, 50)), 3),
+            "p95": round(float(np.percentile(values, 95)), 3),
+            "p99": round(float(np.percentile(values, 99)), 3),
+            "mean": round(float(values.mean()), 3)}
+
+
+def measure_allocations(pipeline, frames):
+    """Average peak and retained bytes per stage (tracemalloc slows everything down)"""
+    peaks = {stage: 0 for stage in STAGES}
+    retained = {stage: 0 for stage in STAGES}
+    state = {}
+
+    def on_stage(stage):
+        current, peak = tracemalloc.get_traced_memory()
+        peaks[stage] += max(0, peak - state["before"])
+        retained[stage] += current - state["before"]
+        tracemalloc.reset_peak()
+        state["before"] = tracemalloc.get_traced_memory()[0]
+
+    tracemalloc.start()
+    try:
+        for _ in range(frames):
+            tracemalloc.reset_peak()
+            state["before"] = tracemalloc.get_traced_memory()[0]
+            pipeline.run_frame(on_stage=on_stage)
+    finally:
+        tracemalloc.stop()
+    return {stage: {"peak_kb": round(peaks[stage] / frames / 1024, 1),
+                    "retained_kb": round(retained[stage] / frames / 1024, 1)} for stage in STAGES}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", default="synthetic", help="'synthetic', a video file or an image folder")
+    parser.add_argument("--width", type=int, default=1280, help="Synthetic frame width")
+    parser.add_argument("--height", type=int, default=720, help="Synthetic frame height")
+    parser.add_argument("--backend", choices=("stub", "ort"), default="stub")
+    parser.add_argument("--model", default=yolo_nas_model.MODEL_PATH)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Stub inference latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Stub latency jitter (+/-)")
+    parser.add_argument("--preprocess", choices=("preprocessor", "legacy"), default="preprocessor",
+                        help="models/preprocessing.Preprocessor or the legacy preprocess_image")
+    parser.add_argument("--letterbox", action="store_true")
+    parser.add_argument("--encoding", choices=("json", "binary", "both"), default="json")
+    parser.add_argument("--confidence", type=float, default=0.5)
+    parser.add_argument("--decision", choices=("grid", "legacy"), default="grid")
+    parser.add_argument("--record", metavar="DIR", help="Record annotated frames into DIR")
+    parser.add_argument("--record-interval", type=float, default=1.0,
+                        help="Seconds between recorded frames (0: every frame)")
+    parser.add_argument("--record-max-mb", type=float, default=50)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--alloc-frames", type=int, default=20, help="0 skips the allocation pass")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    source = ReplaySource(args.source, size=(args.width, args.height))
+    if args.backend == "ort":
+        backend = OrtBackend(args.model, yolo_nas_model.INPUT_SIZE, intra_op_threads=args.threads)
+    else:
+        backend = StubBackend(args.latency_ms, args.jitter_ms)
+    mqtt_publisher, sink = make_publisher(args.encoding)
+    recorder = None
+    if args.record:
+        recorder = FrameRecorder(args.record, max_bytes=int(args.record_max_mb * 2 ** 20),
+                                 interval=args.record_interval, annotate=yolo_nas_model.draw_boxes)
+    pipeline = ReplayPipeline(source, backend, mqtt_publisher, args.preprocess,
+                              letterbox=args.letterbox, confidence=args.confidence,
+                              decision=args.decision, recorder=recorder)
+
+    for _ in range(args.warmup):
+        pipeline.run_frame()
+
+    timings = {stage: [] for stage in STAGES}
+    totals = []
+    start_time = time.perf_counter()
+    for _ in range(args.frames):
+        totals.append(pipeline.run_frame(timings))
+    wall_time = time.perf_counter() - start_time
+
+    report = {
+        "config": {"source": args.source, "backend": backend.name, "preprocess": args.preprocess,
+                   "letterbox": args.letterbox, "encoding": args.encoding, "decision": args.decision,
+                   "record_interval": args.record_interval if args.record else None,
+                   "input_size": list(yolo_nas_model.INPUT_SIZE), "frames": args.frames},
+        "throughput_fps": round(args.frames / wall_time, 2),
+        "end_to_end_ms": percentiles_ms(totals),
+        "stages_ms": {stage: percentiles_ms(timings[stage]) for stage in STAGES},
+        "mqtt": sink.summary(),
+    }
+    if args.alloc_frames:
+        report["allocations"] = measure_allocations(pipeline, args.alloc_frames)
+    if recorder is not None:
+        recorder.close()
+        report["recorder"] = recorder.stats()
+    source.release()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"{report['throughput_fps']} FPS, end-to-end p95 {report['end_to_end_ms']['p95']} ms "
+              f"-> {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
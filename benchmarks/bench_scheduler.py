@@ -0,0 +1,132 @@
+"""Benchmark: adaptive scheduler vs fixed settings through a thermal-throttling episode
+
+Simulated clock, no sleeping: a camera delivers frames every 1/--fps s to
+one worker that keeps only the newest waiting frame (like the pipeline's
+LatestQueue). A detector frame costs --detect-ms scaled by the input area,
+a depth refresh --depth-ms, and a tracked frame --track-ms. In the middle
+phase every cost is multiplied by --throttle and the CPU reads --hot-temp C.
+The same AdaptiveScheduler as the publisher picks the operating point from
+the observed latencies; "fixed" stays at the publisher's default point.
+
+Run from the repository root:
+    python -m benchmarks.bench_scheduler [--detect-ms 180 --depth-ms 120 --throttle 1.8]
+        [--phases 60 120 60] [--budget-ms 500] [--json]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+import publisher
+from helpers.scheduler import AdaptiveScheduler
+
+
+def simulate(points, args, adaptive):
+    temperature = [args.cool_temp]
+    scheduler = AdaptiveScheduler(points, args.budget_ms / 1000.0, publisher.ADAPTIVE_START_LEVEL,
+                                  stage_budget=publisher.STAGE_BUDGET, read_temperature=lambda: temperature[0])
+    fixed = scheduler.current
+    period = 1.0 / args.fps
+    phase_ends = np.cumsum(args.phases)
+    results = [{"latencies": [], "levels": [], "frames": 0, "dropped": 0, "detections": 0}
+               for _ in args.phases]
+
+    busy_until = 0.0
+    waiting = None
+    frames = detector_frames = 0
+    observe_time = 0.0
+    now = 0.0
+    while now < phase_ends[-1]:
+        phase = int(np.searchsorted(phase_ends, now, side="right"))
+        throttle = args.throttle if phase == 1 else 1.0
+        temperature[0] = args.hot_temp if phase == 1 else args.cool_temp
+        result = results[phase]
+        result["frames"] += 1
+        if waiting is not None:
+            results[waiting[1]]["dropped"] += 1  # Replaced by the newer frame
+        waiting = (now, phase)
+
+        # The worker takes the newest frame whenever it is free
+        while waiting is not None and busy_until <= now + period:
+            capture, capture_phase = waiting
+            start = max(busy_until, capture)
+            if start >= now + period:
+                break
+            waiting = None
+            point = scheduler.current if adaptive else fixed
+            detector_ran = frames % point["detection_stride"] == 0
+            frames += 1
+            area = point["input_size"][0] * point["input_size"][1] / (640 * 640)
+            detect = (args.detect_ms * area if detector_ran else args.track_ms) * throttle / 1000.0
+            depth = 0.0
+            if detector_ran:
+                if detector_frames % point["depth_interval"] == 0:
+                    depth = args.depth_ms * throttle / 1000.0
+                detector_frames += 1
+                results[capture_phase]["detections"] += 1
+            busy_until = start + detect + depth
+            results[capture_phase]["latencies"].append(busy_until - capture)
+            results[capture_phase]["levels"].append(point["level"])
+            if adaptive:
+                t = time.perf_counter()
+                scheduler.observe(busy_until - capture, {"detect": detect, "depth": depth},
+                                  point["level"], now=busy_until)
+                observe_time += time.perf_counter() - t
+        now += period
+
+    summary = []
+    for duration, result in zip(args.phases, results):
+        latencies = np.array(result["latencies"]) * 1000.0
+        summary.append({
+            "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+            "p90_ms": round(float(np.percentile(latencies, 90)), 1),
+            "over_budget": round(float(np.mean(latencies > args.budget_ms)), 3),
+            "dropped": round(result["dropped"] / max(result["frames"], 1), 3),
+            "detections_per_s": round(result["detections"] / duration, 2),
+            "mean_level": round(float(np.mean(result["levels"])), 2),
+        })
+    return {"mode": "adaptive" if adaptive else "fixed", "changes": scheduler.changes,
+            "observe_us": round(observe_time / max(frames, 1) * 1e6, 2), "phases": summary}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fps", type=float, default=publisher.CAMERA_FRAMERATE)
+    parser.add_argument("--detect-ms", type=float, default=180.0, help="Detector cost at 640x640")
+    parser.add_argument("--depth-ms", type=float, default=120.0, help="Depth refresh cost")
+    parser.add_argument("--track-ms", type=float, default=3.0, help="Cost of a tracked-only frame")
+    parser.add_argument("--throttle", type=float, default=1.8, help="Cost multiplier while throttled")
+    parser.add_argument("--cool-temp", type=float, default=62.0)
+    parser.add_argument("--hot-temp", type=float, default=81.0)
+    parser.add_argument("--phases", type=float, nargs=3, default=[60.0, 120.0, 60.0],
+                        help="Seconds before, during and after throttling")
+    parser.add_argument("--budget-ms", type=float, default=publisher.LATENCY_BUDGET * 1000.0)
+    parser.add_argument("--dynamic-size", action="store_true",
+                        help="Model accepts smaller inputs (otherwise only stride/depth change)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    points = publisher.OPERATING_POINTS
+    if not args.dynamic_size:
+        points = [dict(point, input_size=publisher.YOLO_INPUT_SIZE) for point in points]
+    results = [simulate(points, args, adaptive) for adaptive in (False, True)]
+
+    if args.json:
+        print(json.dumps({"args": vars(args), "results": results}, indent=2))
+        return
+    print(f"budget {args.budget_ms:.0f} ms, {args.fps:g} FPS, throttle x{args.throttle:g} "
+          f"in phase 2, {'dynamic' if args.dynamic_size else 'fixed'} input size")
+    print(f"{'mode':>9} {'phase':>5} {'p50 ms':>8} {'p90 ms':>8} {'>budget':>8} {'dropped':>8} "
+          f"{'det/s':>6} {'level':>6}")
+    for result in results:
+        for phase, summary in enumerate(result["phases"], 1):
+            print(f"{result['mode']:>9} {phase:>5} {summary['p50_ms']:>8} {summary['p90_ms']:>8} "
+                  f"{summary['over_budget']:>8} {summary['dropped']:>8} "
+                  f"{summary['detections_per_s']:>6} {summary['mean_level']:>6}")
+        if result["mode"] == "adaptive":
+            print(f"adaptive: {result['changes']} changes, observe() {result['observe_us']} us/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Report cold-start vs warm-start time of the ONNX Runtime session manager
+
+Cold start: no cached optimized graph, ORT optimizes the model and saves it.
+Warm start: the cached optimized graph is loaded and optimization is skipped.
+
+Run from the repository root:
+    python -m benchmarks.bench_session_startup [--model yolo_nas_s.onnx] [--runs 20]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from models.onnx_session import OnnxSession, optimized_model_path, OPTIMIZATION_LEVELS
+
+
+def start_session(args, cache_optimized=True):
+    start_time = time.perf_counter()
+    session = OnnxSession(args.model, input_shape=(1, 3, args.size, args.size),
+                          intra_op_threads=args.intra_threads,
+                          inter_op_threads=args.inter_threads,
+                          optimization_level=args.optimization_level,
+                          cache_optimized=cache_optimized,
+                          warmup_runs=args.warmup_runs)
+    total = time.perf_counter() - start_time
+    return session, total
+
+
+def steady_state_ms(session, runs):
+    input_tensor = np.random.default_rng(0).random(session.input_shape, dtype=np.float32)
+    latencies = []
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        session.run(input_tensor)
+        latencies.append(time.perf_counter() - start_time)
+    return np.median(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="yolo_nas_s.onnx")
+    parser.add_argument("--size", type=int, default=640)
+    parser.add_argument("--intra-threads", type=int, default=4)
+    parser.add_argument("--inter-threads", type=int, default=1)
+    parser.add_argument("--optimization-level", default="all", choices=list(OPTIMIZATION_LEVELS))
+    parser.add_argument("--warmup-runs", type=int, default=3)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    cached_path = optimized_model_path(args.model, args.optimization_level)
+    if os.path.exists(cached_path):
+        os.remove(cached_path)
+
+    cold, cold_total = start_session(args)
+    cold_run = steady_state_ms(cold, args.runs)
+    cold_timings = cold.timings
+    del cold
+
+    warm, warm_total = start_session(args)
+    warm_run = steady_state_ms(warm, args.runs)
+
+    print(f"{'':<12} {'load':>9} {'1st run':>9} {'warm-up':>9} {'total':>9} {'p50 run':>9}")
+    for name, total, run_ms, timings in (("cold start", cold_total, cold_run, cold_timings),
+                                         ("warm start", warm_total, warm_run, warm.timings)):
+        print(f"{name:<12} {timings['load'] * 1000:>7.0f}ms {timings.get('first_run', 0) * 1000:>7.0f}ms "
+              f"{timings['warmup'] * 1000:>7.0f}ms {total * 1000:>7.0f}ms {run_ms:>7.1f}ms")
+    print(f"Optimized graph cached at {cached_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark: tiled high-resolution detection, latency and detections vs tile budget
+
+For each tile budget, TileDetector.detect() runs the full-frame pass plus up
+to that many native-resolution tiles (walking path region first, then tiles
+on the small boxes of the previous frame) and merges them with cross-tile
+NMS. Budget 0 is the plain single-pass detector.
+
+Run from the repository root:
+    python -m benchmarks.bench_tiling [--model yolo_nas_s.onnx] [--video clip.mp4]
+        [--budgets 0 1 2 4] [--frames 50] [--time-budget-ms 150] [--json]
+
+Without --model a small synthetic detector is generated (benchmarks/fakes.py):
+latencies show the per-tile overhead, but its detections are meaningless.
+Counting small objects found needs the real model and a recorded --video.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+import models.yoloNAS as yolo_nas_model
+from helpers.metrics import Metrics
+from models.onnx_session import OnnxSession
+from models.tiling import TileDetector
+from benchmarks.fakes import SyntheticScene, make_synthetic_detector
+
+
+def load_frames(args):
+    if args.video is None:
+        scene = SyntheticScene((args.width, args.height))
+        return [scene.render(i).copy() for i in range(args.frames)]
+    capture = cv2.VideoCapture(args.video)
+    frames = []
+    while len(frames) < args.frames:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(frame)
+    capture.release()
+    if not frames:
+        raise SystemExit(f"No frames read from {args.video}")
+    return frames
+
+
+def run_budget(session, budget, frames, args):
+    time_budget = args.time_budget_ms / 1000.0 if args.time_budget_ms else None
+    detector = TileDetector(session, yolo_nas_model.INPUT_SIZE, max_tiles=budget,
+                            time_budget=time_budget, confidence_threshold=args.confidence)
+    for frame in frames[:3]:  # Warm-up, including the preprocessors' buffers
+        detector.detect(frame)
+    detector.previous_boxes = None
+    metrics = detector.metrics = Metrics()
+
+    latencies, tiles, detections, small = [], [], [], []
+    frame_area = frames[0].shape[0] * frames[0].shape[1]
+    for frame in frames:
+        start = time.perf_counter()
+        boxes, _, _ = detector.detect(frame)
+        latencies.append(time.perf_counter() - start)
+        tiles.append(len(detector.last_tiles))
+        detections.append(len(boxes))
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        small.append(int(np.count_nonzero(areas < detector.small_box_area * frame_area)))
+
+    stages = metrics.summary()["stages_ms"]
+    return {"budget": budget,
+            "latency_p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+            "latency_p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 2),
+            "tiles_per_frame": round(float(np.mean(tiles)), 2),
+            "detections_per_frame": round(float(np.mean(detections)), 2),
+            "small_per_frame": round(float(np.mean(small)), 2),
+            "stage_p50_ms": {stage: values[0] for stage, values in stages.items()}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", help="Detector model (default: synthetic detector)")
+    parser.add_argument("--video", help="Video file to read frames from (default: synthetic scene)")
+    parser.add_argument("--threads", type=int, default=os.cpu_count(), help="ORT intra-op threads")
+    parser.add_argument("--budgets", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--time-budget-ms", type=float, default=None,
+                        help="Per-frame time budget the tiles may not exceed")
+    parser.add_argument("--confidence", type=float, default=0.5)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    frames = load_frames(args)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        model_path = args.model or make_synthetic_detector(os.path.join(temp_dir, "synthetic.onnx"))
+        session = OnnxSession(model_path, intra_op_threads=args.threads, cache_optimized=False,
+                              warmup_runs=3)
+        results = [run_budget(session, budget, frames, args) for budget in args.budgets]
+
+    if args.json:
+        print(json.dumps({"model": args.model or "synthetic", "video": args.video,
+                          "cpu_count": os.cpu_count(), "results": results}, indent=2))
+        return
+
+    print(f"model {args.model or 'synthetic'}, {len(frames)} frames "
+          f"{frames[0].shape[1]}x{frames[0].shape[0]}, {args.threads} thread(s)")
+    print(f"{'budget':>6} {'p50 ms':>8} {'p95 ms':>8} {'tiles':>6} {'dets':>6} {'small':>6} "
+          f"{'infer ms':>9} {'tiles ms':>9} {'nms ms':>7}")
+    for result in results:
+        stages = result["stage_p50_ms"]
+        print(f"{result['budget']:>6} {result['latency_p50_ms']:>8} {result['latency_p95_ms']:>8} "
+              f"{result['tiles_per_frame']:>6} {result['detections_per_frame']:>6} "
+              f"{result['small_per_frame']:>6} {stages.get('inference', 0):>9} "
+              f"{stages.get('tiles', 0):>9} {stages.get('nms', 0):>7}")
+
+
+if __name__ == "__main__":
+    main()
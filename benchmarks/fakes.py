@@ -0,0 +1,202 @@
+"""Stand-ins for the camera, the detector and the MQTT broker
+
+Used by the benchmarks so the pipeline can run on a dev machine or in CI
+without a Picamera2, a yolo_nas_s.onnx or a running broker. The fake
+detector itself lives in models/stub_detector.py (the "stub" backend).
+"""
+import itertools
+import os
+
+import cv2
+import numpy as np
+
+from models.quantization import list_images
+import models.yoloNAS as yolo_nas_model
+
+
+# --- Frame sources ---
+
+class ReplaySource:
+    """Frames from a video file, an image folder or a synthetic scene
+
+    source is a video path, a folder of images or "synthetic". Image folders
+    are loaded into memory up front so disk reads do not show up as capture
+    time. Video and folder sources loop when exhausted.
+    """
+
+    def __init__(self, source="synthetic", size=(1280, 720), max_images=200, seed=0):
+        self.source = source
+        self.size = size
+        self.capture = None
+        self.images = None
+        self.frame_id = 0
+
+        if source == "synthetic":
+            self.scene = SyntheticScene(size, seed=seed)
+        elif os.path.isdir(source):
+            self.images = [cv2.imread(path) for path in list_images(source, max_images)]
+            self.images = [image for image in self.images if image is not None]
+            if not self.images:
+                raise ValueError(f"No readable images in {source}")
+            self.images = itertools.cycle(self.images)
+        else:
+            self.capture = cv2.VideoCapture(source)
+            if not self.capture.isOpened():
+                raise ValueError(f"Cannot open video {source}")
+
+    def read(self):
+        """Next BGR frame (never runs out)"""
+        self.frame_id += 1
+        if self.images is not None:
+            return next(self.images)
+        if self.capture is not None:
+            ret, frame = self.capture.read()
+            if not ret:
+                self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ret, frame = self.capture.read()
+            return frame
+        return self.scene.render(self.frame_id)
+
+    def release(self):
+        if self.capture is not None:
+            self.capture.release()
+
+
+class SyntheticScene:
+    """Noisy background with a few rectangles moving at constant velocity"""
+
+    def __init__(self, size=(1280, 720), objects=4, seed=0):
+        rng = np.random.default_rng(seed)
+        width, height = size
+        self.background = rng.integers(0, 60, (height, width, 3), dtype=np.uint8)
+        self.frame = np.empty_like(self.background)
+        self.size = size
+        self.starts = rng.uniform((0, 0), (width * 0.8, height * 0.8), (objects, 2))
+        self.sizes = rng.uniform((40, 60), (width * 0.2, height * 0.4), (objects, 2))
+        self.velocities = rng.uniform(-8, 8, (objects, 2))
+        self.colors = rng.integers(80, 255, (objects, 3)).tolist()
+
+    def boxes(self, frame_id):
+        """Ground-truth xyxy boxes of the objects at frame_id"""
+        width, height = self.size
+        span = np.array([width, height]) - self.sizes
+        # Bounce between the frame edges
+        positions = np.abs((self.starts + self.velocities * frame_id) % (2 * span) - span)
+        positions = span - positions
+        return np.hstack([positions, positions + self.sizes]).astype(np.float32)
+
+    def render(self, frame_id):
+        np.copyto(self.frame, self.background)
+        for (x1, y1, x2, y2), color in zip(self.boxes(frame_id).astype(int), self.colors):
+            cv2.rectangle(self.frame, (x1, y1), (x2, y2), color, -1)
+        return self.frame
+
+
+# --- Inference backends ---
+
+class OrtBackend:
+    """The real detector (ONNX Runtime session from models/yoloNAS.load_session)"""
+
+    def __init__(self, model_path=yolo_nas_model.MODEL_PATH, input_size=yolo_nas_model.INPUT_SIZE,
+                 **session_options):
+        self.session = yolo_nas_model.load_session(model_path, input_size, **session_options)
+        self.name = f"ort:{os.path.basename(model_path)}"
+
+    def run(self, input_tensor):
+        return self.session.run(input_tensor)
+
+
+def make_synthetic_detector(path, input_size=yolo_nas_model.INPUT_SIZE, batch=1, seed=0):
+    """Write a small conv net with YOLO-NAS shaped outputs to path (needs onnx)
+
+    Four strided convolutions (about 0.3 GMAC at 640x640, a fraction of the
+    real model) end in [batch, N, 4] boxes in input pixels and [batch, N, 80]
+    scores, so ONNX Runtime, process_output and NMS do real work on a
+    machine without yolo_nas_s.onnx. batch=None makes the batch dimension
+    dynamic; otherwise it is fixed, like a default export.
+    """
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+
+    rng = np.random.default_rng(seed)
+    width, height = input_size
+    layers = [(3, 16, 2), (16, 32, 2), (32, 64, 2), (64, 84, 4)]  # (in, out, stride)
+    nodes, initializers = [], []
+    previous = "input"
+    for i, (channels_in, channels_out, stride) in enumerate(layers):
+        weight = rng.normal(0, (2 / (channels_in * 9)) ** 0.5, (channels_out, channels_in, 3, 3))
+        initializers.append(numpy_helper.from_array(weight.astype(np.float32), f"w{i}"))
+        nodes.append(helper.make_node("Conv", [previous, f"w{i}"], [f"conv{i}"],
+                                      strides=[stride, stride], pads=[1, 1, 1, 1]))
+        if i < len(layers) - 1:
+            nodes.append(helper.make_node("Relu", [f"conv{i}"], [f"relu{i}"]))
+            previous = f"relu{i}"
+        else:
+            previous = f"conv{i}"
+
+    initializers += [numpy_helper.from_array(np.array([0, 84, -1], dtype=np.int64), "head_shape"),
+                     numpy_helper.from_array(np.array([4, 80], dtype=np.int64), "split"),
+                     numpy_helper.from_array(np.array([max(input_size)], dtype=np.float32), "box_scale")]
+    nodes += [
+        helper.make_node("Reshape", [previous, "head_shape"], ["head"]),  # 0 keeps the batch dim
+        helper.make_node("Transpose", ["head"], ["anchors"], perm=[0, 2, 1]),
+        helper.make_node("Split", ["anchors", "split"], ["box_logits", "score_logits"], axis=2),
+        helper.make_node("Sigmoid", ["box_logits"], ["box_units"]),
+        helper.make_node("Mul", ["box_units", "box_scale"], ["boxes"]),
+        helper.make_node("Sigmoid", ["score_logits"], ["scores"]),
+    ]
+    anchors = (width // 32) * (height // 32)
+    batch_dim = "batch" if batch is None else batch
+    graph = helper.make_graph(
+        nodes, "synthetic_detector",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, [batch_dim, 3, height, width])],
+        [helper.make_tensor_value_info("boxes", TensorProto.FLOAT, [batch_dim, anchors, 4]),
+         helper.make_tensor_value_info("scores", TensorProto.FLOAT, [batch_dim, anchors, 80])],
+        initializers)
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8  # Loadable by older ONNX Runtime releases too
+    onnx.checker.check_model(model)
+    onnx.save(model, path)
+    return path
+
+
+# --- MQTT ---
+
+class _MessageInfo:
+    def __init__(self, mid):
+        self.mid = mid
+        self.rc = 0  # mqtt.MQTT_ERR_SUCCESS
+
+
+class MemorySink:
+    """In-memory replacement for a connected paho client (publish side only)
+
+    Keeps per-topic message/byte counts and the last payload, and acknowledges
+    every message immediately through on_publish like a fast local broker.
+    """
+
+    def __init__(self, keep_payloads=False):
+        self.on_publish = None
+        self.keep_payloads = keep_payloads
+        self.payloads = []
+        self.messages = {}
+        self.bytes = {}
+        self.last = {}
+        self.mid = 0
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        self.mid += 1
+        size = len(payload) if payload is not None else 0
+        self.messages[topic] = self.messages.get(topic, 0) + 1
+        self.bytes[topic] = self.bytes.get(topic, 0) + size
+        self.last[topic] = payload
+        if self.keep_payloads:
+            self.payloads.append((topic, payload))
+        info = _MessageInfo(self.mid)
+        if self.on_publish is not None:
+            self.on_publish(self, None, info.mid)
+        return info
+
+    def summary(self):
+        return {topic: {"messages": self.messages[topic], "bytes": self.bytes[topic]}
+                for topic in sorted(self.messages)}
@@ -0,0 +1,130 @@
+import time
+
+
+# --- Delta / change-only publishing ---
+#
+# keyframe: {"type": "keyframe", "seq", "timestamp", "fields": {...}, "detections": [...]}
+# delta:    {"type": "delta", "seq", "timestamp", "fields": {changed fields},
+#            "added": [...], "updated": [...], "removed": [track ids]}
+#
+# seq increases by one per published message, so a subscriber that sees a gap
+# knows it missed a delta and asks for a keyframe on the resync topic.
+
+KEYFRAME = "keyframe"
+DELTA = "delta"
+
+
+class DeltaEncoder:
+    """Turns successive full states into keyframes and change-only deltas
+
+    Detections are keyed by track id and compared against the last *published*
+    state, so slow drifts still get published once they exceed the thresholds.
+    When nothing changed, encode() returns None and nothing needs to be sent.
+    """
+
+    def __init__(self, keyframe_interval=10.0, move_threshold=8.0, value_threshold=0.05,
+                 key="track_id"):
+        self.keyframe_interval = keyframe_interval
+        self.move_threshold = move_threshold      # px on any box coordinate
+        self.value_threshold = value_threshold    # confidence / depth change
+        self.key = key
+
+        self.seq = 0
+        self.published = {}
+        self.published_fields = {}
+        self.last_keyframe = None
+        self.keyframe_requested = True
+
+    def request_keyframe(self):
+        """Send the full state with the next message (e.g. a subscriber asked to resync)"""
+        self.keyframe_requested = True
+
+    def _changed(self, previous, current):
+        for a, b in zip(previous["bbox"], current["bbox"]):
+            if abs(a - b) > self.move_threshold:
+                return True
+        for name in ("confidence", "relative_depth", "depth_confidence"):
+            if abs(previous.get(name, 0.0) - current.get(name, 0.0)) > self.value_threshold:
+                return True
+        return previous.get("class_id") != current.get("class_id")
+
+    def encode(self, detections, fields=None, timestamp=None):
+        """Return the message to publish for this state, or None when nothing changed"""
+        timestamp = time.time() if timestamp is None else timestamp
+        fields = fields or {}
+        current = {obj[self.key]: obj for obj in detections}
+
+        if (self.keyframe_requested or self.last_keyframe is None
+                or timestamp - self.last_keyframe >= self.keyframe_interval):
+            self.keyframe_requested = False
+            self.last_keyframe = timestamp
+            self.published = current
+            self.published_fields = dict(fields)
+            self.seq += 1
+            return {"type": KEYFRAME, "seq": self.seq, "timestamp": timestamp,
+                    "fields": fields, "detections": list(detections)}
+
+        added = [obj for key, obj in current.items() if key not in self.published]
+        removed = [key for key in self.published if key not in current]
+        updated = [obj for key, obj in current.items()
+                   if key in self.published and self._changed(self.published[key], obj)]
+        changed_fields = {name: value for name, value in fields.items()
+                          if self.published_fields.get(name) != value}
+
+        if not (added or removed or updated or changed_fields):
+            return None
+
+        for obj in added + updated:
+            self.published[obj[self.key]] = obj
+        for key in removed:
+            del self.published[key]
+        self.published_fields.update(changed_fields)
+
+        self.seq += 1
+        message = {"type": DELTA, "seq": self.seq, "timestamp": timestamp}
+        if changed_fields:
+            message["fields"] = changed_fields
+        if added:
+            message["added"] = added
+        if updated:
+            message["updated"] = updated
+        if removed:
+            message["removed"] = removed
+        return message
+
+
+class DeltaDecoder:
+    """Rebuilds the full state from keyframes and deltas on the subscriber side"""
+
+    def __init__(self, key="track_id"):
+        self.key = key
+        self.seq = None
+        self.detections = {}
+        self.fields = {}
+        self.in_sync = False
+
+    def apply(self, message):
+        """Apply one message; returns False when a gap was detected (request a resync)"""
+        if message["type"] == KEYFRAME:
+            self.detections = {obj[self.key]: obj for obj in message["detections"]}
+            self.fields = dict(message.get("fields", {}))
+            self.seq = message["seq"]
+            self.in_sync = True
+            return True
+
+        if not self.in_sync or message["seq"] != self.seq + 1:
+            # Missed a message (or joined mid-stream): wait for the next keyframe
+            self.in_sync = False
+            return False
+
+        self.seq = message["seq"]
+        self.fields.update(message.get("fields", {}))
+        for obj in message.get("added", []) + message.get("updated", []):
+            self.detections[obj[self.key]] = obj
+        for key in message.get("removed", []):
+            self.detections.pop(key, None)
+        return True
+
+    def state(self):
+        """Current reconstructed state as (fields, detections)"""
+        return dict(self.fields), list(self.detections.values())
@@ -0,0 +1,294 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+# --- Camera frame sources with a background grabber ---
+#
+# A grabber thread writes every captured frame into a preallocated ring of
+# buffers, so capture latency is off the processing path. Consumers take the
+# latest frame as a zero-copy view and hold its slot until release(); the
+# grabber never writes into a held slot (it drops the new frame instead when
+# every slot is held). Holds older than hold_timeout are reclaimed, so an item
+# lost in the pipeline cannot leak a slot forever.
+
+# seq: capture sequence number (1, 2, ...); timestamp: wall clock (time.time)
+# monotonic: time.monotonic() at capture; sensor_timestamp: driver timestamp in ns, or None
+# image: view of the main frame in the ring; lores: view of the lores frame, or None
+Frame = namedtuple("Frame", ["seq", "slot", "timestamp", "monotonic", "sensor_timestamp", "image", "lores"])
+
+RING_SIZE = 6
+HOLD_TIMEOUT = 5.0  # Seconds before a slot held by a consumer is reclaimed
+
+
+class FrameSource:
+    """Base class: subclasses implement _open, _grab, _skip and _close"""
+
+    def __init__(self, ring_size=RING_SIZE, hold_timeout=HOLD_TIMEOUT):
+        if ring_size < 3:
+            raise ValueError("A frame ring needs at least 3 slots (latest, held, being written)")
+        self.ring_size = ring_size
+        self.hold_timeout = hold_timeout
+        self.condition = threading.Condition()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.images = None
+        self.lores = None
+        self.frames = [None] * ring_size
+        self.holds = [0] * ring_size
+        self.held_since = [0.0] * ring_size
+        self.latest_slot = None
+        self.seq = 0
+        self.captured = 0
+        self.dropped = 0
+        self.running = False
+        self.on_frame = None  # Called with the source from the grabber thread after each new frame
+
+    # Subclass interface
+    def _open(self):
+        """Start the device; return (image_shape, image_dtype, lores_shape or None, lores_dtype)"""
+        raise NotImplementedError
+
+    def _grab(self, image_out, lores_out):
+        """Capture into the given buffers; return the sensor timestamp (ns or None), False at end"""
+        raise NotImplementedError
+
+    def _skip(self):
+        """Capture and discard a frame (no free slot); return False at end of stream"""
+        return self._grab(self.scratch, self.scratch_lores) is not False
+
+    def _close(self):
+        pass
+
+    # Public API
+    def start(self):
+        image_shape, image_dtype, lores_shape, lores_dtype = self._open()
+        self.images = np.empty((self.ring_size,) + tuple(image_shape), dtype=image_dtype)
+        self.scratch = np.empty(image_shape, dtype=image_dtype)
+        if lores_shape is not None:
+            self.lores = np.empty((self.ring_size,) + tuple(lores_shape), dtype=lores_dtype)
+            self.scratch_lores = np.empty(lores_shape, dtype=lores_dtype)
+        else:
+            self.scratch_lores = None
+        self.running = True
+        self.thread = threading.Thread(target=self._grab_loop, name="frame-grabber", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+        self._close()
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def latest(self, after_seq=0, timeout=None):
+        """Hold and return the newest frame with seq > after_seq (waits for one), or None
+
+        The frame's image/lores are views into the ring: call release(frame)
+        when done with them.
+        """
+        with self.condition:
+            ready = self.condition.wait_for(
+                lambda: not self.running or (self.latest_slot is not None
+                                             and self.frames[self.latest_slot].seq > after_seq),
+                timeout)
+            if not ready or self.latest_slot is None or self.frames[self.latest_slot].seq <= after_seq:
+                return None
+            slot = self.latest_slot
+            if self.holds[slot] == 0:
+                self.held_since[slot] = time.monotonic()
+            self.holds[slot] += 1
+            return self.frames[slot]
+
+    def release(self, frame):
+        """Give a held frame's slot back to the grabber"""
+        with self.condition:
+            if self.holds[frame.slot] > 0 and self.frames[frame.slot] is frame:
+                self.holds[frame.slot] -= 1
+
+    def frame_size(self):
+        """(width, height) of the main frames as delivered (after start())"""
+        return self.images.shape[2], self.images.shape[1]
+
+    def stats(self):
+        return {"captured": self.captured, "dropped": self.dropped,
+                "held": sum(1 for holds in self.holds if holds)}
+
+    # Grabber
+    def _free_slot(self):
+        """A slot that is neither held nor the latest frame, or None (lock held)"""
+        now = time.monotonic()
+        for offset in range(1, self.ring_size + 1):
+            slot = ((self.latest_slot or 0) + offset) % self.ring_size
+            if slot == self.latest_slot:
+                continue
+            if self.holds[slot] and now - self.held_since[slot] > self.hold_timeout:
+                logger.warning(f"Reclaiming frame slot {slot} held for more than {self.hold_timeout}s")
+                self.holds[slot] = 0
+            if self.holds[slot] == 0:
+                return slot
+        return None
+
+    def _grab_loop(self):
+        while not self.stop_event.is_set():
+            with self.condition:
+                slot = self._free_slot()
+                if slot is not None:
+                    self.frames[slot] = None  # Being written, not readable
+            try:
+                if slot is None:
+                    self.dropped += 1
+                    ok = self._skip()
+                else:
+                    lores_out = self.lores[slot] if self.lores is not None else None
+                    sensor_timestamp = self._grab(self.images[slot], lores_out)
+                    ok = sensor_timestamp is not False
+            except Exception as e:
+                logger.error(f"Frame capture failed: {e}")
+                time.sleep(0.1)
+                continue
+
+            if not ok:
+                logger.info("Frame source ended")
+                break
+            if slot is None:
+                continue
+
+            self.seq += 1
+            self.captured += 1
+            frame = Frame(self.seq, slot, time.time(), time.monotonic(), sensor_timestamp,
+                          self.images[slot], self.lores[slot] if self.lores is not None else None)
+            with self.condition:
+                self.frames[slot] = frame
+                self.latest_slot = slot
+                self.condition.notify_all()
+            if self.on_frame is not None:
+                self.on_frame(self)
+
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+
+class Picamera2Source(FrameSource):
+    """Picamera2 main (+ optional lores) stream, copied once from the camera buffers"""
+
+    def __init__(self, resolution=(1280, 720), lores_resolution=None, framerate=10,
+                 preview=False, camera_num=0, **kwargs):
+        super().__init__(**kwargs)
+        self.camera_num = camera_num
+        self.resolution = resolution
+        self.lores_resolution = lores_resolution
+        self.framerate = framerate
+        self.preview = preview
+        self.picam2 = None
+
+    def _open(self):
+        from picamera2 import Picamera2  # Only available on the Pi
+
+        self.picam2 = Picamera2(self.camera_num)
+        streams = {"main": {"size": self.resolution}}
+        if self.lores_resolution is not None:
+            streams["lores"] = {"size": self.lores_resolution}
+        config = self.picam2.create_still_configuration(
+            display="lores" if self.lores_resolution is not None else "main",
+            controls={"FrameRate": self.framerate}, **streams)
+        self.picam2.configure(config)
+        if self.preview:
+            self.picam2.start_preview()
+        self.picam2.start()
+
+        self.stream_configs = {name: self.picam2.camera_configuration()[name] for name in streams}
+        lores_shape = None
+        if self.lores_resolution is not None:
+            lores_shape = self._layout(self.stream_configs["lores"])[0]
+        return self._layout(self.stream_configs["main"])[0], np.uint8, lores_shape, np.uint8
+
+    @staticmethod
+    def _layout(stream_config):
+        """(image shape, raw rows) of a stream, same layout as Picamera2's make_array"""
+        width, height = stream_config["size"]
+        if stream_config["format"] in ("YUV420", "YVU420"):
+            return (height * 3 // 2, stream_config["stride"]), height * 3 // 2
+        channels = 4 if stream_config["format"] in ("XBGR8888", "XRGB8888") else 3
+        return (height, width, channels), height
+
+    def _view(self, name, buffer):
+        """Zero-copy image view of a raw stream buffer"""
+        stream_config = self.stream_configs[name]
+        shape, rows = self._layout(stream_config)
+        stride = stream_config["stride"]
+        array = np.frombuffer(buffer, dtype=np.uint8)[:rows * stride].reshape((rows, stride))
+        if len(shape) == 2:
+            return array
+        return array[:, :shape[1] * shape[2]].reshape(shape)
+
+    def _grab(self, image_out, lores_out):
+        request = self.picam2.capture_request()
+        try:
+            np.copyto(image_out, self._view("main", request.make_buffer("main")))
+            if lores_out is not None:
+                np.copyto(lores_out, self._view("lores", request.make_buffer("lores")))
+            return request.get_metadata().get("SensorTimestamp")
+        finally:
+            request.release()
+
+    def _skip(self):
+        self.picam2.capture_request().release()
+        return True
+
+    def _close(self):
+        if self.picam2 is not None:
+            if self.preview:
+                self.picam2.stop_preview()
+            self.picam2.stop()
+
+
+class VideoCaptureSource(FrameSource):
+    """cv2.VideoCapture device or video file (BGR frames, no lores stream)"""
+
+    def __init__(self, device=0, resolution=None, **kwargs):
+        super().__init__(**kwargs)
+        self.device = device
+        self.resolution = resolution
+        self.capture = None
+
+    def _open(self):
+        import cv2
+
+        self.capture = cv2.VideoCapture(self.device)
+        if not self.capture.isOpened():
+            raise RuntimeError(f"Cannot open video source {self.device}")
+        if self.resolution is not None:
+            self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolution[0])
+            self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolution[1])
+        ret, frame = self.capture.read()
+        if not ret:
+            raise RuntimeError(f"Cannot read from video source {self.device}")
+        self.first_frame = frame
+        return frame.shape, frame.dtype, None, None
+
+    def _grab(self, image_out, lores_out):
+        if self.first_frame is not None:
+            np.copyto(image_out, self.first_frame)
+            self.first_frame = None
+            return None
+        ret, frame = self.capture.read(image_out)  # Decodes in place when the shape matches
+        if not ret:
+            return False
+        if frame is not image_out:
+            np.copyto(image_out, frame)
+        return None
+
+    def _close(self):
+        if self.capture is not None:
+            self.capture.release()
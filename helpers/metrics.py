@@ -0,0 +1,178 @@
+import bisect
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+
+# --- Hot-path instrumentation ---
+#
+# Call sites chain stage timings without any branching of their own:
+#
+#     t = metrics.now()
+#     ...preprocess...
+#     t = metrics.lap("preprocess", t)
+#     ...inference...
+#     t = metrics.lap("inference", t)
+#
+# When disabled, now() and lap() return immediately without reading the clock,
+# so the cost is one method call per stage.
+
+# Latency bucket upper bounds (ms) for the Prometheus histograms
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+
+
+class _Series:
+    """Rolling window of recent samples plus cumulative histogram buckets"""
+
+    def __init__(self, window):
+        self.samples = [0.0] * window  # A list: item stores are cheaper than into an ndarray
+        self.index = 0
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)  # Last one is +Inf
+
+    def add(self, value_ms):
+        self.samples[self.index % len(self.samples)] = value_ms
+        self.index += 1
+        self.count += 1
+        self.total += value_ms
+        self.buckets[bisect.bisect_left(BUCKETS_MS, value_ms)] += 1
+
+    def window(self):
+        return np.array(self.samples[:min(self.index, len(self.samples))])
+
+
+class Metrics:
+    """Per-stage latency histograms, gauges (queue depths) and counters (drops)"""
+
+    def __init__(self, enabled=True, window=512):
+        self.enabled = enabled
+        self.window = window
+        self.lock = threading.Lock()
+        self.series = {}
+        self.gauges = {}
+        self.counters = {}
+        self.started = time.time()
+
+    def now(self):
+        """Start time for lap() (0.0 when disabled)"""
+        if not self.enabled:
+            return 0.0
+        return time.perf_counter()
+
+    def lap(self, name, start):
+        """Record the time since start under name and return the new start time"""
+        if not self.enabled:
+            return start
+        now = time.perf_counter()
+        self.record(name, now - start)
+        return now
+
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            series = self.series.get(name)
+            if series is None:
+                series = self.series[name] = _Series(self.window)
+            series.add(seconds * 1000.0)
+
+    def set_gauge(self, name, value):
+        if self.enabled:
+            self.gauges[name] = value
+
+    def increment(self, name, amount=1):
+        if self.enabled:
+            with self.lock:
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self):
+        """Compact dict: per-stage [p50, p95, p99, max] ms over the window, gauges, counters"""
+        with self.lock:
+            windows = {name: (series.window(), series.count) for name, series in self.series.items()}
+            gauges, counters = dict(self.gauges), dict(self.counters)
+        stages = {}
+        for name, (samples, count) in windows.items():
+            if samples.size:
+                p50, p95, p99 = np.percentile(samples, (50, 95, 99))
+                stages[name] = [round(float(p50), 2), round(float(p95), 2), round(float(p99), 2),
+                                round(float(samples.max()), 2)]
+        return {"uptime": round(time.time() - self.started, 1), "stages_ms": stages,
+                "gauges": gauges, "counters": counters}
+
+    def prometheus_text(self, prefix="smartsight"):
+        """Prometheus text exposition format (cumulative since start)"""
+        with self.lock:
+            series = {name: (list(s.buckets), s.count, s.total) for name, s in self.series.items()}
+            gauges, counters = dict(self.gauges), dict(self.counters)
+
+        lines = [f"# TYPE {prefix}_stage_latency_ms histogram"]
+        for name, (buckets, count, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS_MS, buckets):
+                cumulative += bucket
+                lines.append(f'{prefix}_stage_latency_ms_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_latency_ms_bucket{{stage="{name}",le="+Inf"}} {count}')
+            lines.append(f'{prefix}_stage_latency_ms_sum{{stage="{name}"}} {total:.3f}')
+            lines.append(f'{prefix}_stage_latency_ms_count{{stage="{name}"}} {count}')
+        for name, value in sorted(gauges.items()):
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value}")
+        for name, value in sorted(counters.items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Atomically (re)write a textfile for node_exporter's textfile collector"""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(temp_path, path)
+
+
+# --- Startup profile ---
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far in MB (0 where unsupported)"""
+    try:
+        import resource  # Unix only
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KB elsewhere
+
+
+class StartupProfile:
+    """Wall time and peak RSS at the end of consecutive startup phases
+
+    Each mark() closes the phase that started at the previous mark (or at
+    start). details are extra {name: seconds} shown under the phase, e.g.
+    an OnnxSession's load / first run / warm-up timings.
+    """
+
+    def __init__(self, enabled=True, start=None):
+        self.enabled = enabled
+        self.last = start if start is not None else time.perf_counter()
+        self.phases = []
+
+    def mark(self, name, details=None):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases.append({"phase": name, "seconds": now - self.last,
+                            "peak_rss_mb": peak_rss_mb(), "details": dict(details or {})})
+        self.last = now
+
+    def report(self):
+        lines = [f"{'phase':<40} {'time':>8} {'peak RSS':>10}"]
+        for phase in self.phases:
+            lines.append(f"{phase['phase']:<40} {phase['seconds']:>7.2f}s {phase['peak_rss_mb']:>7.0f} MB")
+            for name, seconds in phase["details"].items():
+                lines.append(f"  {name:<38} {seconds:>7.2f}s")
+        total = sum(phase["seconds"] for phase in self.phases)
+        lines.append(f"{'total':<40} {total:>7.2f}s")
+        return "\n".join(lines)
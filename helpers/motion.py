@@ -0,0 +1,105 @@
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+
+# moving: run detection on this frame
+# region: (x1, y1, x2, y2) normalized [0, 1] bounding box of motion, or None
+# motion_fraction: share of (downscaled) pixels that changed
+MotionResult = namedtuple("MotionResult", ["moving", "region", "motion_fraction"])
+
+
+def to_gray(frame, yuv420=False):
+    """Grayscale view/conversion of a BGR, BGRX, grayscale or YUV420 frame"""
+    if frame.ndim == 3:
+        code = cv2.COLOR_BGRA2GRAY if frame.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+        return cv2.cvtColor(frame, code)
+    if yuv420:
+        # Planar YUV420 (Picamera2 lores default): the luma plane is the top 2/3 rows
+        return frame[:frame.shape[0] * 2 // 3]
+    return frame
+
+
+class MotionGate:
+    """Cheap motion detector deciding whether a frame needs a detector pass
+
+    Frames are downscaled to a small grayscale image and compared against a
+    running-average background. A scene is static when the changed pixels stay
+    under motion_fraction; a refresh is still forced every max_static_time
+    seconds so slow changes are never missed forever.
+    """
+
+    def __init__(self, size=(160, 90), pixel_threshold=25, motion_fraction=0.002,
+                 background_alpha=0.05, max_static_time=5.0, yuv420=False):
+        self.size = size
+        self.yuv420 = yuv420
+        self.pixel_threshold = pixel_threshold
+        self.motion_fraction = motion_fraction
+        self.background_alpha = background_alpha
+        self.max_static_time = max_static_time
+
+        self.small = np.empty((size[1], size[0]), dtype=np.uint8)
+        self.background = None
+        self.background_u8 = np.empty_like(self.small)
+        self.diff = np.empty_like(self.small)
+        self.mask = np.empty_like(self.small)
+        self.dilate_kernel = np.ones((3, 3), dtype=np.uint8)
+        self.last_refresh = time.monotonic()
+
+    def update(self, frame):
+        """Feed the next (lores) frame and return a MotionResult"""
+        cv2.resize(to_gray(frame, self.yuv420), self.size, dst=self.small,
+                   interpolation=cv2.INTER_AREA)
+        cv2.GaussianBlur(self.small, (5, 5), 0, dst=self.small)
+
+        now = time.monotonic()
+        if self.background is None:
+            self.background = self.small.astype(np.float32)
+            self.last_refresh = now
+            return MotionResult(True, None, 1.0)
+
+        cv2.convertScaleAbs(self.background, dst=self.background_u8)
+        cv2.absdiff(self.small, self.background_u8, dst=self.diff)
+        cv2.threshold(self.diff, self.pixel_threshold, 255, cv2.THRESH_BINARY, dst=self.mask)
+        cv2.accumulateWeighted(self.small, self.background, self.background_alpha)
+
+        changed = cv2.countNonZero(self.mask)
+        fraction = changed / self.mask.size
+        if fraction < self.motion_fraction:
+            if now - self.last_refresh >= self.max_static_time:
+                self.last_refresh = now
+                return MotionResult(True, None, fraction)
+            return MotionResult(False, None, fraction)
+
+        self.last_refresh = now
+        cv2.dilate(self.mask, self.dilate_kernel, dst=self.mask, iterations=2)
+        x, y, width, height = cv2.boundingRect(self.mask)
+        region = (x / self.size[0], y / self.size[1],
+                  (x + width) / self.size[0], (y + height) / self.size[1])
+        return MotionResult(True, region, fraction)
+
+
+def region_to_roi(region, frame_size, margin=0.1, align=32, max_area=0.5):
+    """Pixel crop (x1, y1, x2, y2) of the frame around a normalized motion region
+
+    Adds a relative margin and aligns to `align` pixels so the crop size (and
+    the preprocessor geometry) changes less often. Returns None when the crop
+    would cover more than max_area of the frame (full-frame inference is then
+    just as cheap).
+    """
+    if region is None:
+        return None
+    frame_width, frame_height = frame_size
+    x1, y1, x2, y2 = region
+    margin_x = (x2 - x1) * margin
+    margin_y = (y2 - y1) * margin
+    x1 = int(max(0.0, x1 - margin_x) * frame_width) // align * align
+    y1 = int(max(0.0, y1 - margin_y) * frame_height) // align * align
+    x2 = min(frame_width, -(-int(min(1.0, x2 + margin_x) * frame_width) // align) * align)
+    y2 = min(frame_height, -(-int(min(1.0, y2 + margin_y) * frame_height) // align) * align)
+
+    if (x2 - x1) * (y2 - y1) > max_area * frame_width * frame_height:
+        return None
+    return x1, y1, x2, y2
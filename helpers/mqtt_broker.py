@@ -0,0 +1,217 @@
+import socket
+import struct
+import threading
+
+
+# --- Minimal in-process MQTT 3.1.1 broker for local testing ---
+#
+# Enough of the protocol for the publisher, the phone client simulator and the
+# tools in benchmarks/: CONNECT, PUBLISH (QoS 0/1/2 in, QoS 0 out), SUBSCRIBE
+# with + and # wildcards, retained messages, PINGREQ and DISCONNECT. No auth,
+# no sessions, no will messages. stop() drops every connection, which is a
+# convenient way to simulate a broker outage; start() again on the same port.
+
+CONNECT, CONNACK, PUBLISH, PUBACK, PUBREC, PUBREL, PUBCOMP = 1, 2, 3, 4, 5, 6, 7
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK, PINGREQ, PINGRESP, DISCONNECT = 8, 9, 10, 11, 12, 13, 14
+
+
+def topic_matches(topic_filter, topic):
+    """MQTT topic filter matching with + and # wildcards"""
+    filter_parts = topic_filter.split("/")
+    topic_parts = topic.split("/")
+    for i, part in enumerate(filter_parts):
+        if part == "#":
+            return True
+        if i >= len(topic_parts) or (part != "+" and part != topic_parts[i]):
+            return False
+    return len(filter_parts) == len(topic_parts)
+
+
+def _encode_length(length):
+    encoded = bytearray()
+    while True:
+        byte, length = length % 128, length // 128
+        encoded.append(byte | (0x80 if length else 0))
+        if not length:
+            return bytes(encoded)
+
+
+def _packet(packet_type, body, flags=0):
+    return bytes([(packet_type << 4) | flags]) + _encode_length(len(body)) + body
+
+
+def _string(data, offset):
+    size = struct.unpack_from("!H", data, offset)[0]
+    return data[offset + 2:offset + 2 + size], offset + 2 + size
+
+
+class _Connection(threading.Thread):
+    def __init__(self, broker, sock):
+        super().__init__(daemon=True)
+        self.broker = broker
+        self.sock = sock
+        self.send_lock = threading.Lock()
+        self.subscriptions = set()
+
+    def send(self, data):
+        with self.send_lock:
+            self.sock.sendall(data)
+
+    def _read_exact(self, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("client closed the connection")
+            data += chunk
+        return bytes(data)
+
+    def _read_packet(self):
+        first = self._read_exact(1)[0]
+        length, multiplier = 0, 1
+        while True:
+            byte = self._read_exact(1)[0]
+            length += (byte & 0x7F) * multiplier
+            multiplier *= 128
+            if not byte & 0x80:
+                break
+        return first >> 4, first & 0x0F, self._read_exact(length)
+
+    def run(self):
+        try:
+            while True:
+                packet_type, flags, body = self._read_packet()
+                if packet_type == CONNECT:
+                    self.send(_packet(CONNACK, b"\x00\x00"))
+                elif packet_type == PUBLISH:
+                    self._on_publish(flags, body)
+                elif packet_type == PUBREL:
+                    self.send(_packet(PUBCOMP, body[:2]))
+                elif packet_type == SUBSCRIBE:
+                    self._on_subscribe(body)
+                elif packet_type == UNSUBSCRIBE:
+                    offset = 2
+                    while offset < len(body):
+                        topic_filter, offset = _string(body, offset)
+                        with self.broker.lock:
+                            self.subscriptions.discard(topic_filter.decode())
+                    self.send(_packet(UNSUBACK, body[:2]))
+                elif packet_type == PINGREQ:
+                    self.send(_packet(PINGRESP, b""))
+                elif packet_type == DISCONNECT:
+                    break
+        except (OSError, ConnectionError, struct.error):
+            pass
+        finally:
+            self.broker._remove(self)
+            self.sock.close()
+
+    def _on_publish(self, flags, body):
+        qos, retain = (flags >> 1) & 0x03, flags & 0x01
+        topic, offset = _string(body, 0)
+        packet_id = body[offset:offset + 2] if qos else b""
+        payload = body[offset + len(packet_id):]
+        if qos == 1:
+            self.send(_packet(PUBACK, packet_id))
+        elif qos == 2:
+            self.send(_packet(PUBREC, packet_id))
+        self.broker._route(topic.decode(), payload, retain)
+
+    def _on_subscribe(self, body):
+        granted, offset, filters = bytearray(), 2, []
+        while offset < len(body):
+            topic_filter, offset = _string(body, offset)
+            granted.append(0)  # Everything is delivered at QoS 0
+            offset += 1
+            filters.append(topic_filter.decode())
+        with self.broker.lock:
+            self.subscriptions.update(filters)
+        self.send(_packet(SUBACK, body[:2] + bytes(granted)))
+        for topic, payload in self.broker._retained_for(filters):
+            self.send(self.broker._publish_packet(topic, payload, retain=True))
+
+
+class Broker:
+    """In-process stand-in for mosquitto (see module comment for what is supported)"""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port
+        self.lock = threading.Lock()
+        self.connections = set()
+        self.retained = {}
+        self.received = 0
+        self.server = None
+        self.on_message = None  # Optional hook(topic, payload) for inspection
+
+    def start(self):
+        """Start listening; returns the (possibly ephemeral) port"""
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((self.host, self.port))
+        self.server.listen(64)
+        self.port = self.server.getsockname()[1]
+        threading.Thread(target=self._accept_loop, args=(self.server,), daemon=True).start()
+        return self.port
+
+    def stop(self):
+        """Close the listener and drop every client (simulated outage)"""
+        if self.server is not None:
+            try:
+                self.server.shutdown(socket.SHUT_RDWR)  # Wakes the blocked accept()
+            except OSError:
+                pass
+            self.server.close()
+            self.server = None
+        with self.lock:
+            connections = list(self.connections)
+        for connection in connections:
+            try:
+                connection.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _accept_loop(self, server):
+        while True:
+            try:
+                sock, _ = server.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connection = _Connection(self, sock)
+            with self.lock:
+                self.connections.add(connection)
+            connection.start()
+
+    def _remove(self, connection):
+        with self.lock:
+            self.connections.discard(connection)
+
+    def _publish_packet(self, topic, payload, retain=False):
+        topic = topic.encode()
+        return _packet(PUBLISH, struct.pack("!H", len(topic)) + topic + payload, flags=int(retain))
+
+    def _retained_for(self, filters):
+        with self.lock:
+            return [(topic, payload) for topic, payload in self.retained.items()
+                    if any(topic_matches(f, topic) for f in filters)]
+
+    def _route(self, topic, payload, retain):
+        with self.lock:
+            self.received += 1
+            if retain:
+                if payload:
+                    self.retained[topic] = payload
+                else:
+                    self.retained.pop(topic, None)
+            targets = [c for c in self.connections
+                       if any(topic_matches(f, topic) for f in c.subscriptions)]
+        if self.on_message is not None:
+            self.on_message(topic, payload)
+        if targets:
+            packet = self._publish_packet(topic, payload)
+            for connection in targets:
+                try:
+                    connection.send(packet)
+                except OSError:
+                    pass
@@ -0,0 +1,151 @@
+import json
+import struct
+
+
+# --- Compact binary encoding of vision/results (version 2) ---
+#
+# Header (little-endian, 18 bytes):
+#   magic "SS" | version u8 | flags u8 | frame_id u32 | timestamp f64 | count u16
+# followed by `count` packed detection records (18 bytes each), see RECORD,
+# then the optional fields whose flag is set, in flag order (see DECISION and
+# OPERATING_POINT).
+# Version 1 is the same without optional fields; decode_binary reads both.
+# Static metadata (device id, frame resolution, processing info, class names) is
+# not repeated per frame: it is published once on the retained metadata topic.
+
+PAYLOAD_VERSION = 2
+SUPPORTED_VERSIONS = (1, 2)
+MAGIC = b"SS"
+HEADER = struct.Struct("<2sBBIdH")
+
+FLAG_STATIC = 0x01
+FLAG_DETECTOR_RAN = 0x02
+FLAG_DECISION = 0x04
+FLAG_OPERATING_POINT = 0x08
+
+# Detection record (little-endian, 18 bytes):
+#   class_id u8 | track_id u16 (wraps) | x1, y1, x2, y2 u16 (normalized to [0, 65535])
+#   | confidence u8 | relative_depth u8 | depth_confidence u8 ([0, 1] -> [0, 255])
+#   | vx, vy i16 (px/s, clipped)
+RECORD = struct.Struct("<BH4HBBBhh")
+
+# Decision (FLAG_DECISION, 2 bytes): index in DECISIONS | hazard u8 ([0, 1] -> [0, 255])
+DECISION = struct.Struct("<BB")
+DECISIONS = ("straight", "left", "right", "stop")  # Same order as models/decision.DECISIONS
+
+# Operating point (FLAG_OPERATING_POINT, 1 byte): adaptive scheduler level u8. The
+# settings of every level are in the "operating_points" list of the metadata topic.
+OPERATING_POINT = struct.Struct("<B")
+
+ENCODINGS = ("json", "binary", "both")
+
+
+def encode_json(payload):
+    """Encode a results payload as compact JSON (the original format)"""
+    return json.dumps(payload, indent=None, separators=(',', ':'))
+
+
+def _unit_u8(value):
+    return min(max(int(value * 255 + 0.5), 0), 255)
+
+
+def _unit_u16(value):
+    return min(max(int(value * 65535 + 0.5), 0), 65535)
+
+
+def _velocity_i16(value):
+    return min(max(int(round(value)), -32768), 32767)
+
+
+def encode_binary(payload, frame_size):
+    """Encode a results payload into the compact binary format
+
+    Args:
+        payload: results dict as published in JSON (timestamp, frame_id,
+            static, detector_ran, detections, optional decision, hazard and
+            operating_point)
+        frame_size: (width, height) the detection boxes refer to
+    """
+    detections = payload.get("detections") or []
+    decision = payload.get("decision")
+    operating_point = payload.get("operating_point")
+    flags = ((FLAG_STATIC if payload.get("static") else 0)
+             | (FLAG_DETECTOR_RAN if payload.get("detector_ran", True) else 0)
+             | (FLAG_DECISION if decision is not None else 0)
+             | (FLAG_OPERATING_POINT if operating_point is not None else 0))
+    parts = [HEADER.pack(MAGIC, PAYLOAD_VERSION, flags, payload.get("frame_id", 0) & 0xFFFFFFFF,
+                         payload["timestamp"], len(detections))]
+
+    inv_width, inv_height = 1.0 / frame_size[0], 1.0 / frame_size[1]
+    pack = RECORD.pack
+    for obj in detections:
+        x1, y1, x2, y2 = obj["bbox"]
+        vx, vy = obj.get("velocity", (0, 0))
+        parts.append(pack(obj["class_id"], obj.get("track_id", 0) & 0xFFFF,
+                          _unit_u16(x1 * inv_width), _unit_u16(y1 * inv_height),
+                          _unit_u16(x2 * inv_width), _unit_u16(y2 * inv_height),
+                          _unit_u8(obj["confidence"]),
+                          _unit_u8(obj.get("relative_depth", 0.0)),
+                          _unit_u8(obj.get("depth_confidence", 0.0)),
+                          _velocity_i16(vx), _velocity_i16(vy)))
+    if decision is not None:
+        parts.append(DECISION.pack(DECISIONS.index(decision), _unit_u8(payload.get("hazard", 0.0))))
+    if operating_point is not None:
+        parts.append(OPERATING_POINT.pack(operating_point["level"]))
+    return b"".join(parts)
+
+
+def decode_binary(data, frame_size, class_names=None, operating_points=None):
+    """Decode a binary payload back into the JSON results structure
+
+    Boxes, confidences and depths come back quantized (about 0.02 px box
+    error at 1280x720, 1/255 for the [0, 1] values). The operating point
+    comes back as {"level": n}, with its settings when operating_points (the
+    metadata list) is given.
+    """
+    magic, version, flags, frame_id, timestamp, count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a SmartSight binary payload")
+    if version not in SUPPORTED_VERSIONS:
+        raise ValueError(f"Unsupported binary payload version {version}")
+    end = HEADER.size + count * RECORD.size
+    size = (end + (DECISION.size if flags & FLAG_DECISION else 0)
+            + (OPERATING_POINT.size if flags & FLAG_OPERATING_POINT else 0))
+    if len(data) != size:
+        raise ValueError(f"Truncated binary payload ({len(data)} bytes for {count} detections)")
+
+    scale_x, scale_y = frame_size[0] / 65535, frame_size[1] / 65535
+    detections = []
+    for (class_id, track_id, x1, y1, x2, y2, confidence, depth, depth_confidence,
+         vx, vy) in RECORD.iter_unpack(data[HEADER.size:end]):
+        detection = {
+            "track_id": track_id,
+            "class_id": class_id,
+            "confidence": round(confidence / 255, 3),
+            "bbox": [round(x1 * scale_x, 1), round(y1 * scale_y, 1),
+                     round(x2 * scale_x, 1), round(y2 * scale_y, 1)],
+            "velocity": [vx, vy],
+            "relative_depth": round(depth / 255, 3),
+            "depth_confidence": round(depth_confidence / 255, 3),
+        }
+        if class_names is not None:
+            detection["label"] = class_names[class_id]
+        detections.append(detection)
+
+    payload = {
+        "timestamp": timestamp,
+        "frame_id": frame_id,
+        "static": bool(flags & FLAG_STATIC),
+        "detector_ran": bool(flags & FLAG_DETECTOR_RAN),
+        "detections": detections,
+    }
+    if flags & FLAG_DECISION:
+        decision, hazard = DECISION.unpack_from(data, end)
+        payload["decision"] = DECISIONS[decision]
+        payload["hazard"] = round(hazard / 255, 3)
+        end += DECISION.size
+    if flags & FLAG_OPERATING_POINT:
+        level = OPERATING_POINT.unpack_from(data, end)[0]
+        point = operating_points[level] if operating_points is not None else {}
+        payload["operating_point"] = dict(point, level=level)
+    return payload
@@ -0,0 +1,183 @@
+import threading
+import time
+import logging
+from queue import Queue, Empty
+
+
+logger = logging.getLogger(__name__)
+
+
+# --- Bounded queue with a latest-frame-wins drop policy ---
+
+class LatestQueue(Queue):
+    """Bounded queue that evicts the oldest item instead of blocking the producer
+
+    on_drop, if given, is called with every evicted item (e.g. to release the
+    camera buffer it references).
+    """
+
+    def __init__(self, maxsize=1, on_drop=None):
+        super().__init__(maxsize=maxsize)
+        self.on_drop = on_drop
+        self.dropped = 0
+
+    def put_latest(self, item):
+        """Put an item, dropping the oldest queued one if the queue is full"""
+        evicted = None
+        with self.mutex:
+            if self.maxsize > 0 and self._qsize() >= self.maxsize:
+                evicted = self._get()
+                self.unfinished_tasks -= 1
+                self.dropped += 1
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+        if evicted is not None and self.on_drop is not None:
+            self.on_drop(evicted)
+
+
+# --- Per-stage timing ---
+
+class StageStats:
+    """Counts processed items and busy time of a stage between two reports
+
+    errors counts items the stage function failed on (never reset).
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.count = 0
+        self.busy_time = 0.0
+        self.errors = 0
+        self.window_start = time.perf_counter()
+
+    def record(self, duration):
+        with self.lock:
+            self.count += 1
+            self.busy_time += duration
+
+    def record_error(self):
+        with self.lock:
+            self.errors += 1
+
+    def snapshot(self):
+        """Return (fps, average latency in seconds) since the last snapshot and reset"""
+        with self.lock:
+            now = time.perf_counter()
+            elapsed = now - self.window_start
+            fps = self.count / elapsed if elapsed > 0 else 0
+            avg_latency = self.busy_time / self.count if self.count else 0
+            self.count = 0
+            self.busy_time = 0.0
+            self.window_start = now
+        return fps, avg_latency
+
+
+class Stage(threading.Thread):
+    """Worker thread running one pipeline stage
+
+    A stage without an input queue is a source: its function is called with no
+    argument in a loop. Other stages are called with the next queued item. A
+    function returning None produces nothing for the next stage. An item the
+    function raises on is dropped like an evicted one (through the input
+    queue's on_drop), so a failing stage cannot leak camera buffers.
+    """
+
+    def __init__(self, name, func, stop_event, in_queue=None, out_queue=None):
+        super().__init__(name=f"stage-{name}", daemon=True)
+        self.func = func
+        self.stop_event = stop_event
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.stats = StageStats(name)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            if self.in_queue is not None:
+                try:
+                    item = self.in_queue.get(timeout=0.1)
+                except Empty:
+                    continue
+
+            start_time = time.perf_counter()
+            try:
+                if self.in_queue is not None:
+                    result = self.func(item)
+                else:
+                    result = self.func()
+            except Exception as e:
+                logger.error(f"Error in {self.stats.name} stage: {e}")
+                self.stats.record_error()
+                if self.in_queue is not None and self.in_queue.on_drop is not None:
+                    self.in_queue.on_drop(item)
+                continue
+            self.stats.record(time.perf_counter() - start_time)
+
+            if result is not None and self.out_queue is not None:
+                self.out_queue.put_latest(result)
+
+
+class Pipeline:
+    """Chain of stages connected by bounded latest-frame-wins queues
+
+    Throughput approaches the slowest stage instead of the sum of all stages,
+    and a slow stage never makes the frames it receives go stale.
+    """
+
+    def __init__(self, queue_size=1, on_drop=None):
+        self.queue_size = queue_size
+        self.on_drop = on_drop
+        self.stop_event = threading.Event()
+        self.stages = []
+        self.queues = []
+
+    def add_stage(self, name, func, source=False):
+        """Append a stage; the first stage added is the source
+
+        source=True starts a new chain: the stage is not fed by the previous
+        one and pulls its items itself (e.g. results of an inference pool that
+        the previous stage submits to).
+        """
+        in_queue = None
+        if self.stages and not source:
+            in_queue = LatestQueue(maxsize=self.queue_size, on_drop=self.on_drop)
+            self.stages[-1].out_queue = in_queue
+            self.queues.append(in_queue)
+        self.stages.append(Stage(name, func, self.stop_event, in_queue=in_queue))
+        return self
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def is_running(self):
+        return not self.stop_event.is_set() and all(stage.is_alive() for stage in self.stages)
+
+    def stop(self, timeout=2.0):
+        """Signal all stages to stop and wait for them to finish"""
+        self.stop_event.set()
+        for stage in self.stages:
+            if stage.is_alive():
+                stage.join(timeout)
+                if stage.is_alive():
+                    logger.warning(f"{stage.name} did not stop within {timeout}s")
+
+    def dropped(self):
+        return sum(q.dropped for q in self.queues)
+
+    def errors(self):
+        return sum(stage.stats.errors for stage in self.stages)
+
+    def queue_depths(self):
+        """Items waiting in front of each stage, by stage name"""
+        return {stage.stats.name: stage.in_queue.qsize()
+                for stage in self.stages if stage.in_queue is not None}
+
+    def stats_line(self):
+        """Per-stage FPS and latency summary since the last call"""
+        parts = []
+        for stage in self.stages:
+            fps, avg_latency = stage.stats.snapshot()
+            parts.append(f"{stage.stats.name}: {fps:.1f} FPS ({avg_latency * 1000:.1f} ms)")
+        return " | ".join(parts) + f" | dropped: {self.dropped()} | errors: {self.errors()}"
@@ -0,0 +1,138 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import cv2
+
+
+logger = logging.getLogger(__name__)
+
+
+# --- Asynchronous annotated-frame recorder ---
+#
+# Only sampled frames (every `interval` seconds) and event frames (e.g. a
+# decision change) are recorded. The caller's thread just copies the frame
+# (it usually lives in a reused camera buffer) and enqueues it; annotation,
+# JPEG encoding and the write happen on a few worker threads (cv2 releases
+# the GIL while drawing and encoding). When the queue is full the frame is
+# dropped, so recording can never stall the inference loop. The directory is
+# kept under max_bytes by deleting the oldest recordings.
+
+RECORD_QUEUE_SIZE = 4
+RECORD_WORKERS = 2
+JPEG_QUALITY = 85
+
+
+class FrameRecorder:
+    """Annotate, encode and save selected frames off the caller's thread
+
+    annotate(image, *annotations) draws on the (copied) image in place and
+    is called on a worker thread, e.g. models/yoloNAS.draw_boxes with
+    annotations (boxes, scores, class_ids).
+    """
+
+    def __init__(self, directory, max_bytes=200 * 2 ** 20, interval=5.0, annotate=None,
+                 workers=RECORD_WORKERS, queue_size=RECORD_QUEUE_SIZE, jpeg_quality=JPEG_QUALITY):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.annotate = annotate
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.last_sample = None
+        self.recorded = 0
+        self.dropped = 0
+        self.failed = 0
+
+        os.makedirs(directory, exist_ok=True)
+        # Recordings from earlier runs count toward the cap, oldest first
+        existing = [os.path.join(directory, name) for name in os.listdir(directory)
+                    if name.endswith(".jpg")]
+        existing.sort(key=os.path.getmtime)
+        self.files = deque((path, os.path.getsize(path)) for path in existing)
+        self.total_bytes = sum(size for _, size in self.files)
+        self._rotate()
+
+        self.threads = [threading.Thread(target=self._worker, name=f"recorder-{i}", daemon=True)
+                        for i in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def due(self, now=None):
+        """True when a sampled frame is due (interval 0 disables sampling)"""
+        if not self.interval:
+            return False
+        now = time.monotonic() if now is None else now
+        return self.last_sample is None or now - self.last_sample >= self.interval
+
+    def record(self, frame, annotations=(), tag="sample", frame_id=0, timestamp=None, event=False):
+        """Record a sampled frame (when due) or an event frame; returns True if queued
+
+        The frame is copied only if it is going to be recorded.
+        """
+        now = time.monotonic()
+        if not event:
+            if not self.due(now):
+                return False
+            self.last_sample = now
+        if self.queue.full():
+            self.dropped += 1
+            return False
+        timestamp = time.time() if timestamp is None else timestamp
+        try:
+            self.queue.put_nowait((frame.copy(), annotations, tag, frame_id, timestamp))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def stats(self):
+        return {"recorded": self.recorded, "dropped": self.dropped, "failed": self.failed,
+                "files": len(self.files), "bytes": self.total_bytes}
+
+    def close(self, timeout=5.0):
+        """Finish the queued frames and stop the workers"""
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def _worker(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            image, annotations, tag, frame_id, timestamp = job
+            try:
+                if self.annotate is not None:
+                    self.annotate(image, *annotations)
+                ok, encoded = cv2.imencode(".jpg", image, self.encode_params)
+                if not ok:
+                    raise RuntimeError("JPEG encoding failed")
+                stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(timestamp))
+                name = f"{stamp}.{int(timestamp * 1000) % 1000:03d}-{frame_id:06d}-{tag}.jpg"
+                path = os.path.join(self.directory, name)
+                with open(path, "wb") as f:
+                    f.write(encoded.tobytes())
+                with self.lock:
+                    self.files.append((path, encoded.size))
+                    self.total_bytes += encoded.size
+                    self.recorded += 1
+                    self._rotate()
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Failed to record frame {frame_id}: {e}")
+
+    def _rotate(self):
+        """Delete the oldest recordings until the directory fits in max_bytes"""
+        while self.files and self.total_bytes > self.max_bytes:
+            path, size = self.files.popleft()
+            self.total_bytes -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,142 @@
+import logging
+import time
+from collections import deque
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+# --- Adaptive latency-budget scheduler ---
+#
+# The pipeline runs at one of a ladder of operating points, ordered from the
+# most expensive (best quality) to the cheapest. Each point sets the detector
+# input size, the detection stride and how often depth is refreshed. Every
+# published frame reports its capture-to-publish latency and the time its
+# compute stages took. Every `interval` seconds the scheduler steps:
+#   - down (cheaper) when the p90 latency exceeds the budget, a stage takes
+#     longer on average than the optional stage budget, or the CPU is hot
+#     enough to be throttled soon;
+#   - up (better) only after `up_intervals` consecutive intervals well under
+#     budget with the CPU cooled down, so it does not oscillate.
+# After a change the measurements restart, so the next decision only sees
+# frames processed at the new point.
+
+THERMAL_ZONE = "/sys/class/thermal/thermal_zone0/temp"  # Millidegrees Celsius on the Pi
+TEMP_HIGH = 75.0        # Step down at or above this (the Pi firmware throttles from 80-85 C)
+TEMP_CLEAR = 70.0       # Stepping up again needs the CPU below this
+ADJUST_INTERVAL = 2.0   # Seconds between decisions
+UP_RATIO = 0.6          # Step up only below this fraction of the budgets...
+UP_INTERVALS = 3        # ...for this many intervals in a row
+MIN_SAMPLES = 5         # Frames needed before deciding anything
+
+
+def read_cpu_temperature(path=THERMAL_ZONE):
+    """CPU temperature in degrees Celsius, or None where the thermal zone is not available"""
+    try:
+        with open(path) as f:
+            return int(f.read().strip()) / 1000.0
+    except (OSError, ValueError):
+        return None
+
+
+class AdaptiveScheduler:
+    """Steps through operating points to keep latency within budget
+
+    points: list of dicts (e.g. input_size, detection_stride, depth_interval),
+    most expensive first. budget: target p90 capture-to-publish latency in
+    seconds. stage_budget: seconds a compute stage may take per frame on
+    average, or None to decide on latency alone.
+    """
+
+    def __init__(self, points, budget, start_level=0, stage_budget=None, interval=ADJUST_INTERVAL,
+                 temp_high=TEMP_HIGH, temp_clear=TEMP_CLEAR, up_ratio=UP_RATIO,
+                 up_intervals=UP_INTERVALS, read_temperature=read_cpu_temperature, window=100):
+        if not points:
+            raise ValueError("AdaptiveScheduler needs at least one operating point")
+        self.points = list(points)
+        self.budget = budget
+        self.stage_budget = stage_budget
+        self.interval = interval
+        self.temp_high = temp_high
+        self.temp_clear = temp_clear
+        self.up_ratio = up_ratio
+        self.up_intervals = up_intervals
+        self.read_temperature = read_temperature
+
+        self.level = min(max(start_level, 0), len(self.points) - 1)
+        # The point with its "level": replaced, never mutated, so any stage may read it
+        self.current = dict(self.points[self.level], level=self.level)
+        self.latencies = deque(maxlen=window)
+        self.stage_times = {}
+        self.window = window
+        self.good_intervals = 0
+        self.last_update = None
+        self.temperature = None
+        self.latency_p90 = None
+        self.changes = 0
+
+    def observe(self, latency, stage_times=None, level=None, now=None):
+        """Record one published frame; returns True when the operating point changed
+
+        level is the point the frame was processed at: frames still in flight
+        from before a change are not counted.
+        """
+        if level is None or level == self.level:
+            self.latencies.append(latency)
+            for name, seconds in (stage_times or {}).items():
+                times = self.stage_times.get(name)
+                if times is None:
+                    times = self.stage_times[name] = deque(maxlen=self.window)
+                times.append(seconds)
+        now = time.monotonic() if now is None else now
+        if self.last_update is None:
+            self.last_update = now
+        if now - self.last_update < self.interval:
+            return False
+        self.last_update = now
+        return self.update()
+
+    def update(self):
+        """Decide on the measurements since the last change"""
+        self.temperature = self.read_temperature()
+        if len(self.latencies) < MIN_SAMPLES:
+            return False
+        self.latency_p90 = float(np.percentile(self.latencies, 90))
+        slowest_stage = max((float(np.mean(times)) for times in self.stage_times.values()), default=0.0)
+
+        hot = self.temperature is not None and self.temperature >= self.temp_high
+        over = (self.latency_p90 > self.budget
+                or (self.stage_budget is not None and slowest_stage > self.stage_budget))
+        if hot or over:
+            self.good_intervals = 0
+            reason = (f"CPU at {self.temperature:.0f} C" if hot else
+                      f"p90 latency {self.latency_p90 * 1000:.0f} ms, slowest stage {slowest_stage * 1000:.0f} ms")
+            return self._step(1, reason)
+
+        cool = self.temperature is None or self.temperature < self.temp_clear
+        under = (self.latency_p90 < self.budget * self.up_ratio
+                 and (self.stage_budget is None or slowest_stage < self.stage_budget * self.up_ratio))
+        self.good_intervals = self.good_intervals + 1 if cool and under else 0
+        if self.good_intervals >= self.up_intervals:
+            self.good_intervals = 0
+            return self._step(-1, f"p90 latency {self.latency_p90 * 1000:.0f} ms")
+        return False
+
+    def _step(self, direction, reason):
+        level = min(max(self.level + direction, 0), len(self.points) - 1)
+        if level == self.level:
+            return False
+        logger.info(f"Operating point {self.level} -> {level} ({'down' if direction > 0 else 'up'}: "
+                    f"{reason}): {self.points[level]}")
+        self.level = level
+        self.current = dict(self.points[level], level=level)
+        self.changes += 1
+        self.latencies.clear()
+        self.stage_times = {}
+        return True
+
+    def stats(self):
+        return {"level": self.level, "changes": self.changes, "temperature": self.temperature,
+                "latency_p90_ms": None if self.latency_p90 is None else round(self.latency_p90 * 1000, 1)}
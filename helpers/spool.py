@@ -0,0 +1,147 @@
+import mmap
+import os
+import struct
+import threading
+import time
+
+
+# --- Disk-backed ring spool for payloads published during broker outages ---
+#
+# File layout: HEADER followed by `capacity` bytes of ring data.
+#   header: magic "SPL1" | capacity u64 | head u64 | tail u64 | wrap u64 | count u64
+#   record: payload_size u32 | topic_size u16 | timestamp f64 | topic | payload
+#
+# Live data is [head, tail) while wrap == 0. Once the writer wraps around,
+# wrap marks where the old data ends and live data is [head, wrap) + [0, tail).
+# The header is rewritten after every record, so a restarted publisher picks
+# up whatever was spooled before it stopped.
+
+MAGIC = b"SPL1"
+HEADER = struct.Struct("<4s5Q")
+RECORD = struct.Struct("<IHd")
+
+
+class Spool:
+    """Size-capped FIFO of (topic, payload, timestamp) in a memory-mapped file
+
+    append() evicts the oldest records when the ring is full, so an outage
+    longer than the spool keeps the most recent payloads. Thread-safe; a
+    record is identified by the number of records removed before it, so
+    pop() can tell whether the record peek() returned is still the oldest.
+    """
+
+    def __init__(self, path, capacity=16 * 1024 * 1024):
+        self.path = path
+        self.lock = threading.Lock()
+        self.evicted = 0
+        self.removed = 0  # Records popped or evicted since opening: the id of the oldest one
+
+        size = HEADER.size + capacity
+        existed = os.path.exists(path) and os.path.getsize(path) == size
+        self.file = open(path, "r+b" if existed else "w+b")
+        if not existed:
+            self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), size)
+
+        magic, stored_capacity, head, tail, wrap, count = HEADER.unpack_from(self.map)
+        if existed and magic == MAGIC and stored_capacity == capacity:
+            self.capacity, self.head, self.tail, self.wrap, self.count = capacity, head, tail, wrap, count
+        else:
+            self.capacity = capacity
+            self._reset()
+
+    def __len__(self):
+        return self.count
+
+    def _reset(self):
+        self.head = self.tail = self.wrap = self.count = 0
+        self._write_header()
+
+    def _write_header(self):
+        HEADER.pack_into(self.map, 0, MAGIC, self.capacity, self.head, self.tail, self.wrap, self.count)
+
+    def _read(self, offset):
+        payload_size, topic_size, timestamp = RECORD.unpack_from(self.map, HEADER.size + offset)
+        start = HEADER.size + offset + RECORD.size
+        topic = self.map[start:start + topic_size].decode()
+        payload = self.map[start + topic_size:start + topic_size + payload_size]
+        return topic, payload, timestamp, RECORD.size + topic_size + payload_size
+
+    def _drop_oldest(self):
+        size = self._read(self.head)[3]
+        self.head += size
+        self.count -= 1
+        self.removed += 1
+        if self.count == 0:
+            self.head = self.tail = self.wrap = 0
+        elif self.wrap and self.head >= self.wrap:
+            self.head, self.wrap = 0, 0
+
+    def _reserve(self, size):
+        """Offset where `size` bytes fit, evicting the oldest records as needed"""
+        while True:
+            if self.count == 0:
+                self.head = self.tail = self.wrap = 0
+            if self.wrap == 0:
+                if self.tail + size <= self.capacity:
+                    return self.tail
+                if size <= self.head:
+                    self.wrap = self.tail
+                    return 0
+            elif self.tail + size <= self.head:
+                return self.tail
+            self._drop_oldest()
+            self.evicted += 1
+
+    def append(self, topic, payload, timestamp=None):
+        """Spool one message; returns False if it can never fit in the ring"""
+        topic_bytes = topic.encode()
+        if isinstance(payload, str):
+            payload = payload.encode()
+        size = RECORD.size + len(topic_bytes) + len(payload)
+        if size > self.capacity:
+            return False
+
+        with self.lock:
+            offset = self._reserve(size)
+            start = HEADER.size + offset
+            RECORD.pack_into(self.map, start, len(payload), len(topic_bytes),
+                             time.time() if timestamp is None else timestamp)
+            start += RECORD.size
+            self.map[start:start + len(topic_bytes)] = topic_bytes
+            start += len(topic_bytes)
+            self.map[start:start + len(payload)] = payload
+            self.tail = offset + size
+            self.count += 1
+            self._write_header()
+        return True
+
+    def peek(self):
+        """Oldest (topic, payload, timestamp, record_id) without removing it, or None"""
+        with self.lock:
+            if self.count == 0:
+                return None
+            return self._read(self.head)[:3] + (self.removed,)
+
+    def pop(self, record_id=None):
+        """Remove the oldest record (after it was sent successfully)
+
+        With record_id (from peek), only remove it if it is still the oldest:
+        an append() may have evicted it in the meantime. Returns True if a
+        record was removed.
+        """
+        with self.lock:
+            if not self.count or (record_id is not None and record_id != self.removed):
+                return False
+            self._drop_oldest()
+            self._write_header()
+            return True
+
+    def flush(self):
+        self.map.flush()
+
+    def close(self):
+        with self.lock:
+            self.map.flush()
+            self.map.close()
+            self.file.close()
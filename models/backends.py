@@ -0,0 +1,54 @@
+import importlib
+import sys
+import time
+
+
+# --- Inference backend registry ---
+#
+# Backends are "module:factory" strings imported on first use, so a process
+# only pays for the runtime it selects: importing onnxruntime (or torch) takes
+# seconds and tens of MB on a Pi. Each entry also lists the heavy modules it
+# needs; load() imports them first and can report how long each one took.
+#
+# A factory takes the session options of models/yoloNAS.load_session (or
+# models/midas.load_depth_model) and returns an object with run(input_tensor).
+
+BACKENDS = {
+    "detector": {
+        "onnx": ("models.yoloNAS:load_session", ("onnxruntime",)),
+        "stub": ("models.stub_detector:stub_session", ()),  # Fake detector, no model file needed
+    },
+    "depth": {
+        "onnx": ("models.midas:load_depth_model", ("onnxruntime",)),
+    },
+}
+
+def register(kind, name, target, requires=()):
+    """Add a backend: target is "module:factory", requires the modules it imports"""
+    BACKENDS.setdefault(kind, {})[name] = (target, tuple(requires))
+
+
+def available(kind):
+    return sorted(BACKENDS.get(kind, {}))
+
+
+def load(kind, name, import_times=None):
+    """Import a backend and what it requires; returns its factory
+
+    import_times, if given, is filled with the seconds spent importing each
+    required module that was not loaded yet.
+    """
+    try:
+        target, requires = BACKENDS[kind][name]
+    except KeyError:
+        raise ValueError(f"Unknown {kind} backend '{name}', expected one of {available(kind)}") from None
+
+    for module_name in requires:
+        if module_name not in sys.modules:
+            start_time = time.perf_counter()
+            importlib.import_module(module_name)
+            if import_times is not None:
+                import_times[f"import {module_name}"] = time.perf_counter() - start_time
+
+    module_name, factory_name = target.split(":")
+    return getattr(importlib.import_module(module_name), factory_name)
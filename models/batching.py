@@ -0,0 +1,112 @@
+import threading
+import time
+
+import numpy as np
+
+from helpers.metrics import Metrics
+import models.yoloNAS as yolo_nas_model
+from models.preprocessing import Preprocessor
+
+
+# --- Multi-camera batched detection ---
+#
+# BatchCollector takes the newest frame of every camera, waiting a short
+# window after the first one so cameras that are slightly out of phase still
+# make it into the same batch. BatchDetector preprocesses each frame straight
+# into its camera's row of one [cameras, 3, H, W] tensor, runs a single
+# session call and splits the outputs back per camera. The session must
+# accept a dynamic batch dimension (python -m models.quantization --variants batch).
+
+BATCH_WINDOW = 0.02  # Seconds to wait for the other cameras after the first new frame
+
+
+class BatchCollector:
+    """Newest frame of each FrameSource, gathered within a short time window"""
+
+    def __init__(self, sources, window=BATCH_WINDOW):
+        self.sources = list(sources)
+        self.window = window
+        self.last_seq = [0] * len(self.sources)
+        self.new_frame = threading.Event()
+        for source in self.sources:
+            source.on_frame = lambda source: self.new_frame.set()
+
+    def collect(self, timeout=1.0):
+        """[(camera index, Frame)] of the cameras with a new frame (empty on timeout)
+
+        The frames are held: release each one on its source when done.
+        """
+        batch = {}
+        deadline = time.monotonic() + timeout
+        first_time = None
+        while True:
+            self.new_frame.clear()  # Before polling, so a frame arriving meanwhile wakes the wait
+            for index, source in enumerate(self.sources):
+                if index in batch:
+                    continue
+                frame = source.latest(after_seq=self.last_seq[index], timeout=0)
+                if frame is not None:
+                    batch[index] = frame
+                    self.last_seq[index] = frame.seq
+            if len(batch) == len(self.sources):
+                break
+
+            now = time.monotonic()
+            if batch and first_time is None:
+                first_time = now
+            limit = first_time + self.window if batch else deadline
+            if now >= limit:
+                break
+            self.new_frame.wait(limit - now)
+        return sorted(batch.items())
+
+    def release(self, batch):
+        for index, frame in batch:
+            self.sources[index].release(frame)
+
+
+class BatchDetector:
+    """Detect on frames of several cameras with one session call
+
+    session is an OnnxSession (or backend with run()) whose input has a
+    dynamic batch dimension; each camera keeps its own Preprocessor, so the
+    cameras may have different resolutions.
+    """
+
+    def __init__(self, session, cameras, input_size=yolo_nas_model.INPUT_SIZE, letterbox=False,
+                 confidence_threshold=0.5, allowed_classes=yolo_nas_model.ALLOWED_CLASSES, metrics=None):
+        self.session = session
+        self.input_size = input_size
+        self.confidence_threshold = confidence_threshold
+        self.allowed_classes = allowed_classes
+        self.metrics = metrics or Metrics(enabled=False)
+        self.batch = np.empty((cameras, 3, input_size[1], input_size[0]), dtype=np.float32)
+        self.preprocessors = [Preprocessor(input_size, letterbox=letterbox, input_tensor=self.batch[i:i + 1])
+                              for i in range(cameras)]
+
+    def detect(self, images):
+        """images: [(camera index, BGR frame)] -> [(boxes, scores, class_ids)] in frame pixels"""
+        metrics = self.metrics
+        t = metrics.now()
+        indices = [index for index, _ in images]
+        for index, image in images:
+            self.preprocessors[index](image)
+        if indices == list(range(len(indices))):
+            input_tensor = self.batch[:len(indices)]  # The usual case: no copy
+        else:
+            input_tensor = self.batch[indices]  # Some cameras had no new frame
+        t = metrics.lap("preprocess", t)
+
+        outputs = self.session.run(input_tensor)
+        t = metrics.lap("inference", t)
+
+        results = []
+        for row, index in enumerate(indices):
+            boxes, scores, class_ids = yolo_nas_model.process_output(
+                [output[row:row + 1] for output in outputs], self.confidence_threshold,
+                preprocessor=self.preprocessors[index], allowed_classes=self.allowed_classes,
+                input_size=self.input_size)
+            t = metrics.lap("postprocess", t)
+            results.append(yolo_nas_model.apply_nms(boxes, scores, class_ids))
+            t = metrics.lap("nms", t)
+        return results
@@ -0,0 +1,151 @@
+import numpy as np
+
+
+# --- Navigation decision engine ---
+#
+# Boxes are projected onto a coarse grid of image columns: each box adds its
+# weight to every column it overlaps, in proportion to the overlap. The weight
+# is the box height (a proxy for proximity) times a per-class weight, reduced
+# for objects the depth model puts far away. The walking path is the middle
+# band of columns; when it is occupied the engine turns toward the freer
+# side, or stops when neither side is clear. Hysteresis (separate block/clear
+# thresholds and a few frames of agreement before changing) keeps the output
+# from flickering, so it can run on every frame.
+
+DECISIONS = ("straight", "left", "right", "stop")
+
+GRID_COLUMNS = 10
+PATH_BAND = (0.4, 0.6)   # Normalized x range of the walking path (same band as the legacy rule)
+BLOCK_ENTER = 0.25       # Path occupancy at which the way is blocked...
+BLOCK_EXIT = 0.15        # ...and below which it is clear again
+SIDE_CLEAR = 0.2         # Mean occupancy under which a side is free to turn into
+SIDE_MARGIN = 0.1        # Advantage the other side needs before swapping sides mid-turn
+HOLD_FRAMES = 3          # Frames a new decision must persist before it is output ("stop" is immediate)
+DEPTH_INFLUENCE = 0.75   # Weight lost by the farthest objects (relative_depth 1, full confidence)
+
+# Heavier classes count more per pixel of height; unlisted classes weigh 1
+CLASS_WEIGHTS = {"bicycle": 1.25, "motorcycle": 1.5, "car": 1.5, "bus": 1.5, "truck": 1.5, "dog": 1.25}
+
+
+def class_weight_table(class_names, weights=CLASS_WEIGHTS):
+    """Per-class-id weight array for DecisionEngine from a {name: weight} dict"""
+    table = np.ones(len(class_names), dtype=np.float32)
+    for name, weight in weights.items():
+        table[class_names.index(name)] = weight
+    return table
+
+
+class DecisionEngine:
+    """Per-frame straight / left / right / stop from detection boxes
+
+    update() takes xyxy pixel boxes (the NMS output arrays) and returns the
+    decision; the last column occupancy is kept in self.occupancy and the
+    occupancy of the walking path (0 free to 1 blocked) in self.hazard.
+    """
+
+    def __init__(self, columns=GRID_COLUMNS, path_band=PATH_BAND, class_weights=None,
+                 block_enter=BLOCK_ENTER, block_exit=BLOCK_EXIT, side_clear=SIDE_CLEAR,
+                 side_margin=SIDE_MARGIN, hold_frames=HOLD_FRAMES, depth_influence=DEPTH_INFLUENCE):
+        self.edges = np.linspace(0.0, 1.0, columns + 1, dtype=np.float32)
+        centers = (self.edges[:-1] + self.edges[1:]) / 2
+        # Column ranges (slices are cheaper to index than masks)
+        first = int(np.searchsorted(centers, path_band[0], side="left"))
+        last = int(np.searchsorted(centers, path_band[1], side="right"))
+        if first >= last:
+            raise ValueError(f"Path band {path_band} contains no column center of a {columns}-column grid")
+        self.path, self.left, self.right = slice(first, last), slice(0, first), slice(last, columns)
+        self.inv_column_width = float(columns)
+        self.class_weights = class_weights
+        self.block_enter = block_enter
+        self.block_exit = block_exit
+        self.side_clear = side_clear
+        self.side_margin = side_margin
+        self.hold_frames = hold_frames
+        self.depth_influence = depth_influence
+
+        self.occupancy = np.zeros(columns, dtype=np.float32)
+        self.hazard = 0.0
+        self.decision = None
+        self.blocked = False
+        self.candidate = None
+        self.candidate_frames = 0
+
+    def occupancy_grid(self, boxes, frame_size, class_ids=None, depths=None, depth_confidences=None):
+        """Column occupancy in [0, 1] of xyxy pixel boxes"""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        if not len(boxes):
+            return np.zeros(len(self.edges) - 1, dtype=np.float32)
+        width, height = frame_size
+        x1 = np.clip(boxes[:, 0:1] / width, 0.0, 1.0)
+        x2 = np.clip(boxes[:, 2:3] / width, 0.0, 1.0)
+        weights = np.clip((boxes[:, 3] - boxes[:, 1]) / height, 0.0, 1.0)
+        if class_ids is not None and self.class_weights is not None:
+            weights = weights * self.class_weights[np.asarray(class_ids, dtype=np.intp)]
+        if depths is not None:
+            farness = np.asarray(depths, dtype=np.float32)
+            if depth_confidences is not None:
+                farness = farness * np.asarray(depth_confidences, dtype=np.float32)
+            weights = weights * (1.0 - self.depth_influence * farness)
+
+        # [N, columns] fraction of each column covered by each box
+        overlap = np.minimum(x2, self.edges[1:]) - np.maximum(x1, self.edges[:-1])
+        np.maximum(overlap, 0.0, out=overlap)
+        occupancy = weights @ overlap * self.inv_column_width
+        return np.minimum(occupancy, 1.0, out=occupancy)
+
+    def update(self, boxes, frame_size, class_ids=None, depths=None, depth_confidences=None):
+        """Decision for this frame (after hysteresis)"""
+        self.occupancy = occupancy = self.occupancy_grid(boxes, frame_size, class_ids, depths,
+                                                         depth_confidences)
+        self.hazard = path = float(occupancy[self.path].max())
+        self.blocked = path >= (self.block_exit if self.blocked else self.block_enter)
+        return self._settle(self._candidate(occupancy) if self.blocked else "straight")
+
+    def update_from_detections(self, detections, frame_size):
+        """update() for detection dicts as published (bbox, class_id, optional relative_depth)"""
+        if not detections:
+            return self.update(np.empty((0, 4), dtype=np.float32), frame_size)
+        boxes = [obj["bbox"] for obj in detections]
+        class_ids = [obj["class_id"] for obj in detections]
+        depths = confidences = None
+        if "relative_depth" in detections[0]:
+            depths = [obj.get("relative_depth", 0.0) for obj in detections]
+            confidences = [obj.get("depth_confidence", 0.0) for obj in detections]
+        return self.update(boxes, frame_size, class_ids, depths, confidences)
+
+    def _candidate(self, occupancy):
+        left = float(occupancy[self.left].mean()) if self.left.start < self.left.stop else 1.0
+        right = float(occupancy[self.right].mean()) if self.right.start < self.right.stop else 1.0
+        # Keep turning the same way unless the other side is clearly freer
+        if self.decision == "left":
+            preferred = "right" if right + self.side_margin < left else "left"
+        elif self.decision == "right":
+            preferred = "left" if left + self.side_margin < right else "right"
+        else:
+            preferred = "left" if left <= right else "right"
+        sides = {"left": left, "right": right}
+        other = "right" if preferred == "left" else "left"
+        if sides[preferred] < self.side_clear:
+            return preferred
+        if sides[other] < self.side_clear:
+            return other
+        return "stop"
+
+    def _settle(self, candidate):
+        if self.decision is None or candidate == self.decision or candidate == "stop":
+            self.decision = candidate
+            self.candidate, self.candidate_frames = None, 0
+            return candidate
+        if candidate == self.candidate:
+            self.candidate_frames += 1
+        else:
+            self.candidate, self.candidate_frames = candidate, 1
+        if self.candidate_frames >= self.hold_frames:
+            self.decision = candidate
+            self.candidate, self.candidate_frames = None, 0
+        return self.decision
+
+    def reset(self):
+        self.decision = None
+        self.blocked = False
+        self.candidate, self.candidate_frames = None, 0
@@ -0,0 +1,248 @@
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import models.backends as backends
+import models.yoloNAS as yolo_nas_model
+from models.preprocessing import Preprocessor
+
+
+logger = logging.getLogger(__name__)
+
+
+# --- Multi-process detector pool ---
+#
+# The parent copies each frame once into a slot of a shared-memory ring and
+# sends (seq, slot, roi) to a task queue. Every worker process owns its own
+# session and runs preprocessing, inference, process_output and apply_nms on
+# a zero-copy view of the slot, then returns the (small) detections. Results
+# are handed back in submission order, so the tracker sees frames in sequence.
+
+# detections: (boxes, scores, class_ids) in frame pixels, None for frames that
+# skipped the detector; timings: per-stage seconds measured in the worker
+PoolResult = namedtuple("PoolResult", ["seq", "meta", "detections", "timings"])
+
+START_METHOD = "spawn"  # Never fork a process that may already run ONNX Runtime threads
+REORDER_TIMEOUT = 2.0   # Seconds to wait for a lost frame before skipping it
+
+
+def _worker_main(index, shm_name, frame_shape, dtype, slots, tasks, results, config):
+    """Worker process: attach to the ring, build a session, detect until told to stop"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    ring = np.ndarray((slots,) + tuple(frame_shape), dtype=dtype, buffer=shm.buf)
+    try:
+        factory = config["backend_factory"] or backends.load("detector", config["backend"])
+        session = factory(**config["backend_options"])
+        preprocessor = Preprocessor(config["input_size"], letterbox=config["letterbox"])
+        roi_preprocessor = Preprocessor(config["input_size"], letterbox=True)
+        results.put(("ready", index, None))
+    except Exception as e:
+        results.put(("failed", index, repr(e)))
+        shm.close()
+        return
+
+    clock = time.perf_counter
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        seq, slot, roi = task
+        try:
+            frame = ring[slot]
+            used_preprocessor = preprocessor
+            if roi is not None:
+                x1, y1, x2, y2 = roi
+                frame = frame[y1:y2, x1:x2]
+                used_preprocessor = roi_preprocessor
+
+            t0 = clock()
+            _, input_tensor, orig_size = used_preprocessor(frame)
+            t1 = clock()
+            outputs = session.run(input_tensor)
+            t2 = clock()
+            boxes, scores, class_ids = yolo_nas_model.process_output(
+                outputs, config["confidence_threshold"], orig_size, used_preprocessor,
+                allowed_classes=config["allowed_classes"], input_size=config["input_size"])
+            t3 = clock()
+            boxes, scores, class_ids = yolo_nas_model.apply_nms(boxes, scores, class_ids)
+            t4 = clock()
+            if roi is not None:
+                boxes[:, 0::2] += x1
+                boxes[:, 1::2] += y1
+            timings = {"preprocess": t1 - t0, "inference": t2 - t1, "postprocess": t3 - t2, "nms": t4 - t3}
+            results.put(("result", seq, (slot, (boxes, scores, class_ids), timings)))
+        except Exception as e:
+            results.put(("error", seq, (slot, repr(e))))
+    shm.close()
+
+
+class InferencePool:
+    """Run the detector in `workers` processes on frames shared through a memory ring
+
+    submit() copies a frame into a free slot and returns its sequence number,
+    or None when every slot is still being processed (the caller drops the
+    frame or treats it as a skipped frame). get() returns PoolResults strictly
+    in submission order.
+    """
+
+    def __init__(self, workers=2, frame_shape=(720, 1280, 3), dtype=np.uint8, slots=None,
+                 backend="onnx", backend_factory=None, backend_options=None,
+                 input_size=yolo_nas_model.INPUT_SIZE,
+                 letterbox=False, confidence_threshold=0.5,
+                 allowed_classes=yolo_nas_model.ALLOWED_CLASSES):
+        self.workers = workers
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = slots or workers * 2
+
+        if backend_options is None:
+            # Split the cores between the workers instead of oversubscribing them
+            backend_options = {"model_path": yolo_nas_model.MODEL_PATH, "input_size": input_size,
+                               "intra_op_threads": max(1, (os.cpu_count() or 1) // workers)}
+        self.config = {
+            "backend": backend,  # Name in models/backends.py, imported by the workers only
+            "backend_factory": backend_factory,
+            "backend_options": backend_options,
+            "input_size": input_size,
+            "letterbox": letterbox,
+            "confidence_threshold": confidence_threshold,
+            "allowed_classes": allowed_classes,
+        }
+
+        self.lock = threading.Lock()
+        self.shm = None
+        self.ring = None
+        self.processes = []
+        self.free_slots = list(range(self.slots))
+        self.meta = {}
+        self.done = {}
+        self.next_submit = 0
+        self.next_result = 0
+        self.waiting_since = None
+
+    def start(self, timeout=120.0):
+        """Create the ring and the workers; returns once every worker has a session"""
+        frame_bytes = int(np.prod(self.frame_shape)) * self.dtype.itemsize
+        self.shm = shared_memory.SharedMemory(create=True, size=frame_bytes * self.slots)
+        self.ring = np.ndarray((self.slots,) + self.frame_shape, dtype=self.dtype, buffer=self.shm.buf)
+
+        context = mp.get_context(START_METHOD)
+        self.tasks = context.Queue()
+        self.results = context.Queue()
+        # The first worker starts alone so it writes the optimized-graph cache
+        # that the others then load, instead of all of them racing to write it
+        for batch in ([0], range(1, self.workers)):
+            for index in batch:
+                process = context.Process(
+                    target=_worker_main, name=f"inference-{index}", daemon=True,
+                    args=(index, self.shm.name, self.frame_shape, self.dtype.str, self.slots,
+                          self.tasks, self.results, self.config))
+                process.start()
+                self.processes.append(process)
+            for _ in batch:
+                status, index, error = self.results.get(timeout=timeout)
+                if status != "ready":
+                    self.close()
+                    raise RuntimeError(f"Inference worker {index} failed to start: {error}")
+        logger.info(f"Inference pool ready: {self.workers} workers, {self.slots} frame slots")
+        return self
+
+    def submit(self, frame, meta=None, roi=None):
+        """Queue a frame for detection; returns its seq or None if no slot is free"""
+        if frame.shape != self.frame_shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match the pool's {self.frame_shape}")
+        with self.lock:
+            if not self.free_slots:
+                return None
+            slot = self.free_slots.pop()
+            seq = self.next_submit
+            self.next_submit += 1
+            self.meta[seq] = meta
+        np.copyto(self.ring[slot], frame)
+        self.tasks.put((seq, slot, roi))
+        return seq
+
+    def submit_skipped(self, meta=None):
+        """Reserve the next seq for a frame that skips the detector, keeping it in order"""
+        with self.lock:
+            seq = self.next_submit
+            self.next_submit += 1
+            self.done[seq] = PoolResult(seq, meta, None, {})
+        return seq
+
+    def in_flight(self):
+        with self.lock:
+            return self.slots - len(self.free_slots)
+
+    def _collect(self, timeout):
+        """Move one worker message into the reorder buffer; False on timeout"""
+        try:
+            status, seq, data = self.results.get(timeout=timeout)
+        except queue.Empty:
+            return False
+        with self.lock:
+            if seq < self.next_result:
+                # Already skipped as lost: only its slot is still in use
+                logger.debug(f"Dropping late result for frame {seq}")
+                self.free_slots.append(data[0])
+                return True
+            if status == "result":
+                slot, detections, timings = data
+                self.done[seq] = PoolResult(seq, self.meta.pop(seq, None), detections, timings)
+            else:
+                slot, error = data
+                logger.error(f"Inference worker failed on frame {seq}: {error}")
+                self.done[seq] = PoolResult(seq, self.meta.pop(seq, None), None, {})
+            self.free_slots.append(slot)
+        return True
+
+    def get(self, timeout=None):
+        """Next result in submission order, or None if it is not ready within timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                result = self.done.pop(self.next_result, None)
+                if result is not None:
+                    self.next_result += 1
+                    self.waiting_since = None
+                    return result
+                self._skip_lost()
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            self._collect(0.1 if remaining is None else min(remaining, 0.1))
+
+    def _skip_lost(self):
+        """Give up on a frame whose result never came while later ones did (lock held)"""
+        if self.next_result >= self.next_submit or not self.done:
+            return
+        now = time.monotonic()
+        if self.waiting_since is None:
+            self.waiting_since = now
+        elif now - self.waiting_since > REORDER_TIMEOUT:
+            logger.warning(f"Skipping frame {self.next_result}: no result after {REORDER_TIMEOUT}s")
+            self.meta.pop(self.next_result, None)
+            self.next_result += 1
+            self.waiting_since = None
+
+    def close(self):
+        for _ in self.processes:
+            self.tasks.put(None)
+        for process in self.processes:
+            process.join(timeout=5.0)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        if self.shm is not None:
+            self.ring = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
@@ -1,14 +1,126 @@
 # import necessary libraries
+import logging
+
+import cv2
+import numpy as np
+
+from models.onnx_session import OnnxSession
+from models.preprocessing import Preprocessor
+
+
+logger = logging.getLogger(__name__)
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+DPT_MEAN = (0.5, 0.5, 0.5)
+DPT_STD = (0.5, 0.5, 0.5)
+
+# DEPTH_MODEL_SIZE -> (ONNX model, native input size, normalization mean, std)
+MIDAS_MODELS = {
+    "small": ("midas_v21_small_256.onnx", (256, 256), IMAGENET_MEAN, IMAGENET_STD),
+    "base": ("dpt_hybrid_384.onnx", (384, 384), DPT_MEAN, DPT_STD),
+    "large": ("dpt_large_384.onnx", (384, 384), DPT_MEAN, DPT_STD),
+}
+
+BOX_SHRINK = 0.5  # Sample the central part of each box to avoid background bleeding in
+SPREAD_SCALE = 0.1  # Std of the normalized disparity in a box at which confidence drops to 1/e
+
+
+class DepthEstimator:
+    """MiDaS relative depth at the model's native (low) resolution"""
+
+    def __init__(self, model_size="small", **session_options):
+        model_path, input_size, mean, std = MIDAS_MODELS[model_size]
+        self.input_size = input_size
+        self.preprocessor = Preprocessor(input_size, mean=mean, std=std)
+        self.session = OnnxSession(model_path, input_shape=(1, 3, input_size[1], input_size[0]),
+                                   **session_options)
+
+    def estimate(self, frame):
+        """Return a [H, W] disparity map normalized to [0, 1] (1 = closest)
+
+        The map is at the model's input resolution; it is a reused output
+        buffer, so it is only valid until the next call.
+        """
+        _, input_tensor, _ = self.preprocessor(frame)
+        disparity = self.session.run(input_tensor)[0]
+        disparity = disparity.reshape(disparity.shape[-2:])
+
+        # MiDaS output is relative inverse depth with arbitrary scale/shift
+        low, high = float(disparity.min()), float(disparity.max())
+        disparity -= low
+        disparity *= 1.0 / (high - low) if high > low else 0.0
+        return disparity
+
+
+def sample_box_depths(disparity, boxes, frame_size, shrink=BOX_SHRINK, spread_scale=SPREAD_SCALE):
+    """Mean relative depth and confidence of each xyxy frame box, in one vectorized pass
+
+    Boxes are mapped from frame to depth-map coordinates and reduced to their
+    central region; means and variances of all boxes come from one integral
+    image of the disparity (and its square), so cost does not grow with box size.
+
+    Returns:
+        (relative_depth, depth_confidence): [N] arrays in [0, 1]. relative_depth
+        is 0 for the closest point of the scene and 1 for the farthest;
+        depth_confidence is high when depth is uniform inside the box: it
+        decays with the absolute spread of the [0, 1] disparity, so distant
+        objects (disparity near 0) are not penalized for being far.
+    """
+    map_height, map_width = disparity.shape
+    frame_width, frame_height = frame_size
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+
+    centers_x = (boxes[:, 0] + boxes[:, 2]) * 0.5 * (map_width / frame_width)
+    centers_y = (boxes[:, 1] + boxes[:, 3]) * 0.5 * (map_height / frame_height)
+    half_widths = (boxes[:, 2] - boxes[:, 0]) * 0.5 * shrink * (map_width / frame_width)
+    half_heights = (boxes[:, 3] - boxes[:, 1]) * 0.5 * shrink * (map_height / frame_height)
+
+    x1 = np.clip(np.floor(centers_x - half_widths), 0, map_width - 1).astype(np.intp)
+    y1 = np.clip(np.floor(centers_y - half_heights), 0, map_height - 1).astype(np.intp)
+    x2 = np.clip(np.ceil(centers_x + half_widths), x1 + 1, map_width).astype(np.intp)
+    y2 = np.clip(np.ceil(centers_y + half_heights), y1 + 1, map_height).astype(np.intp)
+
+    sums, square_sums = cv2.integral2(disparity, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+    areas = (x2 - x1) * (y2 - y1)
+    box_sums = sums[y2, x2] - sums[y1, x2] - sums[y2, x1] + sums[y1, x1]
+    box_square_sums = (square_sums[y2, x2] - square_sums[y1, x2]
+                       - square_sums[y2, x1] + square_sums[y1, x1])
+
+    means = box_sums / areas
+    stds = np.sqrt(np.maximum(box_square_sums / areas - means * means, 0))
+
+    relative_depth = 1.0 - means
+    depth_confidence = np.exp(-stds / spread_scale)
+    return relative_depth, depth_confidence
+
+
+def load_depth_model(model_size="small", **session_options):
+    """Create the MiDaS depth estimator (see MIDAS_MODELS for the model files)"""
+    return DepthEstimator(model_size, **session_options)
+
 
 def run_depth_estimation(self, frame, detected_objects):
     """Run MIDAS depth estimation on frame and extract depth for detected objects"""
     try:
+        if not detected_objects:
+            return detected_objects
+
+        disparity = self.depth_model.estimate(frame)
+        boxes = [obj['bbox'] for obj in detected_objects]
+        relative_depth, depth_confidence = sample_box_depths(
+            disparity, boxes, (frame.shape[1], frame.shape[0]))
+
+        for obj, depth, confidence in zip(detected_objects, relative_depth.tolist(),
+                                          depth_confidence.tolist()):
+            obj['relative_depth'] = round(depth, 3)
+            obj['depth_confidence'] = round(confidence, 3)
         return detected_objects
-        
+
     except Exception as e:
         logger.error(f"Error in depth estimation: {e}")
         # Return objects without depth information
         for obj in detected_objects:
             obj['relative_depth'] = 0.0
             obj['depth_confidence'] = 0.0
-        return detected_objects
\ No newline at end of file
+        return detected_objects
@@ -0,0 +1,168 @@
+import numpy as np
+
+
+# Below this many candidates a single pairwise IoU matrix is cheaper than
+# recomputing one-to-many IoUs per kept box
+PAIRWISE_MAX_CANDIDATES = 128
+
+
+def _candidate_order(scores, score_threshold=0.0, top_k=None):
+    """Indices of candidates above score_threshold, sorted by descending score
+
+    With top_k only the k best candidates are sorted (argpartition first), so
+    the cost stays bounded when the detector emits many low-score boxes.
+    """
+    candidates = np.flatnonzero(scores > score_threshold)
+    if top_k is not None and candidates.size > top_k:
+        best = np.argpartition(scores[candidates], -top_k)[-top_k:]
+        candidates = candidates[best]
+    return candidates[np.argsort(scores[candidates], kind="stable")[::-1]]
+
+
+def _offset_by_class(boxes, class_ids):
+    """Shift boxes of each class into a disjoint coordinate range (batched NMS trick)
+
+    Boxes of different classes can then never overlap, so a single class-agnostic
+    pass performs per-class suppression.
+    """
+    offsets = class_ids.astype(boxes.dtype) * (boxes.max() + 1)
+    return boxes + offsets[:, None]
+
+
+def _box_areas(x1, y1, x2, y2):
+    return np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+
+
+def box_iou(boxes_a, boxes_b):
+    """Pairwise IoU matrix [len(a), len(b)] between two sets of xyxy boxes"""
+    inter_w = (np.minimum(boxes_a[:, None, 2], boxes_b[:, 2])
+               - np.maximum(boxes_a[:, None, 0], boxes_b[:, 0]))
+    inter_h = (np.minimum(boxes_a[:, None, 3], boxes_b[:, 3])
+               - np.maximum(boxes_a[:, None, 1], boxes_b[:, 1]))
+    inter = np.maximum(inter_w, 0) * np.maximum(inter_h, 0)
+    areas_a = _box_areas(boxes_a[:, 0], boxes_a[:, 1], boxes_a[:, 2], boxes_a[:, 3])
+    areas_b = _box_areas(boxes_b[:, 0], boxes_b[:, 1], boxes_b[:, 2], boxes_b[:, 3])
+    return inter / (areas_a[:, None] + areas_b - inter + 1e-9)
+
+
+def _iou_one_to_many(i, rest, x1, y1, x2, y2, areas):
+    inter_w = np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest])
+    inter_h = np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest])
+    inter = np.maximum(inter_w, 0) * np.maximum(inter_h, 0)
+    return inter / (areas[i] + areas[rest] - inter + 1e-9)
+
+
+def _greedy_pairwise(x1, y1, x2, y2, areas, iou_threshold, limit):
+    """Greedy suppression using one precomputed [N, N] overlap matrix"""
+    inter_w = np.minimum(x2[:, None], x2) - np.maximum(x1[:, None], x1)
+    inter_h = np.minimum(y2[:, None], y2) - np.maximum(y1[:, None], y1)
+    inter = np.maximum(inter_w, 0) * np.maximum(inter_h, 0)
+    overlaps = inter > iou_threshold * (areas[:, None] + areas - inter)
+
+    keep = np.empty(limit, dtype=np.intp)
+    num_kept = 0
+    suppressed = np.zeros(x1.size, dtype=bool)
+    for i in range(x1.size):
+        if suppressed[i]:
+            continue
+        keep[num_kept] = i
+        num_kept += 1
+        if num_kept == limit:
+            break
+        suppressed |= overlaps[i]
+    return keep[:num_kept]
+
+
+def _greedy_incremental(x1, y1, x2, y2, areas, iou_threshold, limit):
+    """Greedy suppression computing IoUs of each kept box against the survivors"""
+    keep = np.empty(limit, dtype=np.intp)
+    num_kept = 0
+    remaining = np.arange(x1.size)
+    while remaining.size and num_kept < limit:
+        i = remaining[0]
+        keep[num_kept] = i
+        num_kept += 1
+
+        rest = remaining[1:]
+        iou = _iou_one_to_many(i, rest, x1, y1, x2, y2, areas)
+        remaining = rest[iou <= iou_threshold]
+    return keep[:num_kept]
+
+
+def nms(boxes, scores, iou_threshold=0.5, class_ids=None, score_threshold=0.0,
+        top_k=None, max_detections=None):
+    """Greedy non-maximum suppression on xyxy boxes
+
+    Args:
+        boxes: [N, 4] array of x1, y1, x2, y2
+        scores: [N] array of confidences
+        iou_threshold: boxes overlapping a kept box by more than this are dropped
+        class_ids: optional [N] array; when given, suppression is per class
+        score_threshold: candidates at or below this score are ignored
+        top_k: only the top_k highest-scoring candidates enter NMS
+        max_detections: stop once this many boxes are kept
+
+    Returns:
+        Index array (into boxes) of the kept boxes, by descending score.
+    """
+    order = _candidate_order(scores, score_threshold, top_k)
+    if order.size == 0:
+        return order
+
+    if class_ids is not None:
+        boxes = _offset_by_class(boxes, class_ids)
+
+    candidates = boxes[order]
+    x1, y1, x2, y2 = candidates[:, 0], candidates[:, 1], candidates[:, 2], candidates[:, 3]
+    areas = _box_areas(x1, y1, x2, y2)
+
+    limit = order.size if max_detections is None else min(order.size, max_detections)
+    if order.size <= PAIRWISE_MAX_CANDIDATES:
+        keep = _greedy_pairwise(x1, y1, x2, y2, areas, iou_threshold, limit)
+    else:
+        keep = _greedy_incremental(x1, y1, x2, y2, areas, iou_threshold, limit)
+    return order[keep]
+
+
+def soft_nms(boxes, scores, sigma=0.5, score_threshold=0.001, class_ids=None,
+             top_k=None, max_detections=None):
+    """Gaussian Soft-NMS on xyxy boxes
+
+    Instead of discarding overlapping boxes, their scores are decayed by
+    exp(-iou^2 / sigma); boxes whose score falls below score_threshold are
+    dropped. Useful for crowded scenes where true neighbours overlap.
+
+    Returns:
+        (indices, decayed_scores): index array of the kept boxes and their
+        scores after decay, by descending decayed score.
+    """
+    order = _candidate_order(scores, score_threshold, top_k)
+    if order.size == 0:
+        return order, scores[order]
+
+    if class_ids is not None:
+        boxes = _offset_by_class(boxes, class_ids)
+
+    candidates = boxes[order]
+    x1, y1, x2, y2 = candidates[:, 0], candidates[:, 1], candidates[:, 2], candidates[:, 3]
+    areas = _box_areas(x1, y1, x2, y2)
+    current = scores[order].astype(np.float32)
+
+    limit = order.size if max_detections is None else min(order.size, max_detections)
+    keep = np.empty(limit, dtype=np.intp)
+    kept_scores = np.empty(limit, dtype=np.float32)
+    num_kept = 0
+    remaining = np.arange(order.size)
+    while remaining.size and num_kept < limit:
+        best = np.argmax(current[remaining])
+        i = remaining[best]
+        keep[num_kept] = i
+        kept_scores[num_kept] = current[i]
+        num_kept += 1
+
+        rest = np.delete(remaining, best)
+        iou = _iou_one_to_many(i, rest, x1, y1, x2, y2, areas)
+        current[rest] *= np.exp(-(iou * iou) / sigma)
+        remaining = rest[current[rest] > score_threshold]
+
+    return order[keep[:num_kept]], kept_scores[:num_kept]
@@ -0,0 +1,159 @@
+import os
+import time
+import logging
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+# Defaults sized for a 4-core Raspberry Pi
+INTRA_OP_THREADS = 4
+INTER_OP_THREADS = 1
+OPTIMIZATION_LEVEL = "all"    # Options: "disable", "basic", "extended", "all"
+WARMUP_RUNS = 3
+
+# Names in ort.GraphOptimizationLevel (onnxruntime is only imported once a session is created)
+OPTIMIZATION_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+
+ONNX_TYPES = {
+    "tensor(float)": np.float32,
+    "tensor(float16)": np.float16,
+    "tensor(double)": np.float64,
+    "tensor(int64)": np.int64,
+    "tensor(int32)": np.int32,
+    "tensor(uint8)": np.uint8,
+    "tensor(int8)": np.int8,
+    "tensor(bool)": np.bool_,
+}
+
+
+def optimized_model_path(model_path, optimization_level=OPTIMIZATION_LEVEL):
+    """Where the optimized graph of model_path is cached"""
+    root, ext = os.path.splitext(model_path)
+    return f"{root}.{optimization_level}.opt{ext}"
+
+
+class OnnxSession:
+    """ONNX Runtime session with tuned threading, a cached optimized graph and IOBinding
+
+    The first startup optimizes the graph and serializes it next to the model;
+    later startups load the cached graph and skip re-optimization. Input and
+    output names are resolved once, and with IOBinding the outputs are written
+    into preallocated buffers that run() returns on every call, so consume
+    them before the next run().
+    """
+
+    def __init__(self, model_path, input_shape=None, intra_op_threads=INTRA_OP_THREADS,
+                 inter_op_threads=INTER_OP_THREADS, optimization_level=OPTIMIZATION_LEVEL,
+                 cache_optimized=True, warmup_runs=WARMUP_RUNS, use_io_binding=True):
+        self.model_path = model_path
+        self.timings = {}
+
+        start_time = time.perf_counter()
+        self.session, self.from_cache = self._create_session(
+            model_path, intra_op_threads, inter_op_threads, optimization_level, cache_optimized)
+        self.timings["load"] = time.perf_counter() - start_time
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_dtype = ONNX_TYPES.get(model_input.type, np.float32)
+        self.model_input_shape = tuple(model_input.shape)  # Symbolic (str/None) for dynamic dims
+        self.input_shape = tuple(input_shape) if input_shape else tuple(
+            dim if isinstance(dim, int) else 1 for dim in model_input.shape)
+        self.output_names = [output.name for output in self.session.get_outputs()]
+
+        self.io_binding = None
+        self.outputs = None
+        self.bound_input = None
+
+        start_time = time.perf_counter()
+        self._warm_up(warmup_runs)
+        self.timings["warmup"] = time.perf_counter() - start_time
+
+        if use_io_binding:
+            self._setup_io_binding()
+
+        logger.info(f"Loaded {model_path} ({'cached optimized graph' if self.from_cache else 'optimized at startup'}): "
+                    f"load {self.timings['load']:.2f}s, first run {self.timings.get('first_run', 0):.2f}s, "
+                    f"warm-up {self.timings['warmup']:.2f}s")
+
+    @staticmethod
+    def _create_session(model_path, intra_op_threads, inter_op_threads, optimization_level,
+                        cache_optimized):
+        import onnxruntime as ort  # Slow to import: keep it out of module import time
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+
+        cached_path = optimized_model_path(model_path, optimization_level)
+        cache_valid = (cache_optimized and os.path.exists(cached_path)
+                       and os.path.getmtime(cached_path) >= os.path.getmtime(model_path))
+
+        if cache_valid:
+            # Already optimized offline: skip graph optimization entirely
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+            try:
+                session = ort.InferenceSession(cached_path, sess_options=options,
+                                               providers=["CPUExecutionProvider"])
+                return session, True
+            except Exception as e:
+                logger.warning(f"Ignoring unusable optimized model cache {cached_path}: {e}")
+
+        options.graph_optimization_level = getattr(ort.GraphOptimizationLevel,
+                                                   OPTIMIZATION_LEVELS[optimization_level])
+        if cache_optimized:
+            options.optimized_model_filepath = cached_path
+        session = ort.InferenceSession(model_path, sess_options=options,
+                                       providers=["CPUExecutionProvider"])
+        return session, False
+
+    def _warm_up(self, runs):
+        """Run dummy inputs so lazy allocations and kernel selection happen before real frames"""
+        dummy = np.zeros(self.input_shape, dtype=self.input_dtype)
+        for i in range(runs):
+            start_time = time.perf_counter()
+            self.session.run(self.output_names, {self.input_name: dummy})
+            if i == 0:
+                self.timings["first_run"] = time.perf_counter() - start_time
+
+    def _setup_io_binding(self):
+        """Preallocate output buffers and bind them once"""
+        dummy = np.zeros(self.input_shape, dtype=self.input_dtype)
+        sample_outputs = self.session.run(self.output_names, {self.input_name: dummy})
+
+        self.io_binding = self.session.io_binding()
+        self.outputs = [np.empty_like(output) for output in sample_outputs]
+        for name, buffer in zip(self.output_names, self.outputs):
+            self.io_binding.bind_output(name, "cpu", 0, buffer.dtype, buffer.shape,
+                                        buffer.ctypes.data)
+
+    def run(self, input_tensor):
+        """Run inference on one input tensor and return the list of outputs"""
+        if self.io_binding is None or input_tensor.shape != self.input_shape:
+            return self.session.run(self.output_names, {self.input_name: input_tensor})
+
+        # Preallocated input buffers (e.g. Preprocessor) only need binding once
+        if input_tensor is not self.bound_input:
+            input_tensor = np.ascontiguousarray(input_tensor, dtype=self.input_dtype)
+            self.io_binding.bind_input(self.input_name, "cpu", 0, input_tensor.dtype,
+                                       input_tensor.shape, input_tensor.ctypes.data)
+            self.bound_input = input_tensor
+
+        self.session.run_with_iobinding(self.io_binding)
+        return self.outputs
+
+    def report(self):
+        """One-line startup timing summary"""
+        return (f"{os.path.basename(self.model_path)}: "
+                f"{'warm start (cached graph)' if self.from_cache else 'cold start'}, "
+                f"load {self.timings['load'] * 1000:.0f} ms, "
+                f"first run {self.timings.get('first_run', 0) * 1000:.0f} ms, "
+                f"warm-up {self.timings['warmup'] * 1000:.0f} ms")
@@ -0,0 +1,116 @@
+import cv2
+import numpy as np
+
+
+LETTERBOX_PAD_VALUE = 114  # Grey padding used by the YOLO family for letterboxing
+
+
+class Preprocessor:
+    """Reusable image preprocessor writing into a preallocated NCHW float32 buffer
+
+    BGR -> RGB conversion, HWC -> CHW transpose, float cast and 1/255 scaling
+    are done in a single pass straight into the input tensor, so the only
+    per-frame work is the resize. The returned tensor is the same buffer on
+    every call: consume it (run inference) before preprocessing the next frame.
+
+    With letterbox=True the aspect ratio is preserved and the remaining area is
+    padded; scale/pad are kept so boxes can be mapped back with map_boxes().
+
+    input_tensor optionally supplies the [1, 3, H, W] buffer to write into,
+    e.g. one camera's row of a batch tensor (see models/batching.py).
+    """
+
+    def __init__(self, input_size=(640, 640), letterbox=False, mean=None, std=None, input_tensor=None):
+        self.input_size = input_size
+        self.letterbox = letterbox
+        shape = (1, 3, input_size[1], input_size[0])
+        if input_tensor is None:
+            input_tensor = np.empty(shape, dtype=np.float32)
+        elif input_tensor.shape != shape or input_tensor.dtype != np.float32:
+            raise ValueError(f"input_tensor must be a float32 {shape} array, got {input_tensor.dtype} {input_tensor.shape}")
+        self.input_tensor = input_tensor
+
+        # Optional per-channel (RGB) normalization folded into the scaling pass
+        self.mean = None if mean is None else np.asarray(mean, dtype=np.float32).reshape(3, 1, 1)
+        self.std = None if std is None else np.asarray(std, dtype=np.float32).reshape(3, 1, 1)
+
+        self.orig_size = None
+        self.scale = (1.0, 1.0)   # (scale_x, scale_y) from original to input pixels
+        self.pad = (0, 0)         # (pad_x, pad_y) in input pixels
+        self.resized_size = input_size
+        self.resized = None
+
+    def _configure(self, orig_width, orig_height, channels):
+        """Compute geometry and (re)allocate buffers when the frame size changes"""
+        input_width, input_height = self.input_size
+        if self.letterbox:
+            ratio = min(input_width / orig_width, input_height / orig_height)
+            new_width = int(round(orig_width * ratio))
+            new_height = int(round(orig_height * ratio))
+            self.scale = (ratio, ratio)
+            self.pad = ((input_width - new_width) // 2, (input_height - new_height) // 2)
+        else:
+            new_width, new_height = input_width, input_height
+            self.scale = (input_width / orig_width, input_height / orig_height)
+            self.pad = (0, 0)
+
+        self.orig_size = (orig_width, orig_height)
+        self.resized_size = (new_width, new_height)
+        self.resized = np.empty((new_height, new_width, channels), dtype=np.uint8)
+
+        # Padding never changes for a given geometry, so fill it once here
+        if self.letterbox:
+            self.input_tensor.fill(LETTERBOX_PAD_VALUE / 255.0)
+            if self.mean is not None:
+                self.input_tensor[0] -= self.mean
+            if self.std is not None:
+                self.input_tensor[0] /= self.std
+
+    def __call__(self, image, annotate=False):
+        """Preprocess a BGR (or 4-channel BGRX) frame
+
+        Returns (orig_image, input_tensor, orig_size). orig_image is a copy of
+        the frame when annotate=True (so boxes can be drawn on it) and None
+        otherwise.
+        """
+        orig_height, orig_width, channels = image.shape
+        if self.orig_size != (orig_width, orig_height) or self.resized.shape[2] != channels:
+            self._configure(orig_width, orig_height, channels)
+
+        orig_image = image.copy() if annotate else None
+
+        if self.resized_size == (orig_width, orig_height):
+            resized = image
+        else:
+            resized = cv2.resize(image, self.resized_size, dst=self.resized,
+                                 interpolation=cv2.INTER_LINEAR)
+
+        pad_x, pad_y = self.pad
+        new_width, new_height = self.resized_size
+        target = self.input_tensor[0, :, pad_y:pad_y + new_height, pad_x:pad_x + new_width]
+
+        # HWC BGR(X) uint8 -> CHW RGB float32 in one pass (channel flip is a view)
+        np.multiply(resized.transpose(2, 0, 1)[2::-1], np.float32(1.0 / 255.0),
+                    out=target, casting="unsafe")
+        if self.mean is not None:
+            target -= self.mean
+        if self.std is not None:
+            target /= self.std
+
+        return orig_image, self.input_tensor, (orig_width, orig_height)
+
+    def map_boxes(self, boxes):
+        """Map xyxy boxes from input-tensor pixels back to original frame pixels (in place)"""
+        scale_x, scale_y = self.scale
+        pad_x, pad_y = self.pad
+        orig_width, orig_height = self.orig_size
+
+        xs = boxes[:, 0::2]  # x1, x2 (views, so the updates below are in place)
+        ys = boxes[:, 1::2]  # y1, y2
+        xs -= pad_x
+        ys -= pad_y
+        xs /= scale_x
+        ys /= scale_y
+        np.clip(xs, 0, orig_width, out=xs)
+        np.clip(ys, 0, orig_height, out=ys)
+        return boxes
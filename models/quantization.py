@@ -0,0 +1,194 @@
+"""Produce reduced-precision and dynamic-batch variants of the YOLO NAS S detector
+
+    python -m models.quantization --calibration-dir calib_images/ [--variants int8 fp16]
+    python -m models.quantization --variants batch [--model yolo_nas_s.int8.onnx]
+
+int8: static QDQ quantization calibrated on local images (preprocessed
+      exactly like at runtime with models.preprocessing.Preprocessor)
+fp16: float16 weights/activations with float32 inputs/outputs kept, so the
+      pre/post-processing path is unchanged (requires onnxconverter-common)
+batch: the same model with a dynamic batch dimension, for multi-camera
+      batched inference (models/batching.py); written next to --model as
+      <name>.batch.onnx
+
+Compare the variants against FP32 with benchmarks/bench_model_variants.py and
+select one at runtime with YOLO_MODEL_VARIANT in publisher.py.
+"""
+import argparse
+import glob
+import os
+import logging
+
+import cv2
+
+from models.preprocessing import Preprocessor
+import models.yoloNAS as yolo_nas_model
+
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def list_images(image_dir, limit=None):
+    """Sorted image paths of a directory (optionally the first `limit` ones)"""
+    paths = sorted(path for path in glob.glob(os.path.join(image_dir, "*"))
+                   if path.lower().endswith(IMAGE_EXTENSIONS))
+    return paths[:limit] if limit else paths
+
+
+def _calibration_reader(image_paths, input_name, input_size, letterbox):
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class ImageCalibrationReader(CalibrationDataReader):
+        """Feeds preprocessed calibration images to the quantizer"""
+
+        def __init__(self):
+            self.preprocessor = Preprocessor(input_size, letterbox=letterbox)
+            self.paths = iter(image_paths)
+
+        def get_next(self):
+            for path in self.paths:
+                image = cv2.imread(path)
+                if image is None:
+                    logger.warning(f"Skipping unreadable calibration image {path}")
+                    continue
+                _, input_tensor, _ = self.preprocessor(image)
+                # The preprocessor reuses its buffer, the quantizer may keep the feed
+                return {input_name: input_tensor.copy()}
+            return None
+
+    return ImageCalibrationReader()
+
+
+def quantize_int8(model_path, output_path, image_paths, input_size=yolo_nas_model.INPUT_SIZE,
+                  letterbox=False, calibration_method="minmax", per_channel=True):
+    """Statically quantize model_path to INT8 (QDQ) using calibration images"""
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    methods = {
+        "minmax": CalibrationMethod.MinMax,
+        "entropy": CalibrationMethod.Entropy,
+        "percentile": CalibrationMethod.Percentile,
+    }
+    if not image_paths:
+        raise ValueError("INT8 quantization needs at least one calibration image")
+
+    # Shape inference + graph cleanup make quantization more complete
+    prepared_path = os.path.splitext(output_path)[0] + ".prep.onnx"
+    try:
+        quant_pre_process(model_path, prepared_path)
+    except ImportError:
+        # Symbolic shape inference needs sympy; ONNX shape inference is enough for static shapes
+        quant_pre_process(model_path, prepared_path, skip_symbolic_shape=True)
+
+    input_name = ort.InferenceSession(prepared_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    reader = _calibration_reader(image_paths, input_name, input_size, letterbox)
+    try:
+        quantize_static(prepared_path, output_path, reader,
+                        quant_format=QuantFormat.QDQ,
+                        activation_type=QuantType.QUInt8,
+                        weight_type=QuantType.QInt8,
+                        per_channel=per_channel,
+                        calibrate_method=methods[calibration_method])
+    finally:
+        os.remove(prepared_path)
+    return output_path
+
+
+def convert_fp16(model_path, output_path):
+    """Convert model_path to float16, keeping float32 inputs and outputs"""
+    try:
+        import onnx
+        from onnxconverter_common import float16
+    except ImportError as e:
+        raise ImportError("FP16 conversion requires onnx and onnxconverter-common "
+                          "(pip install onnxconverter-common)") from e
+
+    model = onnx.load(model_path)
+    model_fp16 = float16.convert_float_to_float16(model, keep_io_types=True)
+    onnx.save(model_fp16, output_path)
+    return output_path
+
+
+def make_dynamic_batch(model_path, output_path, check_batch=2, tolerance=1e-3):
+    """Make the batch dimension of model_path's inputs and outputs dynamic
+
+    Intermediate shapes recorded for batch 1 are dropped. The result is then
+    checked: a batch of check_batch random inputs must give the same outputs
+    as running them one by one. It does not when the graph hard-codes batch 1
+    (e.g. a Reshape to [1, ...]); re-export the model with a dynamic batch
+    axis then (torch.onnx.export(..., dynamic_axes={...: {0: "batch"}})).
+    """
+    import numpy as np
+    import onnx
+    import onnxruntime as ort
+
+    model = onnx.load(model_path)
+    for value in list(model.graph.input) + list(model.graph.output):
+        if value.name in {init.name for init in model.graph.initializer}:
+            continue
+        dims = value.type.tensor_type.shape.dim
+        if dims:
+            dims[0].ClearField("dim_value")
+            dims[0].dim_param = "batch"
+    del model.graph.value_info[:]
+    onnx.checker.check_model(model)
+    onnx.save(model, output_path)
+
+    session = ort.InferenceSession(output_path, providers=["CPUExecutionProvider"])
+    model_input = session.get_inputs()[0]
+    shape = [check_batch] + [dim if isinstance(dim, int) else 1 for dim in model_input.shape[1:]]
+    batch = np.random.default_rng(0).random(shape, dtype=np.float32)
+    reason = "batched outputs differ from frame-by-frame outputs"
+    try:
+        batched = session.run(None, {model_input.name: batch})
+        single = [session.run(None, {model_input.name: batch[i:i + 1]}) for i in range(check_batch)]
+        matches = all(np.allclose(output, np.concatenate([run[k] for run in single]), atol=tolerance)
+                      for k, output in enumerate(batched))
+    except Exception as e:
+        matches, reason = False, str(e)
+    if not matches:
+        os.remove(output_path)
+        raise ValueError(f"{model_path} does not batch with a dynamic batch dimension ({reason}); "
+                         "re-export it with a dynamic batch axis")
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Produce INT8 / FP16 / dynamic-batch variants of the detector")
+    parser.add_argument("--model", default=yolo_nas_model.MODEL_PATH)
+    parser.add_argument("--calibration-dir", help="Folder of representative frames (INT8 only)")
+    parser.add_argument("--calibration-images", type=int, default=200)
+    parser.add_argument("--calibration-method", default="minmax",
+                        choices=["minmax", "entropy", "percentile"])
+    parser.add_argument("--variants", nargs="+", default=["int8", "fp16"], choices=["int8", "fp16", "batch"])
+    parser.add_argument("--letterbox", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    for variant in args.variants:
+        if variant == "batch":
+            output_path = yolo_nas_model.batch_model_path(args.model)
+        else:
+            output_path = yolo_nas_model.model_variant_path(variant, args.model)
+        logger.info(f"Creating {variant} variant: {output_path}")
+        if variant == "batch":
+            make_dynamic_batch(args.model, output_path)
+        elif variant == "int8":
+            if not args.calibration_dir:
+                parser.error("--calibration-dir is required for the int8 variant")
+            image_paths = list_images(args.calibration_dir, args.calibration_images)
+            logger.info(f"Calibrating on {len(image_paths)} images from {args.calibration_dir}")
+            quantize_int8(args.model, output_path, image_paths, letterbox=args.letterbox,
+                          calibration_method=args.calibration_method)
+        else:
+            convert_fp16(args.model, output_path)
+        logger.info(f"Saved {output_path} ({os.path.getsize(output_path) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
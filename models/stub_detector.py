@@ -0,0 +1,78 @@
+import time
+
+import numpy as np
+
+import models.yoloNAS as yolo_nas_model
+
+
+# --- Fake detector backend ---
+#
+# Registered as the "stub" detector backend (models/backends.py), so the
+# publisher and the benchmarks can run the whole pipeline on a machine without
+# yolo_nas_s.onnx or ONNX Runtime.
+
+class StubBackend:
+    """Deterministic fake detector with a configurable latency
+
+    Returns YOLO-NAS shaped outputs ([1, N, 4] boxes in input pixels and
+    [1, N, 80] class scores) with `objects` clusters of overlapping
+    high-confidence anchors, so process_output and NMS do realistic work.
+    A handful of output sets is precomputed and cycled through. With busy=True
+    the latency is spent spinning on the CPU instead of sleeping, which models
+    a compute-bound session (e.g. when comparing worker processes).
+    """
+
+    def __init__(self, latency_ms=20.0, jitter_ms=0.0, input_size=yolo_nas_model.INPUT_SIZE,
+                 anchors=8400, classes=80, objects=5, anchors_per_object=12, variants=8, seed=0,
+                 busy=False):
+        rng = np.random.default_rng(seed)
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.busy = busy
+        self.rng = np.random.default_rng(seed + 1)
+        self.name = f"stub:{latency_ms:g}ms"
+
+        width, height = input_size
+        self.outputs = []
+        for _ in range(variants):
+            boxes = np.empty((anchors, 4), dtype=np.float32)
+            centers = rng.uniform((0, 0), (width, height), (anchors, 2))
+            sizes = rng.uniform(8, 64, (anchors, 2))
+            boxes[:, :2] = centers - sizes / 2
+            boxes[:, 2:] = centers + sizes / 2
+            scores = rng.uniform(0, 0.2, (anchors, classes)).astype(np.float32)
+
+            # Clusters of anchors around each object, as a real head produces
+            class_ids = rng.choice(yolo_nas_model.NAVIGATION_CLASSES, objects)
+            chosen = rng.choice(anchors, (objects, anchors_per_object), replace=False)
+            for class_id, anchor_ids in zip(class_ids, chosen):
+                center = rng.uniform((64, 64), (width - 64, height - 64))
+                size = rng.uniform(48, 256, 2)
+                jitter = rng.normal(0, 4, (anchors_per_object, 4))
+                boxes[anchor_ids] = np.concatenate([center - size / 2, center + size / 2]) + jitter
+                scores[anchor_ids, class_id] = rng.uniform(0.55, 0.95, anchors_per_object)
+            self.outputs.append([boxes[None], scores[None]])
+        self.calls = 0
+
+    def run(self, input_tensor):
+        outputs = self.outputs[self.calls % len(self.outputs)]
+        self.calls += 1
+        delay = self.latency + (self.rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0 and self.busy:
+            # CPU time, not wall time: spinning processes sharing a core slow each other down
+            end = time.thread_time() + delay
+            while time.thread_time() < end:
+                pass
+        elif delay > 0:
+            time.sleep(delay)
+        if input_tensor.shape[0] > 1:  # Batched input: every image gets the same detections
+            return [np.repeat(output, input_tensor.shape[0], axis=0) for output in outputs]
+        return outputs
+
+    def report(self):
+        return self.name
+
+
+def stub_session(input_size=yolo_nas_model.INPUT_SIZE, latency_ms=20.0, **session_options):
+    """Detector backend "stub" (models/backends.py): takes load_session's arguments"""
+    return StubBackend(latency_ms, input_size=input_size)
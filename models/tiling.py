@@ -0,0 +1,165 @@
+import math
+import time
+
+import numpy as np
+
+from helpers.metrics import Metrics
+import models.yoloNAS as yolo_nas_model
+from models.preprocessing import Preprocessor
+
+
+# --- Tiled high-resolution detection ---
+#
+# The full-frame pass squashes e.g. 1280x720 into 640x640, so a distant
+# obstacle may be a few pixels tall by the time the detector sees it. On top
+# of that pass, TileDetector runs the same session on crops of the frame at
+# native resolution (a tile is exactly one input tensor, no resize): tiles over
+# fixed regions such as the walking path, and tiles centered on the small
+# boxes of the previous frame. All boxes are mapped to frame pixels and merged
+# with one class-aware NMS. At most max_tiles tiles run per frame (fixed
+# regions take turns when they need more), and a tile is skipped when it
+# would push the frame past time_budget, so the added latency stays bounded.
+
+TILE_BUDGET = 2              # Tiles per frame on top of the full-frame pass
+TILE_TIME_BUDGET = None      # Seconds per frame (full pass included) tiles may not exceed (None: no limit)
+TILE_OVERLAP = 0.2           # Fraction of a tile shared with its neighbour when a region needs several
+TILE_REGIONS = [(0.3, 0.2, 0.7, 0.8)]  # Normalized xyxy regions always tiled (walking path, around the horizon)
+SMALL_BOX_AREA = 0.005       # Previous-frame boxes under this fraction of the frame get their own tile
+EDGE_MARGIN = 2              # Pixels: tile boxes this close to an inner tile edge are cut off and dropped
+
+
+def region_tiles(region, frame_size, tile_size, overlap=TILE_OVERLAP):
+    """Pixel xyxy tiles of tile_size covering a pixel xyxy region (shifted inside the frame)"""
+    frame_width, frame_height = frame_size
+    tile_width, tile_height = min(tile_size[0], frame_width), min(tile_size[1], frame_height)
+
+    def starts(low, high, tile, limit):
+        span = high - low
+        if span <= tile:
+            first = (low + high - tile) / 2  # One tile centered on the region
+            return [int(min(max(first, 0), limit - tile))]
+        count = math.ceil((span - tile) / (tile * (1 - overlap))) + 1
+        positions = np.linspace(low, high - tile, count)
+        return [int(min(max(p, 0), limit - tile)) for p in positions]
+
+    x1, y1, x2, y2 = region
+    return [(x, y, x + tile_width, y + tile_height)
+            for y in starts(y1, y2, tile_height, frame_height)
+            for x in starts(x1, x2, tile_width, frame_width)]
+
+
+class TileDetector:
+    """Full-frame detection plus native-resolution tiles, merged with cross-tile NMS
+
+    session is the detector session (OnnxSession or any backend with run());
+    detect() returns (boxes, scores, class_ids) in frame pixels like the
+    single-pass path, so it can feed the tracker directly.
+    """
+
+    def __init__(self, session, input_size=yolo_nas_model.INPUT_SIZE, letterbox=False,
+                 confidence_threshold=0.5, allowed_classes=yolo_nas_model.ALLOWED_CLASSES,
+                 max_tiles=TILE_BUDGET, time_budget=TILE_TIME_BUDGET, regions=TILE_REGIONS,
+                 overlap=TILE_OVERLAP, small_box_area=SMALL_BOX_AREA, metrics=None):
+        self.session = session
+        self.input_size = input_size
+        self.confidence_threshold = confidence_threshold
+        self.allowed_classes = allowed_classes
+        self.max_tiles = max_tiles
+        self.time_budget = time_budget
+        self.regions = list(regions)
+        self.overlap = overlap
+        self.small_box_area = small_box_area
+        self.metrics = metrics or Metrics(enabled=False)
+        self.preprocessor = Preprocessor(input_size, letterbox=letterbox)
+        # Tiles match the input size, so this only pads the rare tile clipped by a small frame
+        self.tile_preprocessor = Preprocessor(input_size, letterbox=True)
+
+        self.cursor = 0              # Next fixed-region tile, when they take turns
+        self.previous_boxes = None   # Last merged boxes, to place tiles on small objects
+        self.last_tiles = []
+
+    def plan(self, frame_size, flagged_boxes=None):
+        """Tiles for this frame: fixed regions first (taking turns), then small flagged boxes"""
+        frame_width, frame_height = frame_size
+        scale = np.array([frame_width, frame_height, frame_width, frame_height], dtype=np.float32)
+        fixed = [tile for region in self.regions
+                 for tile in region_tiles(np.asarray(region) * scale, frame_size, self.input_size,
+                                          self.overlap)]
+        tiles = []
+        if fixed and self.max_tiles > 0:
+            count = min(len(fixed), self.max_tiles)
+            tiles = [fixed[(self.cursor + i) % len(fixed)] for i in range(count)]
+            self.cursor = (self.cursor + count) % len(fixed)
+
+        if flagged_boxes is not None and len(flagged_boxes):
+            boxes = np.asarray(flagged_boxes, dtype=np.float32).reshape(-1, 4)
+            areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]) / (frame_width * frame_height)
+            for index in np.argsort(areas):
+                if len(tiles) >= self.max_tiles or areas[index] >= self.small_box_area:
+                    break
+                x1, y1, x2, y2 = boxes[index]
+                if any(tx1 <= x1 and ty1 <= y1 and x2 <= tx2 and y2 <= ty2
+                       for tx1, ty1, tx2, ty2 in tiles):
+                    continue  # Already inside a planned tile
+                tiles.extend(region_tiles((x1, y1, x2, y2), frame_size, self.input_size)[:1])
+        return tiles
+
+    def _run(self, image, preprocessor):
+        _, input_tensor, orig_size = preprocessor(image)
+        outputs = self.session.run(input_tensor)
+        return yolo_nas_model.process_output(
+            outputs, self.confidence_threshold, orig_size, preprocessor,
+            allowed_classes=self.allowed_classes, input_size=self.input_size)
+
+    def detect(self, frame, flagged_boxes=None):
+        """Detect on a BGR frame; flagged_boxes defaults to the previous frame's result"""
+        metrics = self.metrics
+        clock = time.perf_counter
+        start = clock()
+        t = metrics.now()
+        frame_height, frame_width = frame.shape[:2]
+        if flagged_boxes is None:
+            flagged_boxes = self.previous_boxes
+
+        _, input_tensor, orig_size = self.preprocessor(frame)
+        t = metrics.lap("preprocess", t)
+        outputs = self.session.run(input_tensor)
+        t = metrics.lap("inference", t)
+        boxes, scores, class_ids = yolo_nas_model.process_output(
+            outputs, self.confidence_threshold, orig_size, self.preprocessor,
+            allowed_classes=self.allowed_classes, input_size=self.input_size)
+        t = metrics.lap("postprocess", t)
+        all_boxes, all_scores, all_class_ids = [boxes], [scores], [class_ids]
+        pass_time = clock() - start  # A tile costs about one full pass (same input size)
+
+        self.last_tiles = []
+        for x1, y1, x2, y2 in self.plan((frame_width, frame_height), flagged_boxes):
+            if self.time_budget is not None and clock() - start + pass_time > self.time_budget:
+                break
+            boxes, scores, class_ids = self._run(frame[y1:y2, x1:x2], self.tile_preprocessor)
+            # Objects cut by an inner tile edge are partial; the full pass or a neighbour has them
+            keep = np.ones(len(boxes), dtype=bool)
+            if x1 > 0:
+                keep &= boxes[:, 0] > EDGE_MARGIN
+            if y1 > 0:
+                keep &= boxes[:, 1] > EDGE_MARGIN
+            if x2 < frame_width:
+                keep &= boxes[:, 2] < x2 - x1 - EDGE_MARGIN
+            if y2 < frame_height:
+                keep &= boxes[:, 3] < y2 - y1 - EDGE_MARGIN
+            boxes = boxes[keep]
+            boxes[:, 0::2] += x1
+            boxes[:, 1::2] += y1
+            all_boxes.append(boxes)
+            all_scores.append(scores[keep])
+            all_class_ids.append(class_ids[keep])
+            self.last_tiles.append((x1, y1, x2, y2))
+        if self.last_tiles:
+            t = metrics.lap("tiles", t)
+
+        # Cross-tile NMS: the same object seen by the full pass and by one or more tiles
+        boxes, scores, class_ids = yolo_nas_model.apply_nms(
+            np.concatenate(all_boxes), np.concatenate(all_scores), np.concatenate(all_class_ids))
+        metrics.lap("nms", t)
+        self.previous_boxes = boxes
+        return boxes, scores, class_ids
@@ -0,0 +1,170 @@
+import time
+
+import numpy as np
+
+from models.nms import box_iou
+
+
+# Kalman filter state per track: [cx, cy, w, h, vx, vy, vw, vh], velocities in px/s
+STATE_SIZE = 8
+MEASUREMENT_SIZE = 4
+
+
+def _xyxy_to_cxcywh(boxes):
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    return np.stack([(boxes[:, 0] + boxes[:, 2]) * 0.5, (boxes[:, 1] + boxes[:, 3]) * 0.5,
+                     boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]], axis=1)
+
+
+def _cxcywh_to_xyxy(states):
+    half_w = np.maximum(states[:, 2], 1.0) * 0.5
+    half_h = np.maximum(states[:, 3], 1.0) * 0.5
+    return np.stack([states[:, 0] - half_w, states[:, 1] - half_h,
+                     states[:, 0] + half_w, states[:, 1] + half_h], axis=1).astype(np.float32)
+
+
+def greedy_assignment(iou, iou_threshold):
+    """Match rows to columns by descending IoU; returns (rows, cols) index arrays"""
+    rows, cols = np.nonzero(iou >= iou_threshold)
+    if rows.size == 0:
+        return rows, cols
+    order = np.argsort(iou[rows, cols])[::-1]
+    rows, cols = rows[order], cols[order]
+
+    used_rows = np.zeros(iou.shape[0], dtype=bool)
+    used_cols = np.zeros(iou.shape[1], dtype=bool)
+    keep = np.zeros(rows.size, dtype=bool)
+    for i, (row, col) in enumerate(zip(rows.tolist(), cols.tolist())):
+        if not used_rows[row] and not used_cols[col]:
+            used_rows[row] = used_cols[col] = True
+            keep[i] = True
+    return rows[keep], cols[keep]
+
+
+class Tracker:
+    """SORT-style multi-object tracker on NumPy arrays
+
+    All tracks share one batched constant-velocity Kalman filter. update()
+    associates the output of apply_nms with the predicted tracks (class-aware
+    IoU, greedy), predict() only extrapolates, so the detector can be skipped
+    on frames in between.
+    """
+
+    def __init__(self, iou_threshold=0.2, max_misses=3, min_hits=1,
+                 position_noise=10.0, velocity_noise=50.0, measurement_noise=5.0):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses      # Detection updates a track may go unmatched
+        self.min_hits = min_hits          # Matches before a track is reported
+        self.position_noise = position_noise
+        self.velocity_noise = velocity_noise
+        self.measurement_noise = measurement_noise
+
+        self.states = np.zeros((0, STATE_SIZE))
+        self.covariances = np.zeros((0, STATE_SIZE, STATE_SIZE))
+        self.track_ids = np.zeros(0, dtype=np.int64)
+        self.class_ids = np.zeros(0, dtype=int)
+        self.scores = np.zeros(0, dtype=np.float32)
+        self.hits = np.zeros(0, dtype=int)
+        self.misses = np.zeros(0, dtype=int)
+        self.next_id = 1
+        self.last_time = None
+
+    def _advance(self, timestamp):
+        """Propagate all tracks to timestamp (constant-velocity model)"""
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        dt = 0.0 if self.last_time is None else max(timestamp - self.last_time, 0.0)
+        self.last_time = timestamp
+        if dt == 0 or not len(self.states):
+            return
+
+        transition = np.eye(STATE_SIZE)
+        transition[:4, 4:] = np.eye(4) * dt
+        noise = np.diag([self.position_noise] * 4 + [self.velocity_noise] * 4) ** 2 * dt
+
+        self.states = self.states @ transition.T
+        self.covariances = transition @ self.covariances @ transition.T + noise
+
+    def _correct(self, track_indices, measurements):
+        """Batched Kalman update of the matched tracks"""
+        covariances = self.covariances[track_indices]
+        innovation = measurements - self.states[track_indices, :4]
+        innovation_cov = covariances[:, :4, :4] + np.eye(MEASUREMENT_SIZE) * self.measurement_noise ** 2
+        gain = covariances[:, :, :4] @ np.linalg.inv(innovation_cov)
+
+        self.states[track_indices] += np.einsum("nij,nj->ni", gain, innovation)
+        self.covariances[track_indices] = covariances - gain @ covariances[:, :4, :]
+
+    def _spawn(self, measurements, scores, class_ids):
+        count = len(measurements)
+        states = np.zeros((count, STATE_SIZE))
+        states[:, :4] = measurements
+        covariances = np.tile(np.diag([self.measurement_noise] * 4 + [self.velocity_noise * 10] * 4) ** 2,
+                              (count, 1, 1))
+
+        self.states = np.concatenate([self.states, states])
+        self.covariances = np.concatenate([self.covariances, covariances])
+        self.track_ids = np.concatenate([self.track_ids, np.arange(self.next_id, self.next_id + count)])
+        self.class_ids = np.concatenate([self.class_ids, class_ids])
+        self.scores = np.concatenate([self.scores, scores])
+        self.hits = np.concatenate([self.hits, np.ones(count, dtype=int)])
+        self.misses = np.concatenate([self.misses, np.zeros(count, dtype=int)])
+        self.next_id += count
+
+    def _keep(self, mask):
+        self.states = self.states[mask]
+        self.covariances = self.covariances[mask]
+        self.track_ids = self.track_ids[mask]
+        self.class_ids = self.class_ids[mask]
+        self.scores = self.scores[mask]
+        self.hits = self.hits[mask]
+        self.misses = self.misses[mask]
+
+    def update(self, boxes, scores, class_ids, timestamp=None, roi=None):
+        """Associate new detections (xyxy boxes from apply_nms) and return the tracks
+
+        roi (x1, y1, x2, y2) is the region the detector actually looked at:
+        tracks entirely outside of it are kept as they are instead of being
+        counted as missed.
+        """
+        self._advance(timestamp)
+
+        measurements = _xyxy_to_cxcywh(boxes)
+        scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+        class_ids = np.asarray(class_ids, dtype=int).reshape(-1)
+
+        matched = np.zeros(len(self.states), dtype=bool)
+        new_detections = np.ones(len(measurements), dtype=bool)
+        if len(self.states) and len(measurements):
+            iou = box_iou(np.asarray(boxes, dtype=np.float32).reshape(-1, 4),
+                          _cxcywh_to_xyxy(self.states))
+            iou[class_ids[:, None] != self.class_ids[None, :]] = 0
+            det_indices, track_indices = greedy_assignment(iou, self.iou_threshold)
+
+            self._correct(track_indices, measurements[det_indices])
+            self.scores[track_indices] = scores[det_indices]
+            self.hits[track_indices] += 1
+            self.misses[track_indices] = 0
+            matched[track_indices] = True
+            new_detections[det_indices] = False
+
+        observed = np.ones(len(self.states), dtype=bool)
+        if roi is not None and len(self.states):
+            track_boxes = _cxcywh_to_xyxy(self.states)
+            observed = ((track_boxes[:, 2] > roi[0]) & (track_boxes[:, 0] < roi[2])
+                        & (track_boxes[:, 3] > roi[1]) & (track_boxes[:, 1] < roi[3]))
+        self.misses[~matched & observed] += 1
+        self._keep(self.misses <= self.max_misses)
+        self._spawn(measurements[new_detections], scores[new_detections], class_ids[new_detections])
+        return self.tracks()
+
+    def predict(self, timestamp=None):
+        """Extrapolate the tracks to timestamp without a detection (skipped frame)"""
+        self._advance(timestamp)
+        return self.tracks()
+
+    def tracks(self):
+        """Confirmed tracks as (boxes, scores, class_ids, track_ids, velocities [vx, vy] px/s)"""
+        confirmed = self.hits >= self.min_hits
+        states = self.states[confirmed]
+        return (_cxcywh_to_xyxy(states), self.scores[confirmed], self.class_ids[confirmed],
+                self.track_ids[confirmed], states[:, 4:6].astype(np.float32))
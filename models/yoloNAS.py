@@ -1,19 +1,42 @@
 import cv2
-import onnxruntime as ort
 import numpy as np
 import time
 import os
 import paho.mqtt.client as mqtt # <-- MQTT ADDITION
 import json                       # <-- MQTT ADDITION
 
+from models.decision import DecisionEngine, class_weight_table
+from models.nms import nms, soft_nms
+from models.onnx_session import OnnxSession
+from models.preprocessing import Preprocessor
+from models.tracker import Tracker
+from helpers.delta import DeltaEncoder
+from helpers.frame_source import VideoCaptureSource
+from helpers.recorder import FrameRecorder
+
 # --- MQTT Configuration ---  
 BROKER_ADDRESS = "localhost"  # Use your Pi's IP if the broker is on another machine
 BROKER_PORT = 1883
 MQTT_TOPIC = "vision/data"
+MQTT_RESYNC_TOPIC = "vision/data/resync"  # Delta subscribers publish here to get a keyframe
+DELTA_DECISIONS = False  # Publish decisions only when they change (plus periodic keyframes)
 # --- End of MQTT Configuration ---
 
-# Load model
-session = ort.InferenceSession("yolo_nas_s.onnx")
+MODEL_PATH = "yolo_nas_s.onnx"
+MODEL_VARIANTS = ("fp32", "fp16", "int8")  # Produce fp16/int8 with models/quantization.py
+INPUT_SIZE = (640, 640)
+LETTERBOX = False      # Preserve aspect ratio (pad instead of stretching the frame)
+# Annotated-frame recorder (helpers/recorder.py): encodes on worker threads, drops frames when busy
+RECORD_ENABLED = False
+RECORD_DIR = "results"
+RECORD_MAX_MB = 200           # Oldest recordings are deleted beyond this
+RECORD_INTERVAL = 5.0         # Seconds between sampled frames (0 records events only)
+RECORD_ON_DECISION_CHANGE = True
+MAX_DETECTIONS = 100   # Upper bound on boxes kept after NMS
+NMS_TOP_K = 1000       # Only the best-scoring candidates enter NMS
+DETECTION_STRIDE = 3   # Run the detector every Nth frame, the tracker extrapolates in between
+DECISION_MODE = "grid"  # "grid": every frame, with hysteresis (models/decision.py); "legacy": once a second
+DECISION_HEARTBEAT = 1.0  # Grid mode publishes on change, and at least this often (seconds)
 
 CLASS_NAMES = [
     "person", "bicycle", "car", "motorcycle", "airplane", "bus", "train", "truck", "boat",
@@ -28,6 +51,28 @@ CLASS_NAMES = [
     "clock", "vase", "scissors", "teddy bear", "hair drier", "toothbrush"
 ]
 
+def model_variant_path(variant="fp32", model_path=MODEL_PATH):
+    """Path of a precision variant of the model (fp32 is the original file)"""
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Unknown model variant '{variant}', expected one of {MODEL_VARIANTS}")
+    if variant == "fp32":
+        return model_path
+    root, ext = os.path.splitext(model_path)
+    return f"{root}.{variant}{ext}"
+
+def batch_model_path(model_path=MODEL_PATH):
+    """Path of the dynamic-batch export of a model (see models/quantization.py)"""
+    root, ext = os.path.splitext(model_path)
+    return f"{root}.batch{ext}"
+
+def load_session(model_path=MODEL_PATH, input_size=INPUT_SIZE, batch=1, **session_options):
+    """Create the detector session (tuned threads, cached optimized graph, warm-up)
+
+    batch > 1 warms up and binds a [batch, 3, H, W] input (needs a dynamic-batch export).
+    """
+    return OnnxSession(model_path, input_shape=(batch, 3, input_size[1], input_size[0]),
+                       **session_options)
+
 def preprocess_image(image, input_size=(640, 640)):
     orig_image = image.copy()
     orig_height, orig_width = image.shape[:2]
@@ -40,46 +85,74 @@ def preprocess_image(image, input_size=(640, 640)):
 
     return orig_image, input_tensor, (orig_width, orig_height)
 
-def process_output(outputs, confidence_threshold=0.5, orig_size=None):
-    boxes = outputs[0].squeeze(0)  # [N, 4]
-    class_scores = outputs[1].squeeze(0)  # [N, 80]
+def class_indices(names):
+    """Map class names to a sorted index array usable as a class allow-list"""
+    return np.array(sorted(CLASS_NAMES.index(name) for name in names), dtype=np.intp)
 
-    scores = np.max(class_scores, axis=1)
-    class_ids = np.argmax(class_scores, axis=1)
+# Classes that matter for walking navigation (obstacles and moving hazards)
+NAVIGATION_CLASSES = class_indices([
+    "person", "bicycle", "car", "motorcycle", "bus", "truck", "traffic light",
+    "fire hydrant", "stop sign", "parking meter", "bench", "dog", "chair", "couch",
+    "potted plant", "dining table", "suitcase"
+])
+ALLOWED_CLASSES = None  # Default allow-list: all 80 COCO classes (the publisher narrows it to NAVIGATION_CLASSES)
 
-    mask = scores > confidence_threshold
-    boxes = boxes[mask]
-    scores = scores[mask]
-    class_ids = class_ids[mask]
-
-    if boxes.shape[0] == 0:
-        return [], [], []
+def process_output(outputs, confidence_threshold=0.5, orig_size=None, preprocessor=None,
+                   allowed_classes=None, max_candidates=NMS_TOP_K, input_size=INPUT_SIZE):
+    boxes = outputs[0].squeeze(0)  # [N, 4]
+    class_scores = outputs[1].squeeze(0)  # [N, 80]
 
-    if orig_size:
+    # Only reduce over the classes we care about
+    if allowed_classes is not None:
+        class_scores = class_scores[:, allowed_classes]  # [N, K]
+
+    # Threshold first: one reduction + mask finds the candidate anchors, the
+    # argmax then only runs on those rows
+    anchor_scores = np.max(class_scores, axis=1)
+    candidates = np.flatnonzero(anchor_scores > confidence_threshold)
+
+    if candidates.size == 0:
+        return (np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.float32),
+                np.empty(0, dtype=int))
+
+    # Cap what goes to NMS to the best-scoring candidates
+    if max_candidates is not None and candidates.size > max_candidates:
+        best = np.argpartition(anchor_scores[candidates], -max_candidates)[-max_candidates:]
+        candidates = candidates[best]
+
+    scores = anchor_scores[candidates]
+    class_ids = np.argmax(class_scores[candidates], axis=1)
+    if allowed_classes is not None:
+        class_ids = allowed_classes[class_ids]
+    boxes = boxes[candidates]
+
+    if preprocessor is not None:
+        preprocessor.map_boxes(boxes)
+    elif orig_size:
         orig_width, orig_height = orig_size
-        scale_x = orig_width / 640
-        scale_y = orig_height / 640
+        scale_x = orig_width / input_size[0]
+        scale_y = orig_height / input_size[1]
         boxes[:, [0, 2]] *= scale_x
         boxes[:, [1, 3]] *= scale_y
 
     return boxes, scores, class_ids.astype(int)
 
-def apply_nms(boxes, scores, class_ids, iou_threshold=0.5):
+def apply_nms(boxes, scores, class_ids, iou_threshold=0.5, score_threshold=0.0,
+              class_aware=True, max_detections=MAX_DETECTIONS, top_k=NMS_TOP_K, soft=False):
     if len(boxes) == 0:
-        return [], [], []
-
-    boxes_wh = np.zeros_like(boxes)
-    boxes_wh[:, 0] = boxes[:, 0]
-    boxes_wh[:, 1] = boxes[:, 1]
-    boxes_wh[:, 2] = boxes[:, 2] - boxes[:, 0]  # width
-    boxes_wh[:, 3] = boxes[:, 3] - boxes[:, 1]  # height
-
-    indices = cv2.dnn.NMSBoxes(boxes_wh.tolist(), scores.tolist(), 0.5, iou_threshold)
-    if len(indices) > 0:
-        indices = indices.flatten()
-        return boxes[indices], scores[indices], class_ids[indices]
-    else:
-        return [], [], []
+        return (np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.float32),
+                np.empty(0, dtype=int))
+
+    nms_class_ids = class_ids if class_aware else None
+    if soft:
+        indices, soft_scores = soft_nms(boxes, scores, class_ids=nms_class_ids,
+                                        top_k=top_k, max_detections=max_detections)
+        return boxes[indices], soft_scores, class_ids[indices]
+
+    indices = nms(boxes, scores, iou_threshold, class_ids=nms_class_ids,
+                  score_threshold=score_threshold, top_k=top_k,
+                  max_detections=max_detections)
+    return boxes[indices], scores[indices], class_ids[indices]
 
 def draw_boxes(image, boxes, scores, class_ids):
     for box, score, class_id in zip(boxes, scores, class_ids):
@@ -91,25 +164,28 @@ def draw_boxes(image, boxes, scores, class_ids):
     return image
 
 # Decision Logic Integration
+def boxes_to_labels(boxes, orig_size):
+    """xyxy pixel boxes -> [N, 5] (class, x_center, y_center, width, height) normalized to [0, 1]"""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    scale = np.array([orig_size[0], orig_size[1]], dtype=np.float32)
+    labels = np.zeros((len(boxes), 5), dtype=np.float32)
+    labels[:, 3:5] = (boxes[:, 2:4] - boxes[:, 0:2]) / scale
+    labels[:, 1:3] = (boxes[:, 0:2] + boxes[:, 2:4]) / (2 * scale)
+    return labels
+
 def is_side_clear(labels, side, threshold=0.05):
-    total_area = 0
-    for _, x_center, _, width, height in labels:
-        if side == 'left' and x_center < 0.4:
-            total_area += width * height
-        elif side == 'right' and x_center > 0.6:
-            total_area += width * height
-    return total_area < threshold
+    labels = np.asarray(labels, dtype=np.float32).reshape(-1, 5)
+    x_center = labels[:, 1]
+    on_side = x_center < 0.4 if side == 'left' else x_center > 0.6
+    return float((labels[on_side, 3] * labels[on_side, 4]).sum()) < threshold
 
 def decide_direction(labels):
-    left = right = middle = 0
-    for label in labels:
-        _, x_center, _, _, _ = label
-        if 0.4 <= x_center <= 0.6:
-            middle += 1
-        elif x_center < 0.4:
-            left += 1
-        else:
-            right += 1
+    """Legacy rule (DECISION_MODE = "legacy"): count box centers left / middle / right"""
+    labels = np.asarray(labels, dtype=np.float32).reshape(-1, 5)
+    x_center = labels[:, 1]
+    left = int(np.count_nonzero(x_center < 0.4))
+    right = int(np.count_nonzero(x_center > 0.6))
+    middle = len(labels) - left - right
 
     if middle > 0:
         left_clear = is_side_clear(labels, 'right')
@@ -127,73 +203,107 @@ def decide_direction(labels):
         return "straight"
 
 # Capture, Inference and Decision Loop
-def capture_and_infer(mqtt_client, save_dir="results"): # (mqtt_client passed in)
-    os.makedirs(save_dir, exist_ok=True)
-    cap = cv2.VideoCapture(0)
-
-    if not cap.isOpened():
-        print("❌ Cannot open camera")
+def capture_and_infer(mqtt_client, save_dir=RECORD_DIR): # (mqtt_client passed in)
+    session = load_session()
+    print(f"🧠 {session.report()}")
+    try:
+        source = VideoCaptureSource(0).start()  # Grabs on its own thread, we always get the newest frame
+    except RuntimeError as e:
+        print(f"❌ Cannot open camera: {e}")
         return
 
     print("📷 Running inference. Press Ctrl+C to stop.")
     count = 0
     last_decision_time = time.time()
-
+    last_decision = None
+    preprocessor = Preprocessor(INPUT_SIZE, letterbox=LETTERBOX)
+    tracker = Tracker()
+    decision_engine = DecisionEngine(class_weights=class_weight_table(CLASS_NAMES))
+    recorder = None
+    if RECORD_ENABLED:
+        recorder = FrameRecorder(save_dir, max_bytes=RECORD_MAX_MB * 2 ** 20,
+                                 interval=RECORD_INTERVAL, annotate=draw_boxes)
+
+    delta_encoder = None
+    if DELTA_DECISIONS:
+        delta_encoder = DeltaEncoder(keyframe_interval=10.0)
+        mqtt_client.message_callback_add(MQTT_RESYNC_TOPIC,
+                                         lambda client, userdata, message: delta_encoder.request_keyframe())
+        mqtt_client.subscribe(MQTT_RESYNC_TOPIC)
+
+    last_seq = 0
     try:
         while True:
-            ret, frame = cap.read()
-            if not ret:
+            captured = source.latest(after_seq=last_seq, timeout=5.0)
+            if captured is None:
                 print("❌ Failed to grab frame")
                 break
-
-            orig_image, input_tensor, orig_size = preprocess_image(frame)
-            input_name = session.get_inputs()[0].name
-            outputs = session.run(None, {input_name: input_tensor})
-
-            boxes, scores, class_ids = process_output(outputs, 0.5, orig_size)
-            boxes, scores, class_ids = apply_nms(boxes, scores, class_ids)
-
-            # Save result image
-            result_image = draw_boxes(orig_image, boxes, scores, class_ids)
-            filename = os.path.join(save_dir, f"result_{count}.jpg")
-            # cv2.imwrite(filename, result_image) # You may want to comment this out to save disk space
-            # print(f"✅ Saved {filename}")
-            count += 1
-
-            # Every second make a decision and publish it
+            last_seq = captured.seq
+            frame = captured.image
+
+            frame_time = captured.monotonic
+            if count % DETECTION_STRIDE == 0:
+                _, input_tensor, orig_size = preprocessor(frame)
+                outputs = session.run(input_tensor)
+
+                boxes, scores, class_ids = process_output(outputs, 0.5, orig_size, preprocessor,
+                                                          allowed_classes=ALLOWED_CLASSES)
+                boxes, scores, class_ids = apply_nms(boxes, scores, class_ids)
+                boxes, scores, class_ids, track_ids, velocities = tracker.update(
+                    boxes, scores, class_ids, frame_time)
+            else:
+                # Skip the detector: extrapolate the tracked boxes to this frame
+                orig_size = (frame.shape[1], frame.shape[0])
+                boxes, scores, class_ids, track_ids, velocities = tracker.predict(frame_time)
+
+            # Grid mode decides on every frame and publishes changes (plus a heartbeat);
+            # legacy mode makes a decision every second and publishes it
             now = time.time()
-            if now - last_decision_time >= 1:
-                norm_labels = []
-                for box in boxes:
-                    x1, y1, x2, y2 = box
-                    width = x2 - x1
-                    height = y2 - y1
-                    x_center = x1 + width / 2
-                    y_center = y1 + height / 2
-
-                    # Normalize to [0, 1]
-                    x_center /= orig_size[0]
-                    y_center /= orig_size[1]
-                    width /= orig_size[0]
-                    height /= orig_size[1]
-
-                    norm_labels.append((0, x_center, y_center, width, height))
-
-                decision = decide_direction(norm_labels)
-                print(f"🧭 Decision: {decision}")
+            changed = False
+            if DECISION_MODE == "grid":
+                decision = decision_engine.update(boxes, orig_size, class_ids)
+                due = decision != last_decision or now - last_decision_time >= DECISION_HEARTBEAT
+            else:
+                due = now - last_decision_time >= 1
+                if due:
+                    decision = decide_direction(boxes_to_labels(boxes, orig_size))
+            if due:
+                changed = decision != last_decision
+                if changed or DECISION_MODE != "grid":
+                    print(f"🧭 Decision: {decision}")
+                last_decision = decision
 
                 # ---- THIS IS THE NEW MQTT PUBLISHING PART ---- # <-- MQTT ADDITION
-                payload = json.dumps({"timestamp": now, "decision": decision})
-                mqtt_client.publish(MQTT_TOPIC, payload)
+                if delta_encoder is None:
+                    payload = {"timestamp": now, "decision": decision}
+                    if DECISION_MODE == "grid":
+                        payload["occupancy"] = [round(float(v), 2) for v in decision_engine.occupancy]
+                    mqtt_client.publish(MQTT_TOPIC, json.dumps(payload))
+                else:
+                    message = delta_encoder.encode([], {"decision": decision}, now)
+                    if message is not None:
+                        mqtt_client.publish(MQTT_TOPIC, json.dumps(message))
                 # ---------------------------------------------- #
 
                 last_decision_time = now
 
+            # Sampled frames and decision changes; annotation and encoding happen off this thread
+            if recorder is not None:
+                recorder.record(frame, (boxes, scores, class_ids),
+                                tag=f"decision-{decision}" if changed else "sample",
+                                frame_id=captured.seq, timestamp=captured.timestamp,
+                                event=RECORD_ON_DECISION_CHANGE and changed)
+            source.release(captured)
+            count += 1
+
     except KeyboardInterrupt:
         print("🛑 Stopped by user")
 
     finally:
-        cap.release()
+        source.stop()
+        if recorder is not None:
+            recorder.close()
+            print(f"🎞️ Recorder: {recorder.stats()}")
 
 # Run the main loop
 if __name__ == "__main__":
@@ -1,20 +1,32 @@
 import time
-import json
+STARTUP_TIME = time.perf_counter()  # Start of the import phase for --profile-startup
+import argparse
+import copy
 import socket
-import cv2
+import threading
+from collections import deque
 import numpy as np
 import paho.mqtt.client as mqtt
-from picamera2 import Picamera2
-import torch
-from super_gradients.training import models
-from transformers import pipeline
-import threading
-from queue import Queue
 import logging
 
 import helpers.MQTTutils as mqtt_utils
+import helpers.payload as payload_codec
+from helpers.delta import DeltaEncoder
+from helpers.frame_source import Picamera2Source, VideoCaptureSource, RING_SIZE
+from helpers.metrics import Metrics, StartupProfile
+from helpers.pipeline import Pipeline
+from helpers.scheduler import AdaptiveScheduler
+from helpers.spool import Spool
+from helpers.motion import MotionGate, region_to_roi
+import models.backends as backends
+from models.batching import BatchCollector, BatchDetector
 import models.midas as midas_model
 import models.yoloNAS as yolo_nas_model
+from models.decision import DecisionEngine, class_weight_table
+from models.inference_pool import InferencePool
+from models.preprocessing import Preprocessor
+from models.tiling import TileDetector
+from models.tracker import Tracker
 
 
 # Setup logging
@@ -28,10 +40,44 @@ BROKER_ADDRESS = "localhost"  # Replace with your MQTT broker's IP address (norm
 BROKER_PORT = 1883
 
 MQTT_TOPIC_CV_RESULTS = "vision/results"
+MQTT_TOPIC_CV_RESULTS_BINARY = "vision/results/bin"   # Compact binary encoding (helpers/payload.py)
+MQTT_TOPIC_CV_METADATA = "vision/results/meta"        # Static metadata, retained
+PAYLOAD_ENCODING = "json"       # Options: "json" (client/client.js), "binary", "both"
+
 MQTT_CLIENT_ID = f"rpi_cv_publisher_{socket.gethostname()}"
 MQTT_USERNAME = None  # Set if your broker requires authentication (doesn't lol)
 MQTT_PASSWORD = None
 
+# Backpressure: at most MQTT_MAX_IN_FLIGHT messages are handed to paho but not yet
+# acknowledged (QoS 1/2) or written to the socket (QoS 0). Beyond that, frames are
+# coalesced per topic so only the latest state waits to be sent.
+MQTT_QOS = 0
+MQTT_MAX_IN_FLIGHT = 4
+MQTT_IN_FLIGHT_TIMEOUT = 5.0    # Seconds before an unacknowledged message is given up on
+MQTT_RECONNECT_MIN_DELAY = 1    # Seconds, doubled after every failed reconnect attempt
+MQTT_RECONNECT_MAX_DELAY = 30
+
+# Offline spool (helpers/spool.py): results published while the broker is unreachable
+# are kept in a size-capped file and replayed, oldest first, after reconnecting
+SPOOL_ENABLED = True
+SPOOL_PATH = "results.spool"
+SPOOL_SIZE_MB = 16              # Oldest entries are evicted beyond this
+SPOOL_REPLAY_RATE = 20          # Messages/s, only while live frames leave an in-flight slot free
+SPOOL_REPLAY_TOPIC_PREFIX = "replay/"  # Replayed as replay/<topic>; "" replays on the live topics
+
+# Delta Publishing Settings (helpers/delta.py)
+PUBLISH_MODE = "full"           # Options: "full" (every frame), "delta" (keyframes + changes), "both"
+MQTT_TOPIC_CV_DELTA = "vision/results/delta"
+MQTT_TOPIC_CV_RESYNC = "vision/results/resync"        # Subscribers publish here to get a keyframe
+DELTA_KEYFRAME_INTERVAL = 10.0  # Seconds between full-state keyframes
+DELTA_MOVE_THRESHOLD = 8.0      # Pixels a box must move before it is re-published
+
+# Instrumentation (helpers/metrics.py): per-stage latency histograms, queue depths and drops
+METRICS_ENABLED = True
+MQTT_TOPIC_CV_METRICS = "vision/metrics"
+METRICS_INTERVAL = 30.0         # Seconds between summaries on the metrics topic
+METRICS_PROMETHEUS_PATH = None  # e.g. "/var/lib/node_exporter/textfile_collector/smartsight.prom"
+
 # provide the ipv4 address to input to the phone app
 ipv4=mqtt_utils.get_local_ip()  # This will return the local IP address of the Raspberry Pi
 print(f"Local IP address for MQTT: {ipv4}")
@@ -42,45 +88,309 @@ CAMERA_RESOLUTION = (1280, 720)  # Balanced resolution for performance
 CAMERA_FRAMERATE = 10           # Conservative framerate for processing
 PREVIEW_WINDOW = False          # Set to True to show preview (requires display)
 
+# Multi-camera mode (models/batching.py): with two or more cameras, the newest frame of each
+# goes through the detector as one batch and each camera publishes on its own topic.
+# Entries: {"name": "front", "camera_num": 0} (Picamera2) or {"name": "usb", "device": 0} (OpenCV).
+# Needs the dynamic-batch export: python -m models.quantization --variants batch
+CAMERAS = []
+CAMERA_BATCH_WINDOW = 0.02      # Seconds to wait for the other cameras before running a batch
+MQTT_TOPIC_CV_CAMERA_RESULTS = "vision/cameras/{camera}/results"  # Binary encoding on <topic>/bin
+
+# Motion Gating Settings (computed on the lores stream)
+LORES_RESOLUTION = (640, 360)
+MOTION_GATING = True            # Skip detection and re-publish the last result while the scene is static
+MOTION_CROP = True              # Run detection only on the moving part of the frame when it is small
+MOTION_MAX_STATIC_TIME = 5.0    # Force a detection pass at least this often (seconds)
+
+# Pipeline Settings
+PIPELINE_QUEUE_SIZE = 1         # Frames buffered between stages (older ones are dropped)
+STATS_LOG_INTERVAL = 5.0        # Seconds between per-stage FPS log lines
+
 # Model Settings
 CONFIDENCE_THRESHOLD = 0.5      # Minimum confidence for object detection
 DEPTH_MODEL_SIZE = "small"      # Options: "small", "base", "large"
+YOLO_MODEL_PATH = "yolo_nas_s.onnx"
+YOLO_MODEL_VARIANT = "fp32"     # Options: "fp32", "fp16", "int8" (see models/quantization.py)
+YOLO_INPUT_SIZE = (640, 640)
+YOLO_LETTERBOX = False          # Preserve aspect ratio when resizing frames
+DETECTION_STRIDE = 3            # Run the detector (and depth) every Nth frame, track in between
+ALLOWED_CLASSES = yolo_nas_model.NAVIGATION_CLASSES  # Classes reported (None: all 80 COCO classes)
+DECISION_ENABLED = True         # Add a per-frame "decision" and "hazard" (models/decision.py, depth-weighted) to the results
+
+# Tiled detection (models/tiling.py): on detector frames, native-resolution tiles over the walking
+# path and around small objects of the previous frame are added to the full-frame pass, so small
+# and distant obstacles survive the downscale. Each tile costs about one more inference.
+TILED_DETECTION = False
+TILE_BUDGET = 2                 # Tiles per frame on top of the full-frame pass
+TILE_TIME_BUDGET = None         # Seconds per detector frame the tiles may not push past (None: no limit)
+TILE_REGIONS = [(0.3, 0.2, 0.7, 0.8)]  # Normalized xyxy regions always tiled (taking turns beyond the budget)
+
+# Adaptive scheduler (helpers/scheduler.py): steps through OPERATING_POINTS at runtime to keep
+# the capture-to-publish latency within budget, and steps down when the CPU gets hot (thermal
+# throttling). The current point is published with every result ("operating_point"; binary
+# payloads carry only its level, the ladder is in the metadata as "operating_points").
+# Smaller input sizes need a model exported with dynamic height/width; otherwise only the
+# stride and depth cadence change.
+ADAPTIVE_ENABLED = True
+LATENCY_BUDGET = 0.5            # Seconds, p90 from capture to publish
+# Mean seconds per frame a compute stage may take, or None to steer on latency alone (default).
+# Not the frame period: the latest-frame-wins pipeline drops frames on purpose, so on the Pi the
+# detector is nearly always slower than 1/CAMERA_FRAMERATE even when latency is well within budget.
+STAGE_BUDGET = None
+OPERATING_POINTS = [            # Most expensive first; depth_interval: refresh depth every Nth detector frame
+    {"input_size": YOLO_INPUT_SIZE, "detection_stride": 2, "depth_interval": 1},
+    {"input_size": YOLO_INPUT_SIZE, "detection_stride": DETECTION_STRIDE, "depth_interval": 1},
+    {"input_size": (512, 512), "detection_stride": DETECTION_STRIDE, "depth_interval": 2},
+    {"input_size": (416, 416), "detection_stride": 4, "depth_interval": 2},
+    {"input_size": (320, 320), "detection_stride": 6, "depth_interval": 3},
+]
+ADAPTIVE_START_LEVEL = 1        # Index of the point matching the fixed settings above
+
+# Inference backends (models/backends.py): only the selected ones are imported
+DETECTOR_BACKEND = "onnx"       # Options: "onnx", "stub" (fake detector for testing without a model)
+DEPTH_BACKEND = "onnx"
+
+# Detector execution: 0 runs it in this process with ORT intra-op threads; N > 0 runs it in
+# N worker processes fed through shared memory (models/inference_pool.py). Pick with
+# benchmarks/bench_inference_pool.py; ORT_INTRA_OP_THREADS is then split between the workers.
+INFERENCE_WORKERS = 0
+
+# ONNX Runtime Settings
+ORT_INTRA_OP_THREADS = 4        # Raspberry Pi has 4 cores
+ORT_INTER_OP_THREADS = 1
+ORT_OPTIMIZATION_LEVEL = "all"  # Options: "disable", "basic", "extended", "all"
+ORT_WARMUP_RUNS = 3             # Dummy runs before the first real frame
 
 
 class CVProcessor:
-    def __init__(self):
+    def __init__(self, metrics=None):
+        self.metrics = metrics or Metrics(enabled=False)
         self.yolo_model = None
+        self.yolo_preprocessor = None
+        self.roi_preprocessor = None
+        self.preprocessors = {}  # input size -> (full-frame, roi) Preprocessors
+        self.input_size = YOLO_INPUT_SIZE
+        self.tile_detector = None
         self.depth_model = None
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        self.tracker = Tracker()
+        self.track_depths = {}
+        self.last_detections = None
+        self.device = "cpu"  # The backends run on ONNX Runtime's CPU execution provider
         logger.info(f"Using device: {self.device}")
         
-    def load_models(self):
-        """Load YOLO NAS S and MIDAS models"""
+    def detector_options(self, intra_op_threads=ORT_INTRA_OP_THREADS, batch=1):
+        """Arguments of yolo_nas_model.load_session (also sent to pool workers)"""
+        model_path = yolo_nas_model.model_variant_path(YOLO_MODEL_VARIANT, YOLO_MODEL_PATH)
+        options = {
+            "model_path": model_path,
+            "input_size": YOLO_INPUT_SIZE,
+            "intra_op_threads": intra_op_threads,
+            "inter_op_threads": ORT_INTER_OP_THREADS,
+            "optimization_level": ORT_OPTIMIZATION_LEVEL,
+            "warmup_runs": ORT_WARMUP_RUNS
+        }
+        if batch > 1:
+            options["model_path"] = yolo_nas_model.batch_model_path(model_path)
+            options["batch"] = batch
+        return options
+
+    def load_models(self, load_detector=True, profile=None, batch=1):
+        """Load YOLO NAS S and MIDAS models (the detector stays out of this process in pool mode)
+
+        profile, a StartupProfile, gets a phase for each backend import and model load.
+        batch > 1 loads the dynamic-batch detector for multi-camera mode.
+        """
+        profile = profile or StartupProfile(enabled=False)
         try:
-            logger.info("Loading YOLO NAS S model...")
-            # Load YOLO NAS S model
-            # self.yolo_model = ...
-            logger.info("YOLO NAS S model loaded successfully")
+            if load_detector:
+                logger.info(f"Loading YOLO NAS S model ({YOLO_MODEL_VARIANT}, {DETECTOR_BACKEND} backend)...")
+                import_times = {}
+                load_detector_session = backends.load("detector", DETECTOR_BACKEND, import_times)
+                profile.mark(f"import detector backend ({DETECTOR_BACKEND})", import_times)
+                self.yolo_model = load_detector_session(**self.detector_options(batch=batch))
+                self.yolo_preprocessor = Preprocessor(YOLO_INPUT_SIZE, letterbox=YOLO_LETTERBOX)
+                # Motion crops vary in shape, letterbox them to avoid distorting objects
+                self.roi_preprocessor = Preprocessor(YOLO_INPUT_SIZE, letterbox=True)
+                self.preprocessors[YOLO_INPUT_SIZE] = (self.yolo_preprocessor, self.roi_preprocessor)
+                if TILED_DETECTION:
+                    self.tile_detector = TileDetector(
+                        self.yolo_model, YOLO_INPUT_SIZE, letterbox=YOLO_LETTERBOX,
+                        confidence_threshold=CONFIDENCE_THRESHOLD,
+                        allowed_classes=ALLOWED_CLASSES, max_tiles=TILE_BUDGET,
+                        time_budget=TILE_TIME_BUDGET, regions=TILE_REGIONS, metrics=self.metrics)
+                profile.mark("load detector", getattr(self.yolo_model, "timings", None))
+                logger.info(f"YOLO NAS S model loaded successfully ({self.yolo_model.report()})")
 
-            logger.info("Loading MIDAS depth estimation model...")
-            # Load MIDAS depth estimation model
-            # self.depth_model = ...
-            logger.info("MIDAS model loaded successfully")
+            logger.info(f"Loading MIDAS depth estimation model ({DEPTH_MODEL_SIZE})...")
+            import_times = {}
+            load_depth_model = backends.load("depth", DEPTH_BACKEND, import_times)
+            profile.mark(f"import depth backend ({DEPTH_BACKEND})", import_times)
+            self.depth_model = load_depth_model(
+                DEPTH_MODEL_SIZE,
+                intra_op_threads=ORT_INTRA_OP_THREADS,
+                inter_op_threads=ORT_INTER_OP_THREADS,
+                optimization_level=ORT_OPTIMIZATION_LEVEL,
+                warmup_runs=ORT_WARMUP_RUNS
+            )
+            profile.mark("load depth model", self.depth_model.session.timings)
+            logger.info(f"MIDAS model loaded successfully ({self.depth_model.session.report()})")
 
             return True
             
         except Exception as e:
             logger.error(f"Error loading models: {e}")
             return False
+
+    def run_object_detection(self, frame, timestamp=None, run_detector=True, roi=None):
+        """Run YOLO NAS S on a frame and return a list of tracked detection dicts
+
+        With run_detector=False the detector is skipped and the tracked boxes
+        are extrapolated to the frame timestamp instead. With a roi
+        (x1, y1, x2, y2) only that crop of the frame goes through the detector;
+        otherwise the tile detector, when enabled, adds high-resolution tiles.
+        """
+        metrics = self.metrics
+        t = metrics.now()
+        detections = None
+        if run_detector and roi is None and self.tile_detector is not None:
+            detections = self.tile_detector.detect(frame)
+            t = metrics.now()
+        elif run_detector:
+            preprocessor = self.yolo_preprocessor
+            if roi is not None:
+                x1, y1, x2, y2 = roi
+                frame = frame[y1:y2, x1:x2]
+                preprocessor = self.roi_preprocessor
+
+            _, input_tensor, orig_size = preprocessor(frame)
+            t = metrics.lap("preprocess", t)
+            outputs = self.yolo_model.run(input_tensor)
+            t = metrics.lap("inference", t)
+
+            boxes, scores, class_ids = yolo_nas_model.process_output(
+                outputs, CONFIDENCE_THRESHOLD, orig_size, preprocessor,
+                allowed_classes=ALLOWED_CLASSES
+            )
+            t = metrics.lap("postprocess", t)
+            boxes, scores, class_ids = yolo_nas_model.apply_nms(boxes, scores, class_ids)
+            t = metrics.lap("nms", t)
+            if roi is not None:
+                boxes[:, 0::2] += x1
+                boxes[:, 1::2] += y1
+            detections = (boxes, scores, class_ids)
+        return self.track_detections(detections, timestamp, roi, start=t)
+
+    def track_detections(self, detections, timestamp=None, roi=None, start=None):
+        """Feed (boxes, scores, class_ids) in frame pixels, or None for a skipped
+        frame, to the tracker and return the tracked detection dicts"""
+        t = self.metrics.now() if start is None else start
+        if detections is not None:
+            tracks = self.tracker.update(*detections, timestamp, roi=roi)
+        else:
+            tracks = self.tracker.predict(timestamp)
+        self.metrics.lap("track", t)
+
+        boxes, scores, class_ids, track_ids, velocities = tracks
+        return [
+            {
+                "track_id": int(track_id),
+                "class_id": int(class_id),
+                "label": yolo_nas_model.CLASS_NAMES[class_id],
+                "confidence": round(float(score), 3),
+                "bbox": [round(float(v), 1) for v in box],
+                "velocity": [round(float(v), 1) for v in velocity]  # px/s of the box center
+            }
+            for box, score, class_id, track_id, velocity
+            in zip(boxes, scores, class_ids, track_ids, velocities)
+        ]
+
+    def dynamic_input_size(self):
+        """True when the in-process detector accepts other input sizes than YOLO_INPUT_SIZE"""
+        shape = getattr(self.yolo_model, "model_input_shape", None)
+        return shape is not None and not all(isinstance(dim, int) for dim in shape[2:])
+
+    def set_input_size(self, input_size):
+        """Switch the detector input size (call from the detection thread, between frames)"""
+        input_size = tuple(input_size)
+        if input_size == self.input_size:
+            return
+        if input_size not in self.preprocessors:
+            self.preprocessors[input_size] = (Preprocessor(input_size, letterbox=YOLO_LETTERBOX),
+                                              Preprocessor(input_size, letterbox=True))
+        self.yolo_preprocessor, self.roi_preprocessor = self.preprocessors[input_size]
+        self.input_size = input_size
+
+    def fork(self):
+        """Processor sharing this one's models with its own tracking state (one per camera)"""
+        processor = copy.copy(self)
+        processor.tracker = Tracker()
+        processor.track_depths = {}
+        processor.last_detections = None
+        return processor
+
+    def start_inference_pool(self, frame_shape, workers=INFERENCE_WORKERS):
+        """Run the detector in worker processes instead (see models/inference_pool.py)"""
+        logger.info(f"Starting {workers} detector worker processes...")
+        threads = max(1, ORT_INTRA_OP_THREADS // workers)  # Split the cores, don't oversubscribe
+        return InferencePool(
+            workers, frame_shape,
+            backend=DETECTOR_BACKEND,
+            backend_options=self.detector_options(intra_op_threads=threads),
+            input_size=YOLO_INPUT_SIZE,
+            letterbox=YOLO_LETTERBOX,
+            confidence_threshold=CONFIDENCE_THRESHOLD,
+            allowed_classes=ALLOWED_CLASSES
+        ).start()
+
+    def run_depth_estimation(self, frame, detected_objects, refresh=True):
+        """Attach relative depth to detected objects (see models/midas.py)
+
+        With refresh=False the depth model is skipped and each track keeps the
+        depth measured on the last detection frame.
+        """
+        if refresh:
+            detected_objects = midas_model.run_depth_estimation(self, frame, detected_objects)
+            self.track_depths = {
+                obj["track_id"]: (obj["relative_depth"], obj["depth_confidence"])
+                for obj in detected_objects
+            }
+        else:
+            for obj in detected_objects:
+                obj["relative_depth"], obj["depth_confidence"] = self.track_depths.get(
+                    obj["track_id"], (0.0, 0.0))
+        return detected_objects
     
 
     
 
 
 class MQTTPublisher:
-    def __init__(self):
+    def __init__(self, encoding=PAYLOAD_ENCODING, qos=MQTT_QOS, max_in_flight=MQTT_MAX_IN_FLIGHT,
+                 metrics=None):
+        if encoding not in payload_codec.ENCODINGS:
+            raise ValueError(f"Unknown payload encoding '{encoding}', expected one of {payload_codec.ENCODINGS}")
         self.client = None
         self.connected = False
+        self.encoding = encoding
+        self.qos = qos
+        self.max_in_flight = max_in_flight
+        self.metrics = metrics or Metrics(enabled=False)
+        self.metadata = None
+        self.on_resync = None  # Called when a subscriber requests a keyframe
+
+        # Backpressure state, shared with paho's network thread
+        self.lock = threading.Lock()
+        self.in_flight = {}     # mid -> send time
+        self.early_acks = set() # mids acknowledged before publish() returned
+        self.pending = {}       # topic -> (payload, qos, retain), latest only
+        self.coalesced = 0
+        self.latencies = deque(maxlen=200)
+
+        # Offline spool, replayed from a background thread after reconnecting
+        self.spool = Spool(SPOOL_PATH, SPOOL_SIZE_MB * 1024 * 1024) if SPOOL_ENABLED else None
+        self.replayed = 0
+        self.stop_event = threading.Event()
+        self.replay_thread = None
         
     def setup_mqtt(self):
         """Setup MQTT client"""
@@ -89,21 +399,38 @@ class MQTTPublisher:
             
             if MQTT_USERNAME and MQTT_PASSWORD:
                 self.client.username_pw_set(MQTT_USERNAME, MQTT_PASSWORD)
+
+            # Keep paho's own queues bounded too; our limit applies first
+            self.client.max_inflight_messages_set(max(self.max_in_flight, 1))
+            self.client.max_queued_messages_set(self.max_in_flight * 2)
+            self.client.reconnect_delay_set(MQTT_RECONNECT_MIN_DELAY, MQTT_RECONNECT_MAX_DELAY)
             
             self.client.on_connect = self.on_connect
             self.client.on_disconnect = self.on_disconnect
             self.client.on_publish = self.on_publish
+            self.client.message_callback_add(MQTT_TOPIC_CV_RESYNC, self.on_resync_request)
             
+            # paho's network thread keeps retrying (with backoff) until the broker is up
             logger.info(f"Connecting to MQTT broker: {BROKER_ADDRESS}:{BROKER_PORT}")
-            self.client.connect(BROKER_ADDRESS, BROKER_PORT, 60)
+            self.client.connect_async(BROKER_ADDRESS, BROKER_PORT, 60)
             self.client.loop_start()
+
+            if self.spool is not None:
+                if len(self.spool):
+                    logger.info(f"{len(self.spool)} spooled messages from a previous run will be replayed")
+                self.replay_thread = threading.Thread(target=self._replay_loop, name="spool-replay",
+                                                      daemon=True)
+                self.replay_thread.start()
             
             # Wait for connection
             timeout = 10
             while not self.connected and timeout > 0:
                 time.sleep(0.1)
                 timeout -= 0.1
-                
+
+            if not self.connected and self.spool is not None:
+                logger.warning("MQTT broker unreachable, spooling results until it is back")
+                return True
             return self.connected
             
         except Exception as e:
@@ -114,48 +441,442 @@ class MQTTPublisher:
     def on_connect(self, client, userdata, flags, rc):
         if rc == 0:
             self.connected = True
+            self._reset_in_flight()
             logger.info(f"Successfully connected to MQTT Broker: {BROKER_ADDRESS}")
+            if self.metadata is not None:
+                self._publish_metadata()
+            if PUBLISH_MODE in ("delta", "both"):
+                client.subscribe(MQTT_TOPIC_CV_RESYNC)
+                if self.on_resync is not None:
+                    self.on_resync()  # Subscribers missed everything while we were away
+            self._flush_pending()
         else:
             logger.error(f"Failed to connect to MQTT Broker, return code {rc}")
     
     # MQTT Disconnect Callback
     def on_disconnect(self, client, userdata, rc):
         self.connected = False
+        self._reset_in_flight()
         logger.info(f"Disconnected from MQTT Broker with result code {rc}")
+        if rc != 0 and self.spool is not None:
+            logger.warning("Spooling results until the broker is back")
     
-    # MQTT Publish Callback
+    # MQTT Publish Callback: frees an in-flight slot and sends the latest coalesced frame
     def on_publish(self, client, userdata, mid):
-        pass  # Uncomment next line for verbose logging
+        with self.lock:
+            sent = self.in_flight.pop(mid, None)
+            if sent is None:
+                self.early_acks.add(mid)
+            else:
+                self.latencies.append(time.monotonic() - sent)
         # logger.debug(f"Message published with MID: {mid}")
+        self._flush_pending()
     
-    def publish_results(self, results):
-        """Publish CV results to MQTT topic"""
+    # Resync request from a delta subscriber that detected a sequence gap
+    def on_resync_request(self, client, userdata, message):
+        logger.info("Keyframe requested by a subscriber")
+        if self.on_resync is not None:
+            self.on_resync()
+
+    # --- Backpressure ---
+    def _reset_in_flight(self):
+        """Forget in-flight messages (lost with the connection); pending frames are kept"""
+        with self.lock:
+            self.in_flight.clear()
+            self.early_acks.clear()
+
+    def _expire_in_flight(self, now):
+        """Give up on messages that were never acknowledged (caller holds the lock)"""
+        expired = [mid for mid, sent in self.in_flight.items() if now - sent > MQTT_IN_FLIGHT_TIMEOUT]
+        for mid in expired:
+            del self.in_flight[mid]
+        if expired:
+            logger.warning(f"{len(expired)} MQTT message(s) not acknowledged within {MQTT_IN_FLIGHT_TIMEOUT}s")
+
+    def _publish(self, topic, payload, qos=None, retain=False, force=False, spool=False):
+        """Publish unless the in-flight limit is reached, else keep it as the topic's latest state
+
+        force bypasses the limit (retained metadata). With spool, the payload goes
+        to the offline spool while disconnected. Returns False only on errors;
+        coalesced and spooled frames count as accepted.
+        """
+        qos = self.qos if qos is None else qos
+        if not self.connected:
+            return self._spool(topic, payload) if spool else False
+
+        now = time.monotonic()
+        with self.lock:
+            self._expire_in_flight(now)
+            coalesce = not force and len(self.in_flight) >= self.max_in_flight
+            replaced = topic in self.pending
+            if coalesce:
+                self.pending[topic] = (payload, qos, retain)
+                self.coalesced += replaced
+            else:
+                self.pending.pop(topic, None)
+        if coalesce:
+            if replaced and topic == MQTT_TOPIC_CV_DELTA and self.on_resync is not None:
+                # A dropped delta breaks the subscriber's sequence: send a keyframe next
+                self.on_resync()
+            return True
+
+        rc = self._send(topic, payload, qos, retain, now)
+        if rc == mqtt.MQTT_ERR_NO_CONN and spool:
+            return self._spool(topic, payload)
+        return rc == mqtt.MQTT_ERR_SUCCESS
+
+    def _send(self, topic, payload, qos, retain, now):
+        """client.publish with in-flight bookkeeping; returns paho's result code"""
+        # paho takes its own locks in publish(); never call it while holding ours
+        result = self.client.publish(topic, payload, qos=qos, retain=retain)
+        if result.rc != mqtt.MQTT_ERR_SUCCESS:
+            return result.rc
+        with self.lock:
+            if result.mid in self.early_acks:
+                self.early_acks.discard(result.mid)
+                self.latencies.append(time.monotonic() - now)
+            else:
+                self.in_flight[result.mid] = now
+        return result.rc
+
+    # --- Offline spool ---
+    def _spool(self, topic, payload):
+        if self.spool is None:
+            return False
+        return self.spool.append(topic, payload)
+
+    def _replay_loop(self):
+        """Drain the spool at SPOOL_REPLAY_RATE, oldest first, yielding to live frames"""
+        interval = 1.0 / SPOOL_REPLAY_RATE
+        reserve = max(self.max_in_flight - 1, 1)  # Leave a slot for the next live frame
+        while not self.stop_event.wait(interval):
+            if not self.connected or not len(self.spool):
+                continue
+            with self.lock:
+                if self.pending or len(self.in_flight) >= reserve:
+                    continue
+            topic, payload, _, record_id = self.spool.peek()
+            try:
+                rc = self._send(SPOOL_REPLAY_TOPIC_PREFIX + topic, payload, self.qos, False,
+                                time.monotonic())
+            except Exception as e:
+                logger.error(f"Error replaying spooled message: {e}")
+                continue
+            if rc == mqtt.MQTT_ERR_SUCCESS:
+                self.spool.pop(record_id)  # No-op if a live publish evicted it meanwhile
+                self.replayed += 1
+                if not len(self.spool):
+                    logger.info(f"Spool drained ({self.replayed} messages replayed)")
+
+    def _flush_pending(self):
+        """Send one coalesced frame if a slot is free (called from paho's network thread)"""
+        with self.lock:
+            if not self.pending or not self.connected or len(self.in_flight) >= self.max_in_flight:
+                return
+            topic = next(iter(self.pending))
+            payload, qos, retain = self.pending.pop(topic)
+        try:
+            self._publish(topic, payload, qos, retain)
+        except Exception as e:
+            logger.error(f"Error publishing coalesced message on {topic}: {e}")
+
+    def stats(self):
+        """Queue depth and publish latency (ms) for the stats log"""
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000.0
+            in_flight, pending, coalesced = len(self.in_flight), len(self.pending), self.coalesced
+        if latencies.size:
+            p50, p95 = np.percentile(latencies, (50, 95))
+        else:
+            p50 = p95 = 0.0
+        return {"in_flight": in_flight, "pending": pending, "coalesced": coalesced,
+                "latency_p50_ms": float(p50), "latency_p95_ms": float(p95),
+                "spooled": len(self.spool) if self.spool is not None else 0,
+                "replayed": self.replayed}
+
+    def publish_delta(self, message):
+        """Publish a delta-mode message (keyframe or change set)"""
         if self.connected:
             try:
-                payload_json = json.dumps(results, indent=None, separators=(',', ':'))
-                result = self.client.publish(MQTT_TOPIC_CV_RESULTS, payload_json)
-                return result.rc == mqtt.MQTT_ERR_SUCCESS
+                return self._publish(MQTT_TOPIC_CV_DELTA, payload_codec.encode_json(message))
+            except Exception as e:
+                logger.error(f"Error publishing delta: {e}")
+                return False
+        return False
+
+    def publish_metadata(self, metadata):
+        """Publish the static metadata once (retained, re-sent after reconnects)"""
+        self.metadata = dict(metadata, encodings=self._advertised_encodings())
+        if self.connected:
+            return self._publish_metadata()
+        return False
+
+    def _advertised_encodings(self):
+        """Topics per encoding, so subscribers can pick the format they understand"""
+        encodings = {}
+        if self.encoding in ("json", "both"):
+            encodings["json"] = {"topic": MQTT_TOPIC_CV_RESULTS}
+        if self.encoding in ("binary", "both"):
+            encodings["binary"] = {"topic": MQTT_TOPIC_CV_RESULTS_BINARY,
+                                   "version": payload_codec.PAYLOAD_VERSION}
+        if PUBLISH_MODE in ("delta", "both"):
+            encodings["delta"] = {"topic": MQTT_TOPIC_CV_DELTA, "resync_topic": MQTT_TOPIC_CV_RESYNC}
+        return encodings
+
+    def _publish_metadata(self):
+        try:
+            return self._publish(MQTT_TOPIC_CV_METADATA, payload_codec.encode_json(self.metadata),
+                                 qos=1, retain=True, force=True)
+        except Exception as e:
+            logger.error(f"Error publishing metadata: {e}")
+            return False
+
+    def publish_results(self, results, topic=MQTT_TOPIC_CV_RESULTS, frame_size=CAMERA_RESOLUTION):
+        """Publish CV results to MQTT topic(s) in the configured encoding (spooled while offline)
+
+        The binary encoding goes to MQTT_TOPIC_CV_RESULTS_BINARY, or <topic>/bin for other topics.
+        """
+        if self.connected or self.spool is not None:
+            try:
+                metrics = self.metrics
+                t = metrics.now()
+                success = True
+                if self.encoding in ("binary", "both"):
+                    payload_binary = payload_codec.encode_binary(results, frame_size)
+                    t = metrics.lap("encode", t)
+                    binary_topic = (MQTT_TOPIC_CV_RESULTS_BINARY if topic == MQTT_TOPIC_CV_RESULTS
+                                    else f"{topic}/bin")
+                    success = self._publish(binary_topic, payload_binary, spool=True)
+                    t = metrics.lap("publish", t)
+                if self.encoding in ("json", "both"):
+                    payload_json = payload_codec.encode_json(results)
+                    t = metrics.lap("encode", t)
+                    success = self._publish(topic, payload_json, spool=True) and success
+                    metrics.lap("publish", t)
+                return success
             except Exception as e:
                 logger.error(f"Error publishing results: {e}")
                 return False
         return False
     
+    def publish_metrics(self, summary):
+        """Publish an instrumentation summary (never spooled or coalesced with results)"""
+        if self.connected:
+            try:
+                return self._publish(MQTT_TOPIC_CV_METRICS, payload_codec.encode_json(summary))
+            except Exception as e:
+                logger.error(f"Error publishing metrics: {e}")
+        return False
+
     def cleanup(self):
         """Cleanup MQTT connection"""
+        self.stop_event.set()
+        if self.replay_thread is not None:
+            self.replay_thread.join(timeout=1.0)
         if self.client and self.connected:
             self.client.loop_stop()
             self.client.disconnect()
+        elif self.client:
+            self.client.loop_stop()
+        if self.spool is not None:
+            self.spool.close()
+
+def run_stats_loop(cv_pipeline, mqtt_publisher, metrics, frame_number):
+    """Log pipeline/MQTT stats and export metrics until the pipeline stops"""
+    last_metrics_time = time.monotonic()
+    reported_drops = reported_errors = 0
+    while cv_pipeline.is_running():
+        time.sleep(STATS_LOG_INTERVAL)
+        mqtt_stats = mqtt_publisher.stats()
+        logger.info(f"Frame {frame_number()}: {cv_pipeline.stats_line()} | mqtt in-flight "
+                    f"{mqtt_stats['in_flight']} pending {mqtt_stats['pending']} "
+                    f"coalesced {mqtt_stats['coalesced']} spooled {mqtt_stats['spooled']} "
+                    f"latency p50/p95 {mqtt_stats['latency_p50_ms']:.1f}/{mqtt_stats['latency_p95_ms']:.1f} ms")
+
+        if metrics.enabled:
+            for stage_name, depth in cv_pipeline.queue_depths().items():
+                metrics.set_gauge(f"queue_depth_{stage_name}", depth)
+            for name in ("in_flight", "pending", "spooled"):
+                metrics.set_gauge(f"mqtt_{name}", mqtt_stats[name])
+            dropped = cv_pipeline.dropped()
+            metrics.increment("dropped_frames", dropped - reported_drops)
+            reported_drops = dropped
+            errors = cv_pipeline.errors()
+            metrics.increment("stage_errors", errors - reported_errors)
+            reported_errors = errors
+
+            if METRICS_PROMETHEUS_PATH:
+                metrics.write_prometheus(METRICS_PROMETHEUS_PATH)
+            if time.monotonic() - last_metrics_time >= METRICS_INTERVAL:
+                last_metrics_time = time.monotonic()
+                mqtt_publisher.publish_metrics(dict(metrics.summary(), device_id=MQTT_CLIENT_ID,
+                                                    timestamp=time.time()))
+
+def start_cameras(cameras=CAMERAS):
+    """Start a FrameSource per CAMERAS entry (stops the started ones if one fails)"""
+    sources = []
+    try:
+        for camera in cameras:
+            if "device" in camera:
+                source = VideoCaptureSource(camera["device"], CAMERA_RESOLUTION)
+            else:
+                source = Picamera2Source(CAMERA_RESOLUTION, framerate=CAMERA_FRAMERATE,
+                                         camera_num=camera.get("camera_num", 0))
+            sources.append(source.start())
+    except Exception:
+        for source in sources:
+            source.stop()
+        raise
+    return sources
+
+
+def run_multi_camera(cv_processor, mqtt_publisher, metrics, cameras=CAMERAS):
+    """Detect on all cameras with one batched session call per round and publish per camera
+
+    Each camera keeps its own tracker, depth cache and decision engine; motion
+    gating, crops, delta publishing and the inference pool are single-camera only.
+    """
+    names = [camera["name"] for camera in cameras]
+    topics = [MQTT_TOPIC_CV_CAMERA_RESULTS.format(camera=name) for name in names]
+    frame_sources = start_cameras(cameras)
+    cv_pipeline = None
+    try:
+        time.sleep(2)  # Allow the cameras to stabilize
+        logger.info(f"{len(frame_sources)} cameras initialized: {', '.join(names)}")
+
+        collector = BatchCollector(frame_sources, window=CAMERA_BATCH_WINDOW)
+        detector = BatchDetector(cv_processor.yolo_model, len(frame_sources), YOLO_INPUT_SIZE,
+                                 letterbox=YOLO_LETTERBOX, confidence_threshold=CONFIDENCE_THRESHOLD,
+                                 allowed_classes=ALLOWED_CLASSES, metrics=metrics)
+        processors = [cv_processor.fork() for _ in frame_sources]
+        class_weights = class_weight_table(yolo_nas_model.CLASS_NAMES)
+        decision_engines = [DecisionEngine(class_weights=class_weights) for _ in frame_sources]
+        rounds = 0
+
+        processing_info = {
+            "model_confidence_threshold": CONFIDENCE_THRESHOLD,
+            "model_variant": YOLO_MODEL_VARIANT,
+            "device": str(cv_processor.device),
+            "backend": DETECTOR_BACKEND,
+            "detection_stride": DETECTION_STRIDE,
+            "batch": len(frame_sources)
+        }
+        # The cameras may not honour CAMERA_RESOLUTION: report what each one delivers
+        resolutions = [dict(zip(("width", "height"), source.frame_size())) for source in frame_sources]
+        mqtt_publisher.publish_metadata({
+            "device_id": MQTT_CLIENT_ID,
+            "frame_resolution": resolutions[0],  # First camera's; see "cameras" for each one
+            "processing_info": processing_info,
+            "class_names": yolo_nas_model.CLASS_NAMES,
+            "cameras": [{"name": name, "topic": topic, "frame_resolution": resolution}
+                        for name, topic, resolution in zip(names, topics, resolutions)]
+        })
+        logger.info(f"Starting batched CV processing, publishing to '{MQTT_TOPIC_CV_CAMERA_RESULTS}'...")
+        logger.info("Press Ctrl+C to stop...")
+
+        # --- Pipeline stages: a work item is the list of per-camera items of one batch ---
+        def capture_stage():
+            t = metrics.now()
+            batch = collector.collect(timeout=1.0)
+            metrics.lap("capture", t)
+            if not batch:
+                return None
+            return [{"camera": index, "frame_ref": frame} for index, frame in batch]
+
+        def release_frames(items):
+            for item in items:
+                frame_sources[item["camera"]].release(item["frame_ref"])
+
+        def detection_stage(items):
+            nonlocal rounds
+            # The detector and depth model run every DETECTION_STRIDE batches, tracking in between
+            detector_ran = rounds % DETECTION_STRIDE == 0
+            rounds += 1
+            results = [None] * len(items)
+            if detector_ran:
+                results = detector.detect([(item["camera"], item["frame_ref"].image) for item in items])
+            for item, detections in zip(items, results):
+                item["detector_ran"] = detector_ran
+                item["detections"] = processors[item["camera"]].track_detections(
+                    detections, item["frame_ref"].monotonic)
+            return items
+
+        def depth_stage(items):
+            for item in items:
+                processor = processors[item["camera"]]
+                if item["detections"]:
+                    t = metrics.now()
+                    item["detections"] = processor.run_depth_estimation(
+                        item["frame_ref"].image, item["detections"], refresh=item["detector_ran"])
+                    if item["detector_ran"]:
+                        metrics.lap("depth", t)
+                processor.last_detections = item["detections"]
+            release_frames(items)  # Nothing downstream reads the pixels
+            return items
+
+        def publish_stage(items):
+            for item in items:
+                camera = item["camera"]
+                frame = item["frame_ref"]
+                size = (frame.image.shape[1], frame.image.shape[0])  # The camera may not honour CAMERA_RESOLUTION
+                payload = {
+                    "timestamp": frame.timestamp,
+                    "frame_id": frame.seq,
+                    "device_id": MQTT_CLIENT_ID,
+                    "camera": names[camera],
+                    "processing_info": processing_info,
+                    "detector_ran": item["detector_ran"],
+                    "static": False,
+                    "detections": item["detections"]
+                }
+                if DECISION_ENABLED:
+                    t = metrics.now()
+                    payload["decision"] = decision_engines[camera].update_from_detections(
+                        item["detections"], size)
+                    payload["hazard"] = round(decision_engines[camera].hazard, 3)
+                    metrics.lap("decide", t)
+                if not mqtt_publisher.publish_results(payload, topics[camera], frame_size=size):
+                    logger.warning(f"Failed to publish results for camera {names[camera]} "
+                                   f"frame {frame.seq}")
+            return None
+
+        cv_pipeline = (Pipeline(queue_size=PIPELINE_QUEUE_SIZE, on_drop=release_frames)
+                       .add_stage("capture", capture_stage)
+                       .add_stage("detect", detection_stage)
+                       .add_stage("depth", depth_stage)
+                       .add_stage("publish", publish_stage))
+        cv_pipeline.start()
+
+        run_stats_loop(cv_pipeline, mqtt_publisher, metrics,
+                       lambda: "/".join(str(seq) for seq in collector.last_seq))
+    finally:
+        if cv_pipeline:
+            cv_pipeline.stop()
+            logger.info("Pipeline stopped")
+        for frame_source in frame_sources:
+            frame_source.stop()
+        logger.info("Cameras stopped")
+
 
 def main():
     # Initialize components
-    cv_processor = CVProcessor()
-    mqtt_publisher = MQTTPublisher()
-    picam2 = None
+    metrics = Metrics(enabled=METRICS_ENABLED)
+    cv_processor = CVProcessor(metrics)
+    mqtt_publisher = MQTTPublisher(metrics=metrics)
+    frame_source = None
+    cv_pipeline = None
+    inference_pool = None
     
     try:
         # Load CV models
         logger.info("Loading computer vision models...")
-        if not cv_processor.load_models():
+        multi_camera = len(CAMERAS) > 1
+        if multi_camera and INFERENCE_WORKERS > 0:
+            logger.warning("INFERENCE_WORKERS is ignored in multi-camera mode (the batch runs in-process)")
+        if TILED_DETECTION and (multi_camera or INFERENCE_WORKERS > 0):
+            logger.warning("TILED_DETECTION only applies to single-camera, in-process detection")
+        if not cv_processor.load_models(load_detector=INFERENCE_WORKERS == 0 or multi_camera,
+                                        batch=len(CAMERAS) if multi_camera else 1):
             logger.error("Failed to load CV models. Exiting.")
             return
         
@@ -164,79 +885,230 @@ def main():
         if not mqtt_publisher.setup_mqtt():
             logger.error("Failed to connect to MQTT broker. Exiting.")
             return
+
+        if multi_camera:
+            run_multi_camera(cv_processor, mqtt_publisher, metrics)
+            return
         
         # Initialize camera
         logger.info("Initializing camera...")
-        picam2 = Picamera2()
-        config = picam2.create_still_configuration(
-            main={"size": CAMERA_RESOLUTION},
-            lores={"size": (640, 360)}, 
-            display="lores"
-        )
-        picam2.configure(config)
-        
-        if PREVIEW_WINDOW:
-            picam2.start_preview()
-        
-        picam2.start()
+        # A grabber thread paced by the camera's FrameRate fills a ring of buffers
+        # (frames waiting in the inference pool hold their slot too)
+        frame_source = Picamera2Source(CAMERA_RESOLUTION, LORES_RESOLUTION, CAMERA_FRAMERATE,
+                                       preview=PREVIEW_WINDOW,
+                                       ring_size=RING_SIZE + 2 * INFERENCE_WORKERS).start()
         time.sleep(2)  # Allow camera to stabilize
         logger.info("Camera initialized successfully")
+
+        if INFERENCE_WORKERS > 0:
+            inference_pool = cv_processor.start_inference_pool(frame_source.images.shape[1:])
         
         logger.info(f"Starting CV processing and MQTT publishing to topic '{MQTT_TOPIC_CV_RESULTS}'...")
         logger.info("Press Ctrl+C to stop...")
         
-        frame_count = 0
-        total_processing_time = 0
-        
-        while True:
-            start_time = time.time()
-            
-            # Capture frame
-            frame_array = picam2.capture_array("main")
-            
-            # Run object detection
-            detected_objects = cv_processor.run_object_detection(frame_array)
-            
-            # Run depth estimation if we have detected objects
-            if detected_objects:
-                results_with_depth = cv_processor.run_depth_estimation(frame_array, detected_objects)
-            else:
-                results_with_depth = detected_objects
-            
-            # Prepare payload
+        last_seq = 0
+        frames_since_detection = 0
+        detector_frames = 0
+        operating_points = OPERATING_POINTS
+        if not cv_processor.dynamic_input_size():
+            # Fixed-size model (or pool workers with their own preprocessors): keep the input size
+            operating_points = [dict(point, input_size=YOLO_INPUT_SIZE) for point in OPERATING_POINTS]
+        scheduler = None
+        if ADAPTIVE_ENABLED:
+            scheduler = AdaptiveScheduler(operating_points, LATENCY_BUDGET, ADAPTIVE_START_LEVEL,
+                                          stage_budget=STAGE_BUDGET)
+        fixed_point = {"input_size": YOLO_INPUT_SIZE, "detection_stride": DETECTION_STRIDE,
+                       "depth_interval": 1}
+        motion_gate = MotionGate(max_static_time=MOTION_MAX_STATIC_TIME, yuv420=True) if MOTION_GATING else None
+
+        # Static metadata: sent once on a retained topic instead of in every binary payload.
+        # The resolution is what the camera delivers, which may differ from CAMERA_RESOLUTION
+        width, height = frame_source.frame_size()
+        frame_resolution = {
+            "width": width,
+            "height": height
+        }
+        processing_info = {
+            "model_confidence_threshold": CONFIDENCE_THRESHOLD,
+            "model_variant": YOLO_MODEL_VARIANT,
+            "device": str(cv_processor.device),
+            "backend": DETECTOR_BACKEND,
+            "detection_stride": DETECTION_STRIDE,
+            "tile_budget": TILE_BUDGET if cv_processor.tile_detector is not None else 0,
+            "adaptive": scheduler is not None
+        }
+        decision_engine = DecisionEngine(class_weights=class_weight_table(yolo_nas_model.CLASS_NAMES))
+        delta_encoder = DeltaEncoder(keyframe_interval=DELTA_KEYFRAME_INTERVAL,
+                                     move_threshold=DELTA_MOVE_THRESHOLD)
+        mqtt_publisher.on_resync = delta_encoder.request_keyframe
+        metadata = {
+            "device_id": MQTT_CLIENT_ID,
+            "frame_resolution": frame_resolution,
+            "processing_info": processing_info,
+            "class_names": yolo_nas_model.CLASS_NAMES
+        }
+        if scheduler is not None:
+            metadata["operating_points"] = [dict(point, level=level)
+                                            for level, point in enumerate(scheduler.points)]
+        mqtt_publisher.publish_metadata(metadata)
+
+        # --- Pipeline stages (each runs on its own worker thread) ---
+        def capture_stage():
+            nonlocal last_seq
+            # Newest frame from the grabber; it is held until release_frame()
+            t = metrics.now()
+            frame = frame_source.latest(after_seq=last_seq, timeout=1.0)
+            metrics.lap("capture", t)
+            if frame is None:
+                return None
+            last_seq = frame.seq
+            return {
+                "frame_ref": frame,
+                "frame_id": frame.seq,
+                "timestamp": frame.timestamp,
+                "capture_time": frame.monotonic,
+                "frame": frame.image,
+                "frame_size": (frame.image.shape[1], frame.image.shape[0]),
+                "lores": frame.lores
+            }
+
+        def release_frame(item):
+            frame_source.release(item["frame_ref"])
+
+        def detection_stage(item):
+            nonlocal frames_since_detection
+            stage_start = time.perf_counter()
+            item["point"] = point = scheduler.current if scheduler is not None else fixed_point
+            if inference_pool is None:
+                cv_processor.set_input_size(point["input_size"])
+            t = metrics.now()
+            motion = motion_gate.update(item["lores"]) if motion_gate else None
+            metrics.lap("motion", t)
+
+            # Static scene: skip detection entirely and re-publish the last result
+            item["static"] = (motion is not None and not motion.moving
+                              and cv_processor.last_detections is not None)
+            if item["static"]:
+                item["detector_ran"] = False
+                item["detections"] = cv_processor.last_detections
+                if inference_pool is not None:
+                    inference_pool.submit_skipped(item)  # Keep its place in the frame order
+                    return None
+                return item
+
+            # Pay for inference only every detection_stride frames (counted here, since
+            # the pipeline may drop frames before this stage)
+            item["detector_ran"] = frames_since_detection % point["detection_stride"] == 0
+            frames_since_detection += 1
+
+            roi = None
+            if MOTION_CROP and motion is not None and item["detector_ran"]:
+                roi = region_to_roi(motion.region, item["frame_size"])
+
+            if inference_pool is not None:
+                # A worker process detects; collect_stage tracks the results in frame order
+                # Set before submitting: depth_stage may add its time as soon as the pool has the item
+                item["roi"] = roi
+                item["stage_times"] = {"detect": time.perf_counter() - stage_start}
+                if item["detector_ran"] and inference_pool.submit(item["frame"], item, roi) is None:
+                    item["detector_ran"] = False  # Every worker is busy: extrapolate this frame
+                if not item["detector_ran"]:
+                    inference_pool.submit_skipped(item)
+                return None
+
+            item["detections"] = cv_processor.run_object_detection(
+                item["frame"], item["capture_time"], run_detector=item["detector_ran"], roi=roi)
+            item["stage_times"] = {"detect": time.perf_counter() - stage_start}
+            return item
+
+        def collect_stage():
+            # Pool mode only: results come back in submission order
+            result = inference_pool.get(timeout=0.1)
+            if result is None:
+                return None
+            item = result.meta
+            for stage_name, seconds in result.timings.items():
+                metrics.record(stage_name, seconds)
+            if not item["static"]:
+                item["detections"] = cv_processor.track_detections(
+                    result.detections, item["capture_time"], item["roi"])
+            return item
+
+        def depth_stage(item):
+            nonlocal detector_frames
+            stage_start = time.perf_counter()
+            # Refresh depth on every depth_interval-th detector frame, reuse it in between
+            refresh = False
+            if item["detector_ran"] and not item["static"]:
+                refresh = detector_frames % item["point"]["depth_interval"] == 0
+                detector_frames += 1
+            # Run depth estimation if we have detected objects (static frames already have it)
+            if item["detections"] and not item["static"]:
+                t = metrics.now()
+                item["detections"] = cv_processor.run_depth_estimation(
+                    item["frame"], item["detections"], refresh=refresh)
+                if refresh:
+                    metrics.lap("depth", t)
+            cv_processor.last_detections = item["detections"]
+            item.setdefault("stage_times", {})["depth"] = time.perf_counter() - stage_start
+            release_frame(item)  # Nothing downstream reads the pixels
+            return item
+
+        def publish_stage(item):
+            state = {"static": item["static"]}
+            if scheduler is not None:
+                state["operating_point"] = item["point"]  # The point this frame was processed at
+            if DECISION_ENABLED:
+                t = metrics.now()
+                state["decision"] = decision_engine.update_from_detections(item["detections"],
+                                                                           item["frame_size"])
+                metrics.lap("decide", t)
+
+            # Prepare payload (static blocks kept for the JSON consumers)
             payload = {
-                "timestamp": time.time(),
+                "timestamp": item["timestamp"],
+                "frame_id": item["frame_id"],
                 "device_id": MQTT_CLIENT_ID,
-                "frame_resolution": {
-                    "width": CAMERA_RESOLUTION[0], 
-                    "height": CAMERA_RESOLUTION[1]
-                },
-                "processing_info": {
-                    "model_confidence_threshold": CONFIDENCE_THRESHOLD,
-                    "device": str(cv_processor.device)
-                },
-                "detections": results_with_depth
+                "frame_resolution": frame_resolution,
+                "processing_info": processing_info,
+                "detector_ran": item["detector_ran"],
+                "static": item["static"],
+                "detections": item["detections"]
             }
-            
+            payload.update(state)
+            if DECISION_ENABLED:
+                payload["hazard"] = round(decision_engine.hazard, 3)  # Per frame, so not in the delta state
+
             # Publish results
-            if mqtt_publisher.publish_results(payload):
-                processing_time = time.time() - start_time
-                total_processing_time += processing_time
-                frame_count += 1
-                
-                avg_processing_time = total_processing_time / frame_count
-                fps = 1.0 / processing_time if processing_time > 0 else 0
-                
-                logger.info(f"Frame {frame_count}: {len(results_with_depth)} detections, "
-                          f"Processing: {processing_time:.3f}s, FPS: {fps:.1f}, "
-                          f"Avg: {avg_processing_time:.3f}s")
-            else:
-                logger.warning("Failed to publish results")
-            
-            # Control frame rate
-            sleep_duration = max(0, (1.0 / CAMERA_FRAMERATE) - (time.time() - start_time))
-            if sleep_duration > 0:
-                time.sleep(sleep_duration)
+            if PUBLISH_MODE in ("full", "both") and not mqtt_publisher.publish_results(
+                    payload, frame_size=item["frame_size"]):
+                logger.warning(f"Failed to publish results for frame {item['frame_id']}")
+
+            # Publish only what changed since the last message (nothing on a static scene)
+            if PUBLISH_MODE in ("delta", "both"):
+                message = delta_encoder.encode(item["detections"], state, item["timestamp"])
+                if message is not None and not mqtt_publisher.publish_delta(message):
+                    logger.warning(f"Failed to publish delta for frame {item['frame_id']}")
+                    delta_encoder.request_keyframe()
+
+            if scheduler is not None:
+                if scheduler.observe(time.monotonic() - item["capture_time"], item.get("stage_times"),
+                                     item["point"]["level"]):
+                    metrics.increment("operating_point_changes")
+                metrics.set_gauge("operating_level", scheduler.level)
+                if scheduler.temperature is not None:
+                    metrics.set_gauge("cpu_temperature", scheduler.temperature)
+            return None
+
+        cv_pipeline = (Pipeline(queue_size=PIPELINE_QUEUE_SIZE, on_drop=release_frame)
+                    .add_stage("capture", capture_stage)
+                    .add_stage("detect", detection_stage))
+        if inference_pool is not None:
+            cv_pipeline.add_stage("collect", collect_stage, source=True)
+        cv_pipeline.add_stage("depth", depth_stage).add_stage("publish", publish_stage)
+        cv_pipeline.start()
+
+        run_stats_loop(cv_pipeline, mqtt_publisher, metrics, lambda: last_seq)
     
     except KeyboardInterrupt:
         logger.info("Stopping publisher...")
@@ -245,15 +1117,51 @@ def main():
     finally:
         # Cleanup
         logger.info("Cleaning up...")
-        if picam2:
-            if PREVIEW_WINDOW:
-                picam2.stop_preview()
-            picam2.stop()
+        if cv_pipeline:
+            cv_pipeline.stop()
+            logger.info("Pipeline stopped")
+
+        if inference_pool:
+            inference_pool.close()
+            logger.info("Inference workers stopped")
+
+        if frame_source:
+            frame_source.stop()
             logger.info("Camera stopped")
         
         mqtt_publisher.cleanup()
         logger.info("MQTT connection closed")
         logger.info("Publisher stopped")
 
+def profile_startup():
+    """Time each startup phase up to the first camera frame and report peak RSS, then exit
+
+    Only this process is measured: the MQTT connection and the inference pool
+    are skipped, the detector is loaded in-process.
+    """
+    profile = StartupProfile(start=STARTUP_TIME)
+    profile.mark("imports")
+    cv_processor = CVProcessor()
+    if not cv_processor.load_models(profile=profile):
+        logger.error("Failed to load CV models")
+    try:
+        frame_source = Picamera2Source(CAMERA_RESOLUTION, LORES_RESOLUTION, CAMERA_FRAMERATE).start()
+        profile.mark("start camera")
+        frame = frame_source.latest(timeout=5.0)
+        if frame is not None:
+            profile.mark("first frame")
+        frame_source.stop()
+    except Exception as e:
+        logger.warning(f"Camera not profiled: {e}")
+    print(profile.report())
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="SmartSight CV publisher")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Report import, model load and warm-up time and peak RSS per phase, then exit")
+    args = parser.parse_args()
+    if args.profile_startup:
+        profile_startup()
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,61 @@
+import queue
+import time
+
+import models.inference_pool as inference_pool
+from models.inference_pool import InferencePool
+
+
+def make_pool(monkeypatch):
+    """A pool without worker processes: the test plays the workers through its results queue"""
+    monkeypatch.setattr(inference_pool, "REORDER_TIMEOUT", 0.2)
+    pool = InferencePool(workers=1, slots=4, backend_options={})
+    pool.results = queue.Queue()
+    return pool
+
+
+def submit(pool, meta):
+    """Take a slot and a seq the way submit() does, without copying a frame"""
+    with pool.lock:
+        slot = pool.free_slots.pop()
+        seq = pool.next_submit
+        pool.next_submit += 1
+        pool.meta[seq] = meta
+    return seq, slot
+
+
+def worker_result(seq, slot):
+    return ("result", seq, (slot, ([], [], []), {"inference": 0.01}))
+
+
+def test_late_result_after_skip_is_dropped(monkeypatch):
+    pool = make_pool(monkeypatch)
+    lost_seq, lost_slot = submit(pool, "lost")
+    next_seq, next_slot = submit(pool, "next")
+    pool.results.put(worker_result(next_seq, next_slot))
+
+    # The first frame's result is later than REORDER_TIMEOUT: it is skipped
+    assert pool.get(timeout=1.0).meta == "next"
+    assert pool.next_result == 2
+
+    # ...and its late result frees the slot without entering the reorder buffer
+    pool.results.put(worker_result(lost_seq, lost_slot))
+    assert pool.get(timeout=0.3) is None
+    assert pool.done == {}
+    assert sorted(pool.free_slots) == list(range(pool.slots))
+
+
+def test_slow_frame_after_late_result_is_not_skipped(monkeypatch):
+    pool = make_pool(monkeypatch)
+    lost_seq, lost_slot = submit(pool, "lost")
+    next_seq, next_slot = submit(pool, "next")
+    pool.results.put(worker_result(next_seq, next_slot))
+    assert pool.get(timeout=1.0).meta == "next"
+    pool.results.put(worker_result(lost_seq, lost_slot))
+
+    # A frame that is merely slow is waited for, not skipped as lost
+    slow_seq, slow_slot = submit(pool, "slow")
+    start = time.monotonic()
+    assert pool.get(timeout=inference_pool.REORDER_TIMEOUT * 2) is None
+    assert time.monotonic() - start >= inference_pool.REORDER_TIMEOUT * 2
+    pool.results.put(worker_result(slow_seq, slow_slot))
+    assert pool.get(timeout=1.0).meta == "slow"
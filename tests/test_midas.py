@@ -0,0 +1,12 @@
+import numpy as np
+
+from models.midas import sample_box_depths
+
+
+def test_uniform_distant_box_keeps_high_confidence():
+    disparity = np.full((256, 256), 0.02, dtype=np.float32)  # Far away everywhere
+    disparity[:, 128:] = np.linspace(0, 1, 128, dtype=np.float32)  # Depth varies across the right half
+    depths, confidences = sample_box_depths(disparity, [[0, 0, 200, 200], [300, 0, 500, 200]], (512, 512))
+    assert depths[0] > 0.95
+    assert confidences[0] > 0.99
+    assert confidences[1] < 0.5
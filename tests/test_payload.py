@@ -0,0 +1,43 @@
+import helpers.payload as payload_codec
+
+
+FRAME_SIZE = (1280, 720)
+
+
+def make_payload(**fields):
+    payload = {
+        "timestamp": 1700000000.0,
+        "frame_id": 7,
+        "static": False,
+        "detector_ran": True,
+        "detections": [{"track_id": 3, "class_id": 0, "confidence": 0.9, "bbox": [10, 20, 300, 400]}],
+    }
+    payload.update(fields)
+    return payload
+
+
+def test_decision_round_trip():
+    encoded = payload_codec.encode_binary(make_payload(decision="left", hazard=0.42), FRAME_SIZE)
+    decoded = payload_codec.decode_binary(encoded, FRAME_SIZE)
+    assert decoded["decision"] == "left"
+    assert abs(decoded["hazard"] - 0.42) < 1 / 255
+    assert len(decoded["detections"]) == 1
+
+
+def test_version_1_payload_still_decodes():
+    encoded = bytearray(payload_codec.encode_binary(make_payload(), FRAME_SIZE))
+    encoded[2] = 1
+    decoded = payload_codec.decode_binary(bytes(encoded), FRAME_SIZE)
+    assert decoded["frame_id"] == 7
+    assert "decision" not in decoded
+
+
+def test_operating_point_round_trip():
+    points = [{"detection_stride": 2}, {"detection_stride": 3}]
+    payload = make_payload(decision="stop", hazard=1.0,
+                           operating_point=dict(points[1], level=1))
+    encoded = payload_codec.encode_binary(payload, FRAME_SIZE)
+    decoded = payload_codec.decode_binary(encoded, FRAME_SIZE, operating_points=points)
+    assert decoded["operating_point"] == {"detection_stride": 3, "level": 1}
+    assert decoded["decision"] == "stop"
+    assert payload_codec.decode_binary(encoded, FRAME_SIZE)["operating_point"] == {"level": 1}
@@ -0,0 +1,35 @@
+import threading
+
+from helpers.pipeline import Pipeline
+
+
+def test_failed_item_is_released_and_counted():
+    items = iter(range(3))
+    released = []
+    done = threading.Event()
+
+    def source():
+        item = next(items, None)
+        if item is None:
+            done.wait(0.05)
+        return item
+
+    def failing(item):
+        if item == 1:
+            raise RuntimeError("bad frame")
+        return None
+
+    def on_drop(item):
+        released.append(item)
+        done.set()
+
+    # queue_size=3 so nothing is evicted: only the failure may release an item
+    pipeline = Pipeline(queue_size=3, on_drop=on_drop).add_stage("source", source).add_stage("fail", failing)
+    pipeline.start()
+    try:
+        assert done.wait(2.0)
+    finally:
+        pipeline.stop()
+    assert released == [1]
+    assert pipeline.errors() == 1
+    assert pipeline.dropped() == 0
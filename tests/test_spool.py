@@ -0,0 +1,19 @@
+from helpers.spool import Spool, RECORD
+
+
+def test_pop_skips_a_record_evicted_after_peek(tmp_path):
+    record_size = RECORD.size + len("t") + 10
+    spool = Spool(str(tmp_path / "spool.bin"), capacity=record_size * 3)
+    for i in range(3):
+        spool.append("t", b"%010d" % i)
+
+    topic, payload, _, record_id = spool.peek()
+    assert payload == b"%010d" % 0
+    spool.append("t", b"%010d" % 3)  # Live publish into the full ring evicts the peeked record
+    assert spool.evicted == 1
+
+    assert not spool.pop(record_id)
+    assert spool.peek()[1] == b"%010d" % 1  # The next, never sent, record is still there
+    assert spool.pop(spool.peek()[3])
+    assert len(spool) == 2
+    spool.close()
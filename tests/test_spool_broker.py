@@ -0,0 +1,60 @@
+import json
+import time
+
+import publisher
+from helpers.mqtt_broker import Broker
+from helpers.payload import encode_json
+from helpers.spool import Spool, RECORD
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def results(frame_id):
+    return {"timestamp": 1700000000.0, "frame_id": frame_id, "static": False,
+            "detector_ran": True, "detections": []}
+
+
+def test_spool_replays_in_order_after_broker_outage(tmp_path, monkeypatch):
+    broker = Broker()
+    monkeypatch.setattr(publisher, "BROKER_ADDRESS", "127.0.0.1")
+    monkeypatch.setattr(publisher, "BROKER_PORT", broker.start())
+    monkeypatch.setattr(publisher, "SPOOL_PATH", str(tmp_path / "results.spool"))
+    monkeypatch.setattr(publisher, "SPOOL_REPLAY_RATE", 200)
+    received = []
+    broker.on_message = lambda topic, payload: received.append((topic, payload))
+
+    mqtt_publisher = publisher.MQTTPublisher(encoding="json")
+    # Room for 5 results, so the outage wraps the ring and evicts the oldest ones
+    record_size = RECORD.size + len(publisher.MQTT_TOPIC_CV_RESULTS) + len(encode_json(results(100)))
+    mqtt_publisher.spool.close()
+    mqtt_publisher.spool = Spool(str(tmp_path / "small.spool"), capacity=record_size * 5)
+    try:
+        assert mqtt_publisher.setup_mqtt()
+        assert mqtt_publisher.connected
+
+        broker.stop()
+        assert wait_for(lambda: not mqtt_publisher.connected)
+        for frame_id in range(100, 112):
+            assert mqtt_publisher.publish_results(results(frame_id))
+        assert len(mqtt_publisher.spool) == 5
+        assert mqtt_publisher.spool.evicted == 7
+
+        broker.start()
+        replay_topic = publisher.SPOOL_REPLAY_TOPIC_PREFIX + publisher.MQTT_TOPIC_CV_RESULTS
+        replayed = lambda: [json.loads(payload)["frame_id"]
+                            for topic, payload in list(received) if topic == replay_topic]
+        assert wait_for(lambda: len(replayed()) == 5)
+        assert replayed() == list(range(107, 112))
+        assert mqtt_publisher.replayed == 5
+        assert len(mqtt_publisher.spool) == 0
+        assert mqtt_publisher.spool.evicted == 7
+    finally:
+        mqtt_publisher.cleanup()
+        broker.stop()